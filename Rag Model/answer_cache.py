@@ -0,0 +1,168 @@
+"""
+Answer Cache Module
+Caches generated answers so repeated and near-duplicate questions skip the LLM.
+
+Entries are keyed by (corpus version, context key, retrieved chunk ids,
+normalized question); the context key covers the chat history and retrieval
+settings of the request. A lookup runs after retrieval and is a hit when
+
+    exact    - the normalized question matches a cached one, or
+    semantic - the question embedding is within ANSWER_CACHE_SIMILARITY (cosine)
+               of a cached question that retrieved the same chunks
+
+Entries expire after ANSWER_CACHE_TTL seconds and the least recently used are
+evicted past ANSWER_CACHE_MAX_ENTRIES. When the corpus version changes (an
+upload, delete or clear) every entry is dropped: the backend calls invalidate()
+after each change, and lookups check the version as well.
+"""
+import hashlib
+import json
+import re
+import threading
+import time
+from collections import OrderedDict
+import numpy as np
+import config as app_config
+
+
+def normalize_question(question):
+    """Case-, whitespace- and trailing-punctuation-insensitive form of a question"""
+    return re.sub(r"\s+", " ", question).strip().rstrip("?!. ").lower()
+
+
+def context_key(history, **params):
+    """Key for everything besides the question that shapes the answer"""
+    payload = json.dumps({"history": history or [], "params": params}, sort_keys=True)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def chunk_id(metadata):
+    """Identifier of a chunk that stays the same when segments are compacted"""
+    return f"{metadata.get('filename', '')}:{metadata.get('page_number', 0)}:{metadata.get('start_pos', 0)}"
+
+
+class AnswerCache:
+    """In-memory TTL + LRU cache of answers for one corpus version at a time"""
+
+    def __init__(self, max_entries=1000, ttl=3600, similarity=0.95):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.similarity = similarity
+        self._entries = OrderedDict()  # exact key -> entry
+        self._corpus_version = None
+        self._lock = threading.Lock()
+        self.exact_hits = 0
+        self.semantic_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def get(self, corpus_version, context, chunk_ids, question, question_vector):
+        """
+        The cached entry for this question over these chunks, or None.
+        The entry's "cache_hit" is "exact" or "semantic".
+        """
+        key = self._key(context, chunk_ids, question)
+        with self._lock:
+            self._check_version(corpus_version)
+            entry = self._entries.get(key)
+            if entry is not None and not self._expired(entry):
+                self._entries.move_to_end(key)
+                self.exact_hits += 1
+                return dict(entry, cache_hit="exact", similarity=1.0)
+
+            # Near-duplicates: same context and chunks, similar question embedding
+            candidates = [(k, e) for k, e in self._live_entries() if k[:2] == key[:2]]
+            if candidates and self.similarity < 1:
+                scores = np.stack([e["vector"] for _, e in candidates]) @ _unit(question_vector)
+                best = int(np.argmax(scores))
+                if scores[best] >= self.similarity:
+                    hit_key, entry = candidates[best]
+                    self._entries.move_to_end(hit_key)
+                    self.semantic_hits += 1
+                    return dict(entry, cache_hit="semantic", similarity=round(float(scores[best]), 4))
+            self.misses += 1
+            return None
+
+    def put(self, corpus_version, context, chunk_ids, question, question_vector,
+            answer, relevant_chunks):
+        key = self._key(context, chunk_ids, question)
+        with self._lock:
+            self._check_version(corpus_version)
+            self._entries[key] = {
+                "vector": _unit(question_vector),
+                "question": question,
+                "answer": answer,
+                "relevant_chunks": relevant_chunks,
+                "created_at": time.time()
+            }
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, corpus_version):
+        """Drop every entry if the corpus has moved past the cached version"""
+        with self._lock:
+            self._check_version(corpus_version)
+
+    def get_stats(self):
+        with self._lock:
+            lookups = self.exact_hits + self.semantic_hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "exact_hits": self.exact_hits,
+                "semantic_hits": self.semantic_hits,
+                "misses": self.misses,
+                "hit_rate": round((self.exact_hits + self.semantic_hits) / lookups, 3) if lookups else 0.0,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+                "corpus_version": self._corpus_version
+            }
+
+    def _check_version(self, corpus_version):
+        if corpus_version != self._corpus_version:
+            if self._entries:
+                self._entries.clear()
+                self.invalidations += 1
+            self._corpus_version = corpus_version
+
+    def _live_entries(self):
+        """Entries that have not expired, dropping the expired ones"""
+        expired = [key for key, entry in self._entries.items() if self._expired(entry)]
+        for key in expired:
+            del self._entries[key]
+        return list(self._entries.items())
+
+    def _expired(self, entry):
+        return self.ttl > 0 and time.time() - entry["created_at"] > self.ttl
+
+    @staticmethod
+    def _key(context, chunk_ids, question):
+        return (context, tuple(sorted(chunk_ids)), normalize_question(question))
+
+
+def _unit(vector):
+    vector = np.asarray(vector, dtype='float32').ravel()
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm > 0 else vector
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_answer_cache():
+    """Return the shared cache, or None when ANSWER_CACHE_ENABLED is off"""
+    global _cache
+    if not app_config.ANSWER_CACHE_ENABLED:
+        return None
+    with _cache_lock:
+        if _cache is None:
+            _cache = AnswerCache(
+                max_entries=app_config.ANSWER_CACHE_MAX_ENTRIES,
+                ttl=app_config.ANSWER_CACHE_TTL,
+                similarity=app_config.ANSWER_CACHE_SIMILARITY
+            )
+    return _cache
@@ -2,15 +2,28 @@
 Flask Backend for RAG System
 Provides API endpoints for PDF processing and question answering
 """
-from flask import Flask, request, jsonify, send_from_directory
+from flask import Flask, Response, request, jsonify, send_from_directory, stream_with_context
 from flask_cors import CORS
-import faiss
-import PyPDF2
+import json
+import time
 import numpy as np
-import pickle
 import os
-import requests
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+import providers
+import config as app_config
 from config import get_api_config, validate_config, get_embedding_dimension
+from vector_store import store, RETRIEVAL_MODES
+from embeddings import get_embedding, get_embeddings
+from embedding_cache import get_embedding_cache
+from answer_cache import get_answer_cache, chunk_id, context_key
+from providers import get_openai_client, track
+from pdf_extractor import page_count
+from ingest import ingest_pdf
+from jobs import get_job_queue
+from prompt_builder import PromptBudgetError, build_messages
+from reranker import get_reranker, get_reranker_stats
+from local_embeddings import get_local_embedder_stats
 from werkzeug.utils import secure_filename
 import traceback
 
@@ -33,60 +46,63 @@ except Exception as e:
     print(f"⚠️ Configuration error: {e}")
     config = None
 
+# Load the vector database into memory once; requests search the resident copy
+try:
+    store.load()
+except Exception as e:
+    print(f"⚠️ Could not load vector database: {e}")
 
-def allowed_file(filename):
-    return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
 
+def invalidate_answer_cache():
+    """Drop cached answers once the corpus has changed"""
+    answer_cache = get_answer_cache()
+    if answer_cache:
+        answer_cache.invalidate(store.corpus_version())
 
-def get_embedding(text, config):
-    """Get embedding for text using the configured API"""
-    if config["api_type"] == "openai":
-        from openai import OpenAI
-        client = OpenAI(api_key=config["api_key"])
-        response = client.embeddings.create(input=text, model=config["embedding_model"])
-        return response.data[0].embedding
-    
-    elif config["api_type"] == "ollama":
-        response = requests.post(
-            f"{config['base_url']}/api/embeddings",
-            json={"model": config["embedding_model"], "prompt": text}
-        )
-        if response.status_code == 200:
-            return response.json()["embedding"]
-        else:
-            raise Exception(f"Ollama API error: {response.status_code} - {response.text}")
-    
-    else:
-        raise ValueError(f"Unknown API type: {config['api_type']}")
+
+def run_ingest_job(payload, progress):
+    """Job handler: extract, chunk, embed and index an uploaded PDF"""
+    if config is None:
+        raise ValueError("API configuration is invalid; check the server log")
+    try:
+        return ingest_pdf(payload["filepath"], payload["filename"], config, progress)
+    finally:
+        invalidate_answer_cache()
+
+
+def get_ingest_queue():
+    """
+    The background queue that processes uploads (clients poll /api/jobs/<id>).
+    Created on first use rather than at import, so the reloader's watcher
+    process never recovers or runs jobs alongside the server process.
+    """
+    return get_job_queue({"ingest": run_ingest_job})
+
+
+def allowed_file(filename):
+    return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
 
 
 def get_chat_response(messages, config):
     """Get chat response using the configured API"""
-    if config["api_type"] == "openai":
-        from openai import OpenAI
-        client = OpenAI(api_key=config["api_key"])
-        response = client.chat.completions.create(
-            model=config["chat_model"],
-            messages=messages
-        )
+    if config["chat_api_type"] == "openai":
+        client = get_openai_client(config["api_key"], chat=True)
+        with track("openai", "chat"):
+            response = client.chat.completions.create(
+                model=config["chat_model"],
+                messages=messages
+            )
         return response.choices[0].message.content
     
-    elif config["api_type"] == "ollama":
-        prompt = ""
-        for msg in messages:
-            role = msg["role"]
-            content = msg["content"]
-            if role == "system":
-                prompt += f"System: {content}\n\n"
-            elif role == "user":
-                prompt += f"User: {content}\n\n"
-        
-        response = requests.post(
+    elif config["chat_api_type"] == "ollama":
+        response = providers.post(
+            "ollama", "chat",
             f"{config['base_url']}/api/generate",
             json={
                 "model": config["chat_model"],
-                "prompt": prompt,
-                "stream": False
+                "prompt": ollama_prompt(messages),
+                "stream": False,
+                "options": {"num_ctx": app_config.CONTEXT_WINDOW_TOKENS}
             }
         )
         if response.status_code == 200:
@@ -95,7 +111,72 @@ def get_chat_response(messages, config):
             raise Exception(f"Ollama API error: {response.status_code} - {response.text}")
     
     else:
-        raise ValueError(f"Unknown API type: {config['api_type']}")
+        raise ValueError(f"Unknown API type: {config['chat_api_type']}")
+
+
+def stream_chat_response(messages, config, usage):
+    """
+    Yield the answer's text pieces as the configured API generates them.
+    When the API reports it, usage["completion_tokens"] is set at the end.
+    """
+    if config["chat_api_type"] == "openai":
+        client = get_openai_client(config["api_key"], chat=True)
+        with track("openai", "chat_stream"):
+            stream = client.chat.completions.create(
+                model=config["chat_model"],
+                messages=messages,
+                stream=True,
+                stream_options={"include_usage": True}
+            )
+        for chunk in stream:
+            if chunk.usage:
+                usage["completion_tokens"] = chunk.usage.completion_tokens
+            if chunk.choices and chunk.choices[0].delta.content:
+                yield chunk.choices[0].delta.content
+    
+    elif config["chat_api_type"] == "ollama":
+        with providers.post(
+            "ollama", "chat_stream",
+            f"{config['base_url']}/api/generate",
+            json={
+                "model": config["chat_model"],
+                "prompt": ollama_prompt(messages),
+                "stream": True,
+                "options": {"num_ctx": app_config.CONTEXT_WINDOW_TOKENS}
+            },
+            stream=True
+        ) as response:
+            if response.status_code != 200:
+                raise Exception(f"Ollama API error: {response.status_code} - {response.text}")
+            # One JSON object per line; the last has done=true and the token count
+            for line in response.iter_lines():
+                if not line:
+                    continue
+                part = json.loads(line)
+                if part.get("error"):
+                    raise Exception(f"Ollama API error: {part['error']}")
+                if part.get("response"):
+                    yield part["response"]
+                if part.get("done"):
+                    usage["completion_tokens"] = part.get("eval_count")
+    
+    else:
+        raise ValueError(f"Unknown API type: {config['chat_api_type']}")
+
+
+def ollama_prompt(messages):
+    """Flatten chat messages into a single Ollama prompt"""
+    prompt = ""
+    for msg in messages:
+        role = msg["role"]
+        content = msg["content"]
+        if role == "system":
+            prompt += f"System: {content}\n\n"
+        elif role == "user":
+            prompt += f"User: {content}\n\n"
+        elif role == "assistant":
+            prompt += f"Assistant: {content}\n\n"
+    return prompt
 
 
 @app.route('/')
@@ -125,29 +206,46 @@ def get_config():
 @app.route('/api/status', methods=['GET'])
 def check_status():
     """Check if vector database exists"""
-    db_exists = os.path.exists("vectors.index") and os.path.exists("chunks.pkl")
-    
-    if db_exists:
-        try:
-            with open("chunks.pkl", "rb") as f:
-                data = pickle.load(f)
-            return jsonify({
-                "success": True,
-                "database_exists": True,
-                "total_chunks": len(data['chunks']),
-                "total_pages": data.get('total_pages', 0),
-                "files": data.get('files', [])
-            })
-        except Exception as e:
-            return jsonify({
-                "success": False,
-                "database_exists": False,
-                "error": str(e)
-            })
+    try:
+        snapshot = store.snapshot()
+    except Exception as e:
+        return jsonify({
+            "success": False,
+            "database_exists": False,
+            "error": str(e)
+        })
+
+    cache = get_embedding_cache()
+    cache_stats = cache.get_stats() if cache else None
+    answer_cache = get_answer_cache()
+    answer_cache_stats = answer_cache.get_stats() if answer_cache else None
+
+    if snapshot:
+        return jsonify({
+            "success": True,
+            "database_exists": True,
+            "total_chunks": snapshot['total_chunks'],
+            "total_pages": snapshot['total_pages'],
+            "files": snapshot['files'],
+            "store": store.get_stats(),
+            "embedding_cache": cache_stats,
+            "answer_cache": answer_cache_stats,
+            "reranker": get_reranker_stats(),
+            "local_embeddings": get_local_embedder_stats(),
+            "jobs": get_ingest_queue().get_stats(),
+            "providers": providers.get_metrics()
+        })
     else:
         return jsonify({
             "success": True,
-            "database_exists": False
+            "database_exists": False,
+            "store": store.get_stats(),
+            "embedding_cache": cache_stats,
+            "answer_cache": answer_cache_stats,
+            "reranker": get_reranker_stats(),
+            "local_embeddings": get_local_embedder_stats(),
+            "jobs": get_ingest_queue().get_stats(),
+            "providers": providers.get_metrics()
         })
 
 
@@ -167,179 +265,238 @@ def upload_pdf():
     
     try:
         filename = secure_filename(file.filename)
-        filepath = os.path.join(app.config['UPLOAD_FOLDER'], filename)
+        # Unique name on disk so a queued job's file is not overwritten by a re-upload
+        filepath = os.path.join(app.config['UPLOAD_FOLDER'], f"{uuid.uuid4().hex[:8]}_{filename}")
         file.save(filepath)
-        
-        # Process PDF
-        with open(filepath, 'rb') as f:
-            pdf_reader = PyPDF2.PdfReader(f)
-            total_pages = len(pdf_reader.pages)
-            
-            # Extract text
-            page_texts = []
-            for page_num, page in enumerate(pdf_reader.pages):
-                page_text = page.extract_text()
-                page_texts.append({
-                    'text': page_text,
-                    'page_number': page_num + 1
-                })
-            
-            text = ''.join([p['text'] for p in page_texts])
-        
-        # Create chunks
-        new_chunks = []
-        new_chunk_metadata = []
-        
-        # Prevent division by zero
-        text_len = len(text)
-        chars_per_page = max(text_len // max(total_pages, 1), 1)
-        
-        for i in range(0, text_len, 400):
-            chunk_text = text[i:i + 500]
-            new_chunks.append(chunk_text)
-            
-            estimated_page = min((i // chars_per_page) + 1, total_pages)
-            new_chunk_metadata.append({
-                'start_pos': i,
-                'estimated_page': estimated_page,
-                'filename': filename
-            })
-        
-        # Get embeddings
-        embeddings = []
-        for chunk in new_chunks:
-            embedding = get_embedding(chunk, config)
-            embeddings.append(embedding)
-        
-        embeddings = np.array(embeddings)
-        
-        # Check if database exists to append
-        if os.path.exists("vectors.index") and os.path.exists("chunks.pkl"):
-            index = faiss.read_index("vectors.index")
-            with open("chunks.pkl", "rb") as f:
-                existing_data = pickle.load(f)
-            
-            chunks = existing_data['chunks'] + new_chunks
-            chunk_metadata = existing_data['metadata'] + new_chunk_metadata
-            total_pages_all = existing_data.get('total_pages', 0) + total_pages
-            files = existing_data.get('files', [])
-            if filename not in files:
-                files.append(filename)
-        else:
-            embedding_dim = config["embedding_dim"]
-            index = faiss.IndexFlatIP(embedding_dim)
-            chunks = new_chunks
-            chunk_metadata = new_chunk_metadata
-            total_pages_all = total_pages
-            files = [filename]
-            
-        index.add(embeddings.astype('float32'))
-        
-        # Save to files
-        faiss.write_index(index, "vectors.index")
-        with open("chunks.pkl", "wb") as f:
-            pickle.dump({
-                'chunks': chunks,
-                'metadata': chunk_metadata,
-                'total_pages': total_pages_all,
-                'files': files
-            }, f)
-        
-        return jsonify({
-            "success": True,
-            "message": "PDF processed successfully",
-            "total_pages": total_pages,
-            "total_chunks": len(new_chunks),
-            "filename": filename
+        total_pages = page_count(filepath)
+    except Exception as e:
+        return jsonify({"success": False, "error": f"Could not read PDF: {e}"}), 400
+    
+    job_id = get_ingest_queue().submit("ingest", {"filepath": filepath, "filename": filename})
+    return jsonify({
+        "success": True,
+        "message": "PDF queued for processing",
+        "job_id": job_id,
+        "status": "queued",
+        "total_pages": total_pages,
+        "filename": filename
+    }), 202
+
+
+@app.route('/api/jobs/<job_id>', methods=['GET'])
+def get_job(job_id):
+    """Status, per-stage progress and result of an ingest job"""
+    job = get_ingest_queue().get(job_id)
+    if job is None:
+        return jsonify({"success": False, "error": "Job not found"}), 404
+    return jsonify({"success": True, "job": job})
+
+
+@app.route('/api/jobs', methods=['GET'])
+def list_jobs():
+    """Most recent jobs first"""
+    limit = request.args.get('limit', 50, type=int)
+    return jsonify({"success": True, "jobs": get_ingest_queue().list(limit)})
+
+
+def prepare_answer(data, snapshot):
+    """
+    Retrieve chunks for the question and build the chat messages.
+    Returns a dict with "messages", "relevant_chunks" (those that fit in the
+    prompt), "prompt" (its token breakdown), "rerank" (the re-ranking report,
+    None when it is off) and, when the answer cache has an answer for this
+    question over these chunks, "cached".
+    """
+    question = data.get('question', '').strip()
+    
+    # Get question embedding
+    query_embedding = get_embedding(question, config)
+    query_vector = np.array(query_embedding).reshape(1, -1)
+    
+    # Search similar chunks
+    all_hits, reports = search_chunks(data, snapshot, query_vector, [question])
+    return build_prompt(data, snapshot, question, query_vector, all_hits[0], reports[0])
+
+
+def search_chunks(data, snapshot, query_vectors, questions):
+    """
+    Retrieve chunks for one or more questions (one row of query_vectors each) in one search.
+    With re-ranking on, RERANK_CANDIDATES chunks are retrieved per question and
+    the cross-encoder picks the top_k.
+    Returns (hits per question, re-ranking report per question or None).
+    """
+    top_k = data.get('top_k') or app_config.RETRIEVAL_TOP_K
+    rerank = data.get('rerank')
+    if rerank is None:
+        rerank = app_config.RERANK_ENABLED
+    k = max(top_k, app_config.RERANK_CANDIDATES) if rerank else top_k
+    results = store.search(query_vectors, k, snapshot=snapshot,
+                           nprobe=data.get('nprobe'), ef_search=data.get('ef_search'),
+                           query_texts=questions, mode=data.get('retrieval_mode'),
+                           min_score=data.get('min_score'), mmr_lambda=data.get('mmr_lambda'),
+                           documents=data.get('documents'))
+    if not rerank:
+        return results, [None] * len(results)
+    
+    reranker = get_reranker()
+    reranked = [reranker.rerank(question, hits, top_k) for question, hits in zip(questions, results)]
+    return [hits for hits, _ in reranked], [report for _, report in reranked]
+
+
+def build_prompt(data, snapshot, question, query_vector, hits, rerank=None):
+    """The prepare_answer dict for a question whose chunks have been retrieved"""
+    chat_history = data.get('history', [])
+    documents = data.get('documents')
+    total_pages = snapshot['total_pages'] if documents is None else \
+        sum(snapshot['documents'][name]['pages']
+            for name in {snapshot['aliases'].get(name, name) for name in documents})
+    
+    # Fit the system prompt, history, chunks and question into the token budget
+    system_prompt = f"You are answering questions about a {total_pages}-page document. When providing answers, mention page numbers when relevant. Be concise and helpful. Base your answers primarily on the context provided."
+    labelled = [(f"[File: {hit['metadata'].get('filename', 'Unknown Document')}, "
+                 f"Page: {hit['metadata'].get('page_number', 1)}]", hit['text']) for hit in hits]
+    messages, used, prompt_report = build_messages(system_prompt, question, labelled,
+                                                   chat_history, model=config.get("chat_model"))
+    
+    relevant_chunks = []
+    chunk_ids = []
+    for position in used:
+        hit = hits[position]
+        relevant_chunks.append({
+            "text": hit['text'][:200] + "...",
+            "page": hit['metadata'].get('page_number', 1),
+            "document": hit['metadata'].get('filename', 'Unknown Document'),
+            "score": hit['score'],
+            "similarity": hit.get('similarity'),
+            "rerank_score": hit.get('rerank_score')
         })
+        chunk_ids.append(chunk_id(hit['metadata']))
     
-    except Exception as e:
-        return jsonify({
-            "success": False,
-            "error": str(e),
-            "traceback": traceback.format_exc()
-        }), 500
+    prepared = {"relevant_chunks": relevant_chunks, "prompt": prompt_report, "rerank": rerank,
+                "cached": None}
+    
+    # Reuse the answer to a repeated question over the same chunks
+    answer_cache = get_answer_cache()
+    if answer_cache:
+        prepared["cache_key"] = (
+            snapshot['corpus_version'],
+            context_key(chat_history, **{name: data.get(name) for name in RETRIEVAL_PARAMS}),
+            chunk_ids, question, query_vector
+        )
+        prepared["cached"] = answer_cache.get(*prepared["cache_key"])
+    
+    prepared["messages"] = messages
+    return prepared
+
+
+def remember_answer(prepared, answer):
+    """Store a freshly generated answer in the answer cache"""
+    answer_cache = get_answer_cache()
+    if answer_cache and "cache_key" in prepared and answer:
+        answer_cache.put(*prepared["cache_key"], answer, prepared["relevant_chunks"])
+
+
+def cache_info(cached):
+    """How a response was served from the answer cache (None when it was not)"""
+    if not cached:
+        return None
+    return {"hit": cached["cache_hit"], "similarity": cached["similarity"],
+            "question": cached["question"]}
+
+
+# Request fields that tune retrieval (they are part of the answer cache key)
+RETRIEVAL_PARAMS = ('top_k', 'min_score', 'mmr_lambda', 'retrieval_mode', 'nprobe', 'ef_search',
+                    'documents', 'rerank')
+
+
+def check_question(data):
+    """Error response for a request that cannot be answered, else None"""
+    if not data or not data.get('question', '').strip():
+        return jsonify({"success": False, "error": "No question provided"}), 400
+    
+    error = check_retrieval_params(data)
+    if error:
+        return jsonify({"success": False, "error": error}), 400
+    return None
+
+
+def check_retrieval_params(data):
+    """Error message for a bad retrieval setting in the request, else None"""
+    error = None
+    top_k = data.get('top_k')
+    if data.get('retrieval_mode') not in (None,) + RETRIEVAL_MODES:
+        error = f"retrieval_mode must be one of {', '.join(RETRIEVAL_MODES)}"
+    elif top_k is not None and (not isinstance(top_k, int) or isinstance(top_k, bool)
+                                or not 1 <= top_k <= app_config.RETRIEVAL_MAX_TOP_K):
+        error = f"top_k must be an integer from 1 to {app_config.RETRIEVAL_MAX_TOP_K}"
+    elif not is_number(data.get('min_score'), -1, 1):
+        error = "min_score must be a number from -1 to 1"
+    elif not is_number(data.get('mmr_lambda'), 0, 1):
+        error = "mmr_lambda must be a number from 0 to 1"
+    elif data.get('rerank') is not None and not isinstance(data['rerank'], bool):
+        error = "rerank must be true or false"
+    elif 'documents' in data:
+        error = check_documents(data['documents'])
+    return error
+
+
+def check_documents(documents):
+    """Error message for a bad `documents` filter, else None"""
+    if not isinstance(documents, list) or not documents or \
+            not all(isinstance(name, str) for name in documents):
+        return "documents must be a non-empty list of filenames"
+    snapshot = store.snapshot()
+    unknown = [name for name in documents if snapshot is None or
+               (name not in snapshot['documents'] and name not in snapshot['aliases'])]
+    if unknown:
+        return f"Unknown documents: {', '.join(unknown)}"
+    return None
+
+
+def is_number(value, low, high):
+    """Whether an optional request field is absent or a number in [low, high]"""
+    if value is None:
+        return True
+    return isinstance(value, (int, float)) and not isinstance(value, bool) and low <= value <= high
 
 
 @app.route('/api/ask', methods=['POST'])
 def ask_question():
     """Ask a question about the processed PDF"""
     data = request.get_json()
-    question = data.get('question', '').strip()
-    chat_history = data.get('history', [])  # New: Accept chat history
-    
-    if not question:
-        return jsonify({"success": False, "error": "No question provided"}), 400
+    error = check_question(data)
+    if error:
+        return error
     
     # Check if database exists
-    if not os.path.exists("vectors.index") or not os.path.exists("chunks.pkl"):
+    snapshot = store.snapshot()
+    if snapshot is None:
         return jsonify({
             "success": False,
             "error": "Vector database not found. Please upload a PDF first."
         }), 404
     
     try:
-        # Load data
-        index = faiss.read_index("vectors.index")
-        with open("chunks.pkl", "rb") as f:
-            data = pickle.load(f)
-        
-        chunks = data['chunks']
-        metadata = data['metadata']
-        total_pages = data['total_pages']
-        
-        # Get question embedding
-        query_embedding = get_embedding(question, config)
-        query_vector = np.array(query_embedding).reshape(1, -1)
-        
-        # Search similar chunks
-        scores, indices = index.search(query_vector.astype('float32'), 3)
-        
-        # Build context
-        context_parts = []
-        relevant_chunks = []
-        
-        for score, idx in zip(scores[0], indices[0]):
-            chunk_text = chunks[idx]
-            page_num = metadata[idx].get('estimated_page', 1)
-            doc_name = metadata[idx].get('filename', 'Unknown Document')
-            context_parts.append(f"[File: {doc_name}, Page: {page_num}]: {chunk_text}")
-            relevant_chunks.append({
-                "text": chunk_text[:200] + "...",
-                "page": page_num,
-                "document": doc_name,
-                "score": float(score)
-            })
-        
-        context = '\n\n'.join(context_parts)
-        
-        # Get answer with conversational memory
-        messages = [
-            {
-                "role": "system",
-                "content": f"You are answering questions about a {total_pages}-page document. When providing answers, mention page numbers when relevant. Be concise and helpful. Base your answers primarily on the context provided."
-            }
-        ]
-        
-        # Append chat history
-        for msg in chat_history:
-            messages.append({"role": msg.get("role"), "content": msg.get("content")})
-            
-        # Append current question with context
-        messages.append({
-            "role": "user",
-            "content": f"Context: {context}\n\nQuestion: {question}\n\nAnswer based on the context:"
-        })
-        
-        answer = get_chat_response(messages, config)
+        prepared = prepare_answer(data, snapshot)
+        cached = prepared["cached"]
+        if cached:
+            answer = cached["answer"]
+        else:
+            answer = get_chat_response(prepared["messages"], config)
+            remember_answer(prepared, answer)
         
         return jsonify({
             "success": True,
             "answer": answer,
-            "relevant_chunks": relevant_chunks,
-            "total_pages": total_pages
+            "relevant_chunks": prepared["relevant_chunks"],
+            "total_pages": snapshot['total_pages'],
+            "prompt": prepared["prompt"],
+            "rerank": prepared["rerank"],
+            "cache": cache_info(cached)
         })
     
+    except PromptBudgetError as e:
+        return jsonify({"success": False, "error": str(e)}), 400
     except Exception as e:
         return jsonify({
             "success": False,
@@ -348,31 +505,214 @@ def ask_question():
         }), 500
 
 
-@app.route('/api/documents', methods=['GET'])
-def list_documents():
-    """List all uploaded documents in the vector database"""
-    if os.path.exists("chunks.pkl"):
+@app.route('/api/ask/batch', methods=['POST'])
+def ask_batch():
+    """
+    Answer many questions in one request: the questions are embedded in one
+    batched call and searched as one query matrix, then their answers are
+    generated concurrently (at most ASK_BATCH_CONCURRENCY at a time).
+    One failed question does not fail the batch; it gets its own error.
+    """
+    data = request.get_json()
+    questions = data.get('questions') if isinstance(data, dict) else None
+    cap = app_config.ASK_BATCH_CONCURRENCY
+    concurrency = data.get('concurrency', cap) if isinstance(data, dict) else cap
+    if not isinstance(questions, list) or not questions or \
+            not all(isinstance(q, str) and q.strip() for q in questions):
+        error = "questions must be a non-empty list of questions"
+    elif len(questions) > app_config.ASK_BATCH_MAX_QUESTIONS:
+        error = f"At most {app_config.ASK_BATCH_MAX_QUESTIONS} questions per batch"
+    elif not isinstance(concurrency, int) or isinstance(concurrency, bool) or \
+            not 1 <= concurrency <= cap:
+        error = f"concurrency must be an integer from 1 to {cap}"
+    else:
+        error = check_retrieval_params(data)
+    if error:
+        return jsonify({"success": False, "error": error}), 400
+    
+    snapshot = store.snapshot()
+    if snapshot is None:
+        return jsonify({
+            "success": False,
+            "error": "Vector database not found. Please upload a PDF first."
+        }), 404
+    
+    start = time.perf_counter()
+    questions = [q.strip() for q in questions]
+    try:
+        query_vectors = np.array(get_embeddings(questions, config), dtype='float32')
+        embedded = time.perf_counter()
+        all_hits, reports = search_chunks(data, snapshot, query_vectors, questions)
+        searched = time.perf_counter()
+    except Exception as e:
+        return jsonify({
+            "success": False,
+            "error": str(e),
+            "traceback": traceback.format_exc()
+        }), 500
+    
+    def answer(i):
+        started = time.perf_counter()
+        result = {"question": questions[i]}
         try:
-            with open("chunks.pkl", "rb") as f:
-                data = pickle.load(f)
-            return jsonify({
+            prepared = build_prompt(data, snapshot, questions[i], query_vectors[i:i + 1], all_hits[i],
+                                    reports[i])
+            cached = prepared["cached"]
+            if cached:
+                answer_text = cached["answer"]
+            else:
+                answer_text = get_chat_response(prepared["messages"], config)
+                remember_answer(prepared, answer_text)
+            result.update(success=True, answer=answer_text,
+                          relevant_chunks=prepared["relevant_chunks"],
+                          prompt=prepared["prompt"], rerank=prepared["rerank"],
+                          cache=cache_info(cached))
+        except Exception as e:
+            result.update(success=False, error=str(e))
+        finished = time.perf_counter()
+        # queued_ms: waiting for a free generation slot; total_ms: from the start of the batch
+        result["timings"] = {
+            "queued_ms": round((started - searched) * 1000, 2),
+            "answer_ms": round((finished - started) * 1000, 2),
+            "total_ms": round((finished - start) * 1000, 2)
+        }
+        return result
+    
+    with ThreadPoolExecutor(max_workers=min(concurrency, len(questions)),
+                            thread_name_prefix="ask-batch") as pool:
+        results = list(pool.map(answer, range(len(questions))))
+    
+    return jsonify({
+        "success": True,
+        "results": results,
+        "total_pages": snapshot['total_pages'],
+        "answered": sum(1 for result in results if result["success"]),
+        "failed": sum(1 for result in results if not result["success"]),
+        "concurrency": concurrency,
+        "timings": {
+            "embedding_ms": round((embedded - start) * 1000, 2),
+            "search_ms": round((searched - embedded) * 1000, 2),
+            "generation_ms": round((time.perf_counter() - searched) * 1000, 2),
+            "total_ms": round((time.perf_counter() - start) * 1000, 2)
+        }
+    })
+
+
+@app.route('/api/ask/stream', methods=['POST'])
+def ask_question_stream():
+    """
+    Ask a question and stream the answer as Server-Sent Events:
+    a `chunks` event with the relevant chunks, `token` events as the answer is
+    generated, then a `done` event with timings (or an `error` event).
+    A cached answer arrives as a single `token` event.
+    """
+    data = request.get_json()
+    error = check_question(data)
+    if error:
+        return error
+    
+    snapshot = store.snapshot()
+    if snapshot is None:
+        return jsonify({
+            "success": False,
+            "error": "Vector database not found. Please upload a PDF first."
+        }), 404
+    
+    def events():
+        start = time.perf_counter()
+        try:
+            prepared = prepare_answer(data, snapshot)
+            cached = prepared["cached"]
+            retrieval_ms = (time.perf_counter() - start) * 1000
+            yield sse_event("chunks", {
+                "relevant_chunks": prepared["relevant_chunks"],
+                "total_pages": snapshot['total_pages'],
+                "prompt": prepared["prompt"],
+                "rerank": prepared["rerank"]
+            })
+            
+            usage = {}
+            pieces = 0
+            first_token_at = None
+            generate_start = time.perf_counter()
+            if cached:
+                pieces = 1
+                first_token_at = time.perf_counter()
+                yield sse_event("token", {"text": cached["answer"]})
+            else:
+                answer_parts = []
+                for text in stream_chat_response(prepared["messages"], config, usage):
+                    if first_token_at is None:
+                        first_token_at = time.perf_counter()
+                    pieces += 1
+                    answer_parts.append(text)
+                    yield sse_event("token", {"text": text})
+                remember_answer(prepared, "".join(answer_parts))
+            
+            end = time.perf_counter()
+            # Providers stream about one token per piece; prefer their own count
+            tokens = usage.get("completion_tokens") or pieces
+            generating_s = end - (first_token_at or end)
+            yield sse_event("done", {
                 "success": True,
-                "files": data.get('files', [])
+                "tokens": tokens,
+                "retrieval_ms": round(retrieval_ms, 1),
+                "ttft_ms": round((first_token_at - generate_start) * 1000, 1) if first_token_at else None,
+                "tokens_per_second": round(tokens / generating_s, 1) if generating_s > 0 else None,
+                "total_ms": round((end - start) * 1000, 1),
+                "cache": cache_info(cached)
             })
         except Exception as e:
-            return jsonify({"success": False, "error": str(e)}), 500
-    return jsonify({"success": True, "files": []})
+            yield sse_event("error", {"success": False, "error": str(e)})
+    
+    return Response(stream_with_context(events()), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+
+def sse_event(event, data):
+    """Format one Server-Sent Event"""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+@app.route('/api/documents', methods=['GET'])
+def list_documents():
+    """List all uploaded documents in the vector database"""
+    try:
+        snapshot = store.snapshot()
+        return jsonify({
+            "success": True,
+            "files": snapshot['files'] if snapshot else [],
+            "documents": [dict(name=name, **details) for name, details
+                          in snapshot['documents'].items()] if snapshot else []
+        })
+    except Exception as e:
+        return jsonify({"success": False, "error": str(e)}), 500
+
+
+@app.route('/api/documents/<path:filename>', methods=['DELETE'])
+def delete_document(filename):
+    """Remove one document from the vector database, leaving the others in place"""
+    try:
+        removed = store.delete_document(filename)
+        invalidate_answer_cache()
+        if not removed:
+            return jsonify({"success": False, "error": f"Document not found: {filename}"}), 404
+        return jsonify({
+            "success": True,
+            "document": filename,
+            "chunks_removed": removed
+        })
+    except Exception as e:
+        return jsonify({"success": False, "error": str(e)}), 500
 
 
 @app.route('/api/clear', methods=['POST'])
 def clear_database():
     """Clear the vector database"""
     try:
-        if os.path.exists("vectors.index"):
-            os.remove("vectors.index")
-        if os.path.exists("chunks.pkl"):
-            os.remove("chunks.pkl")
-        
+        store.clear()
+        invalidate_answer_cache()
+
         return jsonify({
             "success": True,
             "message": "Database cleared successfully"
@@ -396,4 +736,9 @@ if __name__ == '__main__':
     print("=" * 60)
     print("\n🌐 Open http://localhost:5000 in your browser\n")
     
+    # The debug reloader runs this file twice: a watcher, and the server with
+    # WERKZEUG_RUN_MAIN set. Only the server picks up jobs left by a restart.
+    if os.environ.get("WERKZEUG_RUN_MAIN") == "true":
+        get_ingest_queue()
+    
     app.run(debug=True, host='0.0.0.0', port=5000)
@@ -0,0 +1,542 @@
+"""
+Benchmarks for the RAG vector store
+
+Usage:
+    python benchmark.py ann [--k 10] [--queries 200] [--synthetic 100000]
+    python benchmark.py quantization [--k 10] [--queries 200] [--synthetic 100000] [--rerank 1 4]
+    python benchmark.py normalization [--k 3] [--queries 200] [--synthetic 100000]
+    python benchmark.py extraction [--pdf file.pdf] [--pages 400] [--workers 1 4 8]
+    python benchmark.py hybrid [--k 3] [--queries 200] [--synthetic 20000]
+    python benchmark.py stress [--writers 4] [--processes] [--documents 10] [--readers 4]
+    python benchmark.py embedding [--texts 256] [--batch-sizes 1 8 32 64]
+
+Vectors come from the local vector store; pass --synthetic N to benchmark on
+N random clustered vectors instead (no database or API needed). The
+quantization benchmark reports the memory each compressed index saves and the
+recall it loses against flat, with and without float re-ranking. The extraction
+benchmark writes a synthetic PDF with --pages pages unless --pdf is given.
+The hybrid benchmark's synthetic corpus gives each chunk a unique identifier
+(the kind of token embeddings blur) and asks for it by name.
+The stress test appends synthetic documents from parallel writers (threads,
+or separate processes with --processes) into a scratch store while readers
+search it, then reopens the store and checks that no document was lost.
+The embedding benchmark measures embeddings/sec of the configured API_TYPE
+(e.g. local) per batch size, bypassing the embedding cache.
+"""
+import argparse
+import multiprocessing
+import os
+import tempfile
+import threading
+import time
+import faiss
+import numpy as np
+import config as app_config
+import pdf_extractor
+from embeddings import embed_batch
+from index_factory import build_index, rerank_depth, rescore, search_index, search_params
+from vector_store import RETRIEVAL_MODES, VectorStore, normalize_vectors, store
+
+
+def load_vectors(synthetic, dim, seed=0):
+    """Vectors from the store, or `synthetic` random clustered vectors"""
+    if synthetic:
+        rng = np.random.default_rng(seed)
+        centers = rng.normal(size=(max(synthetic // 100, 1), dim))
+        vectors = centers[rng.integers(0, len(centers), synthetic)] + \
+            0.3 * rng.normal(size=(synthetic, dim))
+        return vectors.astype('float32')
+
+    vectors = store.export_vectors()
+    if vectors is None:
+        raise SystemExit("❌ Vector database is empty. Upload PDFs first or pass --synthetic N.")
+    return np.ascontiguousarray(vectors, dtype='float32')
+
+
+def sample_queries(vectors, num_queries, seed=0):
+    """Queries near stored vectors, like real questions about the corpus"""
+    rng = np.random.default_rng(seed)
+    picks = vectors[rng.integers(0, len(vectors), num_queries)]
+    noise = rng.normal(scale=np.abs(vectors).mean() * 0.5, size=picks.shape)
+    return (picks + noise).astype('float32')
+
+
+def recall_at_k(truth, found):
+    """Fraction of the exact top-k that the approximate search also returned"""
+    hits = sum(len(set(t) & set(f)) for t, f in zip(truth, found))
+    return hits / truth.size
+
+
+def timed_search(index, queries, k, params=None):
+    start = time.perf_counter()
+    _, indices = index.search(queries, k, params=params)
+    elapsed_ms = (time.perf_counter() - start) * 1000
+    return indices, elapsed_ms / len(queries)
+
+
+def store_search(index, index_type, vectors, queries, k, params=None):
+    """
+    Search as the vector store does: compressed indexes fetch rerank_depth
+    candidates and re-score them against the float vectors
+    """
+    start = time.perf_counter()
+    depth = rerank_depth(index_type, k, len(vectors))
+    _, indices = search_index(index, queries, depth, params=params)
+    if depth > k:
+        _, indices = rescore(vectors, queries, indices, k)
+    elapsed_ms = (time.perf_counter() - start) * 1000
+    return indices, elapsed_ms / len(queries)
+
+
+def index_size_mb(index):
+    if isinstance(index, faiss.IndexBinary):
+        return faiss.serialize_index_binary(index).nbytes / (1024 * 1024)
+    return faiss.serialize_index(index).nbytes / (1024 * 1024)
+
+
+def benchmark_ann(args):
+    # Unit vectors and queries, as stored and searched
+    vectors, _ = normalize_vectors(load_vectors(args.synthetic, app_config.get_embedding_dimension()))
+    queries, _ = normalize_vectors(sample_queries(vectors, args.queries))
+    k = min(args.k, len(vectors))
+    print(f"📊 {len(vectors):,} vectors × {vectors.shape[1]} dims, {len(queries)} queries, k={k}")
+
+    flat, _ = build_index(vectors, vectors.shape[1], "flat")
+    truth, flat_ms = timed_search(flat, queries, k)
+
+    rows = [("flat", "-", 1.0, flat_ms, index_size_mb(flat), 0.0)]
+    for index_type in ("ivf_flat", "ivf_pq", "hnsw"):
+        start = time.perf_counter()
+        index, built_type = build_index(vectors, vectors.shape[1], index_type)
+        build_s = time.perf_counter() - start
+        if built_type != index_type:
+            print(f"⚠️  Skipping {index_type}: {len(vectors)} vectors is below ANN_MIN_VECTORS")
+            continue
+
+        if index_type == "hnsw":
+            sweep = [("efSearch", ef, search_params(index, ef_search=ef)) for ef in (16, 32, 64, 128, 256)]
+        else:
+            sweep = [("nprobe", n, search_params(index, nprobe=n)) for n in (1, 4, 8, 16, 32, 64)]
+
+        for name, value, params in sweep:
+            found, ms = store_search(index, index_type, vectors, queries, k, params)
+            rows.append((index_type, f"{name}={value}", recall_at_k(truth, found), ms,
+                         index_size_mb(index), build_s))
+
+    print()
+    print(f"{'index':<10} {'setting':<14} {'recall@k':>9} {'ms/query':>9} {'speedup':>8} {'size MB':>8} {'build s':>8}")
+    print("-" * 72)
+    for index_type, setting, recall, ms, size, build_s in rows:
+        print(f"{index_type:<10} {setting:<14} {recall:>9.3f} {ms:>9.3f} {flat_ms / ms:>7.1f}x "
+              f"{size:>8.1f} {build_s:>8.2f}")
+    print(f"\nivf_pq candidates are re-scored against the float vectors "
+          f"(QUANTIZED_RERANK_FACTOR={app_config.QUANTIZED_RERANK_FACTOR}), as in the store.")
+
+
+def benchmark_quantization(args):
+    vectors, _ = normalize_vectors(load_vectors(args.synthetic, app_config.get_embedding_dimension()))
+    queries, _ = normalize_vectors(sample_queries(vectors, args.queries))
+    k = min(args.k, len(vectors))
+    print(f"📊 {len(vectors):,} vectors × {vectors.shape[1]} dims, {len(queries)} queries, k={k}")
+
+    flat, _ = build_index(vectors, vectors.shape[1], "flat")
+    truth, flat_ms = timed_search(flat, queries, k)
+    flat_mb = index_size_mb(flat)
+
+    rows = [("flat", "-", flat_mb, 1.0, flat_ms)]
+    for index_type in ("fp16", "sq8", "binary"):
+        index, built_type = build_index(vectors, vectors.shape[1], index_type)
+        if built_type != index_type:
+            print(f"⚠️  Skipping {index_type}: {len(vectors)} vectors is below ANN_MIN_VECTORS")
+            continue
+        for factor in args.rerank:
+            depth = min(k * factor, len(vectors))
+            start = time.perf_counter()
+            _, found = search_index(index, queries, depth)
+            if depth > k:
+                _, found = rescore(vectors, queries, found, k)
+            ms = (time.perf_counter() - start) * 1000 / len(queries)
+            rows.append((index_type, f"x{factor}" if depth > k else "none", index_size_mb(index),
+                         recall_at_k(truth, found[:, :k]), ms))
+
+    print()
+    print(f"{'index':<8} {'re-rank':<8} {'size MB':>8} {'saved':>7} {'recall@k':>9} {'ms/query':>9}")
+    print("-" * 54)
+    for index_type, rerank, size, recall, ms in rows:
+        print(f"{index_type:<8} {rerank:<8} {size:>8.1f} {1 - size / flat_mb:>7.1%} {recall:>9.3f} {ms:>9.3f}")
+    print(f"\nRe-ranking reads the float vectors ({flat_mb:.1f} MB) memory-mapped from disk; "
+          f"only the candidates' pages are touched.")
+
+
+def benchmark_normalization(args):
+    """
+    Compare raw inner-product search (unnormalized vectors) with cosine search.
+    Raw vectors are rebuilt from the stored unit vectors and their recorded norms.
+    """
+    if args.synthetic:
+        raw = load_vectors(args.synthetic, app_config.get_embedding_dimension())
+        # Give the synthetic vectors the spread of norms long and short chunks have
+        raw *= np.random.default_rng(1).lognormal(sigma=0.5, size=(len(raw), 1)).astype('float32')
+    else:
+        raw = load_vectors(0, 0) * np.asarray(store.export_norms(), dtype='float32')[:, None]
+
+    unit, norms = normalize_vectors(raw)
+    queries = sample_queries(raw, args.queries)
+    k = min(args.k, len(raw))
+    print(f"📊 {len(raw):,} vectors × {raw.shape[1]} dims, {len(queries)} queries, k={k}")
+
+    raw_index, _ = build_index(raw, raw.shape[1], "flat")
+    unit_index, _ = build_index(unit, unit.shape[1], "flat")
+    raw_found, raw_ms = timed_search(raw_index, queries, k)
+
+    start = time.perf_counter()
+    unit_queries, _ = normalize_vectors(queries)
+    normalize_ms = (time.perf_counter() - start) * 1000 / len(queries)
+    cos_found, cos_ms = timed_search(unit_index, unit_queries, k)
+
+    # Share of hits taken by the 10% longest vectors (typically the longest chunks)
+    long_ids = set(np.argsort(norms)[-max(len(norms) // 10, 1):].tolist())
+    def long_share(found):
+        return sum(1 for row in found for i in row if i in long_ids) / found.size
+
+    print()
+    print(f"{'search':<18} {'ms/query':>9} {'top-k = cosine':>15} {'hits on longest 10%':>20}")
+    print("-" * 66)
+    print(f"{'raw inner product':<18} {raw_ms:>9.3f} {recall_at_k(cos_found, raw_found):>15.3f} "
+          f"{long_share(raw_found):>20.3f}")
+    print(f"{'cosine (unit)':<18} {cos_ms + normalize_ms:>9.3f} {1.0:>15.3f} "
+          f"{long_share(cos_found):>20.3f}")
+    print(f"\n🔢 Query normalization adds {normalize_ms * 1000:.1f} µs per query; "
+          f"stored vectors are normalized once at ingest.")
+
+
+SYNTHETIC_WORDS = ("policy contract invoice refund warranty shipping engine motor filter "
+                   "battery alpha beta gamma delta report section total amount").split()
+
+
+def write_synthetic_pdf(path, num_pages, lines_per_page=50, seed=0):
+    """Write a plain-text PDF of `num_pages` pages of random words"""
+    rng = np.random.default_rng(seed)
+    words = np.array(SYNTHETIC_WORDS)
+    objects = ["<< /Type /Catalog /Pages 2 0 R >>", None,
+               "<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>"]
+    page_ids = []
+    for page in range(num_pages):
+        lines = [f"Page {page + 1}."] + [
+            " ".join(rng.choice(words, 12)).capitalize() + "." for _ in range(lines_per_page)]
+        stream = "BT /F1 10 Tf 12 TL 40 800 Td " + " ".join(f"({line}) '" for line in lines) + " ET"
+        objects.append(f"<< /Length {len(stream)} >>\nstream\n{stream}\nendstream")
+        objects.append(f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 842] "
+                       f"/Resources << /Font << /F1 3 0 R >> >> /Contents {len(objects)} 0 R >>")
+        page_ids.append(len(objects))
+    objects[1] = f"<< /Type /Pages /Kids [{' '.join(f'{i} 0 R' for i in page_ids)}] /Count {num_pages} >>"
+
+    with open(path, "wb") as f:
+        f.write(b"%PDF-1.4\n")
+        offsets = []
+        for number, body in enumerate(objects, start=1):
+            offsets.append(f.tell())
+            f.write(f"{number} 0 obj\n{body}\nendobj\n".encode("latin-1"))
+        xref = f.tell()
+        f.write(f"xref\n0 {len(objects) + 1}\n0000000000 65535 f \n".encode("latin-1"))
+        for offset in offsets:
+            f.write(f"{offset:010d} 00000 n \n".encode("latin-1"))
+        f.write(f"trailer\n<< /Size {len(objects) + 1} /Root 1 0 R >>\n"
+                f"startxref\n{xref}\n%%EOF\n".encode("latin-1"))
+
+
+def synthetic_store(num_chunks, dim, seed=0):
+    """A throwaway store of `num_chunks` random chunks, each with a unique identifier"""
+    rng = np.random.default_rng(seed)
+    vocabulary = np.array([f"w{i}" for i in range(5000)])
+    # Zipf-like word frequencies, as in natural text
+    weights = 1 / np.arange(1, len(vocabulary) + 1)
+    weights /= weights.sum()
+    texts = [" ".join(rng.choice(vocabulary, 80, p=weights)) + f" Part ERR-{i:06d}."
+             for i in range(num_chunks)]
+    metadata = [{"filename": "synthetic.pdf", "page_number": i // 4 + 1, "start_pos": 0}
+                for i in range(num_chunks)]
+    synthetic = VectorStore(db_dir=tempfile.mkdtemp())
+    synthetic.append(load_vectors(num_chunks, dim, seed), texts, metadata, "synthetic.pdf",
+                     num_chunks // 4 + 1, dim)
+    return synthetic
+
+
+def benchmark_hybrid(args):
+    """Latency and source-chunk recall of dense, lexical and hybrid retrieval"""
+    if args.synthetic:
+        bench_store = synthetic_store(args.synthetic, app_config.get_embedding_dimension())
+    else:
+        bench_store = store
+    snapshot = bench_store.snapshot()
+    if snapshot is None:
+        raise SystemExit("❌ Vector database is empty. Upload PDFs first or pass --synthetic N.")
+
+    # Each query is drawn from one chunk: a vector near its embedding, plus
+    # its identifier (synthetic) or a few of its words
+    vectors = np.ascontiguousarray(bench_store.export_vectors(snapshot), dtype='float32')
+    rng = np.random.default_rng(0)
+    picks = rng.integers(0, len(vectors), args.queries)
+    queries = sample_queries(vectors, args.queries)
+    texts = [segment["chunks"].get_text(i) for segment in snapshot["segments"]
+             for i in range(segment["index"].ntotal)]
+    query_texts = []
+    for pick in picks:
+        words = texts[pick].split()
+        sample = [words[-1]] if args.synthetic else list(rng.choice(words, min(4, len(words))))
+        query_texts.append(" ".join(sample))
+    k = min(args.k, len(vectors))
+    print(f"📊 {len(vectors):,} chunks in {len(snapshot['segments'])} segment(s), "
+          f"{len(picks)} queries, k={k}")
+
+    print()
+    print(f"{'mode':<8} {'ms/query':>9} {'p95 ms':>7} {'source in top-k':>16}")
+    print("-" * 44)
+    for mode in RETRIEVAL_MODES:
+        timings, found = [], 0
+        for pick, vector, text in zip(picks, queries, query_texts):
+            start = time.perf_counter()
+            # Retrieval only: no similarity threshold or MMR re-ranking
+            hits = bench_store.search(vector[None, :], k, snapshot=snapshot, query_texts=[text],
+                                      mode=mode, min_score=-1, mmr_lambda=1)[0]
+            timings.append((time.perf_counter() - start) * 1000)
+            found += any(hit["text"] == texts[pick] for hit in hits)
+        print(f"{mode:<8} {np.mean(timings):>9.3f} {np.percentile(timings, 95):>7.3f} "
+              f"{found / len(picks):>16.3f}")
+    print(f"\n🔀 Hybrid fuses the top {max(k, app_config.HYBRID_CANDIDATES)} of each retriever "
+          f"(RRF_K={app_config.RRF_K}).")
+
+
+def stress_writer(db_dir, writer, documents, chunks, dim, compact_segments=None,
+                  writer_store=None):
+    """
+    Append `documents` synthetic documents through `writer_store`, or through
+    a store of its own (as in a worker process)
+    """
+    rng = np.random.default_rng(writer)
+    writer_store = writer_store or VectorStore(db_dir=db_dir, compact_segments=compact_segments)
+    for n in range(documents):
+        filename = f"writer{writer}-doc{n}.pdf"
+        texts = [f"Chunk {i} of {filename} DOC-{writer}-{n}" for i in range(chunks)]
+        metadata = [{"filename": filename, "page_number": i + 1, "start_pos": 0}
+                    for i in range(chunks)]
+        writer_store.append(rng.normal(size=(chunks, dim)).astype('float32'), texts, metadata,
+                            filename, chunks, dim)
+    # Let a background compaction finish instead of abandoning it half-written
+    while writer_store.get_stats()["compacting"]:
+        time.sleep(0.05)
+
+
+def benchmark_stress(args):
+    """Parallel appends and searches on one store; verifies every append survived"""
+    db_dir = tempfile.mkdtemp()
+    dim = 32
+    bench_store = VectorStore(db_dir=db_dir, compact_segments=args.compact_segments)
+    bench_store.load()
+    expected = args.writers * args.documents
+    print(f"📊 {args.writers} writer {'processes' if args.processes else 'threads'} × "
+          f"{args.documents} documents × {args.chunks} chunks, {args.readers} reader threads")
+
+    stop = threading.Event()
+    timings, errors, regressions = [], [], []
+
+    def reader(seed):
+        rng = np.random.default_rng(1000 + seed)
+        last_total = 0
+        while not stop.is_set():
+            start = time.perf_counter()
+            try:
+                snapshot = bench_store.snapshot()
+                if snapshot is None:
+                    continue
+                bench_store.search(rng.normal(size=(1, dim)).astype('float32'), 3,
+                                   snapshot=snapshot, query_texts=["DOC"], mode="hybrid")
+                # Appends only add chunks, so a reader must never see the total go down
+                if snapshot["total_chunks"] < last_total:
+                    regressions.append((last_total, snapshot["total_chunks"]))
+                last_total = snapshot["total_chunks"]
+            except Exception as e:
+                errors.append(repr(e))
+            timings.append((time.perf_counter() - start) * 1000)
+
+    readers = [threading.Thread(target=reader, args=(i,)) for i in range(args.readers)]
+    for thread in readers:
+        thread.start()
+
+    start = time.perf_counter()
+    if args.processes:
+        context = multiprocessing.get_context("spawn")
+        writers = [context.Process(target=stress_writer,
+                                   args=(db_dir, w, args.documents, args.chunks, dim,
+                                         args.compact_segments))
+                   for w in range(args.writers)]
+    else:
+        # Threads share the store, like the server's upload jobs
+        writers = [threading.Thread(target=stress_writer,
+                                    args=(db_dir, w, args.documents, args.chunks, dim,
+                                          args.compact_segments, bench_store))
+                   for w in range(args.writers)]
+    for writer in writers:
+        writer.start()
+    for writer in writers:
+        writer.join()
+    write_s = time.perf_counter() - start
+    stop.set()
+    for thread in readers:
+        thread.join()
+
+    # A fresh store sees exactly what is on disk
+    reopened = VectorStore(db_dir=db_dir)
+    snapshot = reopened.snapshot()
+    documents = snapshot["documents"] if snapshot else {}
+    lost = [f"writer{w}-doc{n}.pdf" for w in range(args.writers) for n in range(args.documents)
+            if documents.get(f"writer{w}-doc{n}.pdf", {}).get("chunks") != args.chunks]
+    stats = reopened.get_stats()
+
+    print()
+    print(f"✍️  {expected} appends in {write_s:.2f}s ({expected / write_s:.1f}/s), "
+          f"manifest version {stats['version']}, {stats['segments']} segment(s)")
+    if timings:
+        print(f"🔎 {len(timings)} searches, p50 {np.percentile(timings, 50):.2f} ms, "
+              f"p95 {np.percentile(timings, 95):.2f} ms, {len(errors)} error(s)")
+    print(f"📦 {len(documents)}/{expected} documents and "
+          f"{stats['resident_vectors']}/{expected * args.chunks} chunks on disk")
+    for error in errors[:5]:
+        print(f"❌ Search error: {error}")
+    if regressions:
+        print(f"❌ Readers saw the chunk total go down {len(regressions)} time(s)")
+    if lost or errors or regressions:
+        raise SystemExit(f"❌ Lost or incomplete documents: {', '.join(lost[:10]) or 'none'}")
+    print("✅ No lost appends")
+
+
+def benchmark_extraction(args):
+    """Pages/sec and time to first page of each PDF backend, serial vs process pool"""
+    if args.pdf:
+        pdf_path = args.pdf
+    else:
+        pdf_path = os.path.join(tempfile.mkdtemp(), "synthetic.pdf")
+        write_synthetic_pdf(pdf_path, args.pages)
+    total_pages = pdf_extractor.page_count(pdf_path)
+    print(f"📄 {pdf_path}: {total_pages} pages, {app_config.PDF_PAGES_PER_TASK} pages per task")
+
+    rows = []
+    for backend in pdf_extractor.PDF_BACKENDS:
+        for workers in args.workers:
+            if workers > 1:
+                # Start the worker processes first so start-up is not counted
+                pool = pdf_extractor._get_pool(workers)
+                list(pool.map(pdf_extractor.page_count, [pdf_path] * workers))
+            start = time.perf_counter()
+            first_page_s = None
+            chars = 0
+            try:
+                for _, text in pdf_extractor.extract_pages(pdf_path, backend, workers):
+                    first_page_s = first_page_s or time.perf_counter() - start
+                    chars += len(text)
+            except ImportError:
+                print(f"⚠️  Skipping {backend}: not installed")
+                break
+            elapsed = time.perf_counter() - start
+            rows.append((backend, workers, elapsed, total_pages / elapsed, first_page_s * 1000, chars))
+    pdf_extractor.shutdown()
+
+    serial = {backend: elapsed for backend, workers, elapsed, *_ in rows if workers == 1}
+    print()
+    print(f"{'backend':<10} {'workers':>7} {'seconds':>8} {'pages/s':>8} {'speedup':>8} "
+          f"{'1st page ms':>12} {'chars':>10}")
+    print("-" * 70)
+    for backend, workers, elapsed, pages_s, first_ms, chars in rows:
+        speedup = f"{serial[backend] / elapsed:>7.1f}x" if backend in serial else f"{'-':>8}"
+        print(f"{backend:<10} {workers:>7} {elapsed:>8.2f} {pages_s:>8.1f} {speedup} "
+              f"{first_ms:>12.1f} {chars:>10,}")
+
+
+def benchmark_embedding(args):
+    config = app_config.get_api_config()
+    # Unseeded, so a provider's own cache cannot answer from an earlier run
+    rng = np.random.default_rng()
+    texts = [" ".join(rng.choice(SYNTHETIC_WORDS, args.words)) for _ in range(args.texts)]
+    print(f"📊 {config['api_type']} embeddings ({config['embedding_model']}, "
+          f"{config['embedding_dim']} dims), {len(texts)} texts of {args.words} words")
+
+    rows = []
+    for batch_size in args.batch_sizes:
+        start = time.perf_counter()
+        for i in range(0, len(texts), batch_size):
+            embed_batch(texts[i:i + batch_size], config)
+        elapsed = time.perf_counter() - start
+        rows.append((batch_size, elapsed, len(texts) / elapsed))
+
+    print()
+    print(f"{'batch':>6} {'seconds':>8} {'texts/s':>9} {'speedup':>8}")
+    print("-" * 34)
+    for batch_size, elapsed, rate in rows:
+        print(f"{batch_size:>6} {elapsed:>8.2f} {rate:>9.1f} {rate / rows[0][2]:>7.1f}x")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="RAG vector store benchmarks")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    ann = subparsers.add_parser("ann", help="recall vs latency of each index type against flat")
+    ann.add_argument("--k", type=int, default=10)
+    ann.add_argument("--queries", type=int, default=200)
+    ann.add_argument("--synthetic", type=int, default=0)
+    ann.set_defaults(func=benchmark_ann)
+
+    quantization = subparsers.add_parser("quantization",
+                                         help="memory saved vs recall lost by the compressed index types")
+    quantization.add_argument("--k", type=int, default=10)
+    quantization.add_argument("--queries", type=int, default=200)
+    quantization.add_argument("--synthetic", type=int, default=0)
+    quantization.add_argument("--rerank", type=int, nargs="+", default=[1, 2, 4, 8],
+                              help="candidates re-scored with float vectors, as multiples of k")
+    quantization.set_defaults(func=benchmark_quantization)
+
+    normalization = subparsers.add_parser("normalization",
+                                          help="raw inner product vs cosine top-k results")
+    normalization.add_argument("--k", type=int, default=3)
+    normalization.add_argument("--queries", type=int, default=200)
+    normalization.add_argument("--synthetic", type=int, default=0)
+    normalization.set_defaults(func=benchmark_normalization)
+
+    extraction = subparsers.add_parser("extraction",
+                                       help="PDF text extraction throughput per backend and worker count")
+    extraction.add_argument("--pdf", help="PDF to extract (default: a synthetic PDF)")
+    extraction.add_argument("--pages", type=int, default=400)
+    extraction.add_argument("--workers", type=int, nargs="+",
+                            default=[1, app_config.PDF_WORKERS or os.cpu_count() or 1])
+    extraction.set_defaults(func=benchmark_extraction)
+
+    hybrid = subparsers.add_parser("hybrid",
+                                   help="latency and recall of dense, lexical and hybrid retrieval")
+    hybrid.add_argument("--k", type=int, default=3)
+    hybrid.add_argument("--queries", type=int, default=200)
+    hybrid.add_argument("--synthetic", type=int, default=0)
+    hybrid.set_defaults(func=benchmark_hybrid)
+
+    stress = subparsers.add_parser("stress",
+                                   help="parallel uploads and searches; checks that none are lost")
+    stress.add_argument("--writers", type=int, default=4)
+    stress.add_argument("--processes", action="store_true",
+                        help="run the writers as separate processes instead of threads")
+    stress.add_argument("--documents", type=int, default=10, help="documents per writer")
+    stress.add_argument("--chunks", type=int, default=50, help="chunks per document")
+    stress.add_argument("--readers", type=int, default=4)
+    stress.add_argument("--compact-segments", type=int, default=4)
+    stress.set_defaults(func=benchmark_stress)
+
+    embedding = subparsers.add_parser("embedding",
+                                      help="embeddings/sec of the configured API per batch size")
+    embedding.add_argument("--texts", type=int, default=256)
+    embedding.add_argument("--words", type=int, default=100, help="words per text")
+    embedding.add_argument("--batch-sizes", type=int, nargs="+", default=[1, 8, 32, 64])
+    embedding.set_defaults(func=benchmark_embedding)
+
+    args = parser.parse_args()
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,135 @@
+"""
+Chunk Store Module
+Columnar, memory-mapped storage for chunk texts and metadata.
+
+A chunk store is three files sharing a prefix:
+
+    <prefix>.offsets.npy   # uint64[n + 1] byte offsets into the text blob
+    <prefix>.text.bin      # all chunk texts, UTF-8, back to back
+    <prefix>.meta.npy      # fixed-width metadata records, one per chunk
+
+All three are opened with mmap, so opening a store is near-instant and a
+lookup only touches the pages holding the requested chunks.
+"""
+import os
+import numpy as np
+
+METADATA_DTYPE = np.dtype([
+    ('start_pos', '<i8'),
+    ('page', '<i4'),
+    ('file_id', '<i4')
+])
+
+SUFFIXES = (".offsets.npy", ".text.bin", ".meta.npy")
+
+
+class ChunkStore:
+    """Read-only view of one chunk store; `files` maps file_id to filename"""
+
+    def __init__(self, prefix, files):
+        self.prefix = prefix
+        self.files = list(files)
+        self._offsets = np.load(prefix + ".offsets.npy", mmap_mode='r')
+        self._meta = np.load(prefix + ".meta.npy", mmap_mode='r')
+        if os.path.getsize(prefix + ".text.bin") > 0:
+            self._text = np.memmap(prefix + ".text.bin", dtype=np.uint8, mode='r')
+        else:
+            # mmap cannot map an empty file
+            self._text = np.zeros(0, dtype=np.uint8)
+
+    def __len__(self):
+        return len(self._offsets) - 1
+
+    def get_text(self, i):
+        start, end = int(self._offsets[i]), int(self._offsets[i + 1])
+        return bytes(self._text[start:end]).decode('utf-8')
+
+    def get_metadata(self, i):
+        record = self._meta[i]
+        metadata = {
+            'start_pos': int(record['start_pos']),
+            'page_number': int(record['page'])
+        }
+        if record['file_id'] >= 0:
+            metadata['filename'] = self.files[record['file_id']]
+        return metadata
+
+    def iter_texts(self):
+        for i in range(len(self)):
+            yield self.get_text(i)
+
+    def document_runs(self):
+        """(file_id, start, end, highest page) for each run of consecutive chunks of one file"""
+        file_ids = np.asarray(self._meta['file_id'])
+        if len(file_ids) == 0:
+            return []
+        bounds = np.concatenate([[0], np.flatnonzero(np.diff(file_ids)) + 1, [len(file_ids)]])
+        pages = np.asarray(self._meta['page'])
+        return [(int(file_ids[start]), int(start), int(end), int(pages[start:end].max()))
+                for start, end in zip(bounds[:-1], bounds[1:])]
+
+    @staticmethod
+    def write(prefix, chunks, metadata, files):
+        """Write chunk texts and metadata dicts; filenames must appear in `files`"""
+        file_ids = {name: i for i, name in enumerate(files)}
+        encoded = [chunk.encode('utf-8') for chunk in chunks]
+
+        offsets = np.zeros(len(encoded) + 1, dtype='<u8')
+        np.cumsum([len(b) for b in encoded], out=offsets[1:])
+
+        records = np.zeros(len(metadata), dtype=METADATA_DTYPE)
+        for i, meta in enumerate(metadata):
+            records[i]['start_pos'] = meta.get('start_pos', 0)
+            # Chunks from before page-exact chunking only have an estimated page
+            records[i]['page'] = meta.get('page_number', meta.get('estimated_page', 0))
+            records[i]['file_id'] = file_ids.get(meta.get('filename'), -1)
+
+        with open(prefix + ".text.bin", "wb") as f:
+            for b in encoded:
+                f.write(b)
+        np.save(prefix + ".offsets.npy", offsets)
+        np.save(prefix + ".meta.npy", records)
+        return ChunkStore(prefix, files)
+
+    @staticmethod
+    def merge(prefix, stores, files, keeps=None):
+        """
+        Concatenate several stores into a new one without decoding any text.
+        `keeps` optionally gives each store a boolean mask of the chunks to copy
+        (None copies all of them).
+        """
+        file_ids = {name: i for i, name in enumerate(files)}
+        offsets = [np.zeros(1, dtype='<u8')]
+        records = []
+        base = 0
+
+        with open(prefix + ".text.bin", "wb") as f:
+            for store, keep in zip(stores, keeps or [None] * len(stores)):
+                store_offsets = np.asarray(store._offsets, dtype='<u8')
+                lengths = np.diff(store_offsets)
+                if keep is None:
+                    f.write(store._text.tobytes())
+                else:
+                    # Copy each run of kept chunks in one write
+                    kept = np.flatnonzero(keep)
+                    for run in np.split(kept, np.flatnonzero(np.diff(kept) != 1) + 1):
+                        if len(run):
+                            f.write(store._text[store_offsets[run[0]]:
+                                                store_offsets[run[-1] + 1]].tobytes())
+                    lengths = lengths[keep]
+                offsets.append(np.cumsum(lengths, dtype='<u8') + base)
+                base += int(lengths.sum())
+
+                remap = np.array([file_ids[name] for name in store.files] + [-1], dtype='<i4')
+                store_records = np.array(store._meta if keep is None else store._meta[keep])
+                store_records['file_id'] = remap[store_records['file_id']]
+                records.append(store_records)
+
+        np.save(prefix + ".offsets.npy", np.concatenate(offsets))
+        np.save(prefix + ".meta.npy", np.concatenate(records) if records
+                else np.zeros(0, dtype=METADATA_DTYPE))
+        return ChunkStore(prefix, files)
+
+    @staticmethod
+    def exists(prefix):
+        return all(os.path.exists(prefix + suffix) for suffix in SUFFIXES)
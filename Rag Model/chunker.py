@@ -0,0 +1,115 @@
+"""
+Chunker Module
+Splits PDF text into chunks page by page, on sentence and paragraph boundaries.
+
+Pages are consumed one at a time from any iterable of (page_number, text), so
+the whole document is never held as a single string and every chunk carries
+the exact page it came from. Chunks never span pages.
+
+A chunk is at most CHUNK_SIZE characters and EMBEDDING_MAX_TOKENS tokens, and
+repeats up to CHUNK_OVERLAP characters of trailing sentences from the previous
+chunk on the same page (capped at the same share of the token limit).
+Sentences longer than a whole chunk are split on whitespace.
+"""
+import re
+import config as app_config
+from tokens import count_tokens
+
+PARAGRAPH_PATTERN = re.compile(r'\S(?:.*?\S)?(?=\s*\n\s*\n|\s*\Z)', re.S)
+SENTENCE_BREAK_PATTERN = re.compile(r'(?<=[.!?])["\')\]]*\s+')
+
+
+def chunk_pages(pages, chunk_size=None, overlap=None, max_tokens=None, model=None):
+    """
+    Yield (chunk_text, metadata) for each chunk of `pages`.
+    metadata holds 'page_number' and 'start_pos' (character offset within the page).
+    `model` selects the tokenizer used for the token limit.
+    """
+    chunk_size = chunk_size or app_config.CHUNK_SIZE
+    overlap = app_config.CHUNK_OVERLAP if overlap is None else overlap
+    max_tokens = max_tokens or app_config.EMBEDDING_MAX_TOKENS
+    if overlap >= chunk_size:
+        raise ValueError("CHUNK_OVERLAP must be smaller than CHUNK_SIZE")
+
+    for page_number, text in pages:
+        for start, end in _pack(text, chunk_size, overlap, max_tokens, model):
+            yield text[start:end], {'page_number': page_number, 'start_pos': start}
+
+
+def _pack(text, chunk_size, overlap, max_tokens, model):
+    """Group a page's sentence spans into chunk spans"""
+    current = []  # [(start, end, tokens)]
+    tokens = 0
+
+    for start, end, paragraph_start in _sentences(text, chunk_size, max_tokens, model):
+        sentence_tokens = count_tokens(text[start:end], model)
+        if current:
+            fits = (end - current[0][0] <= chunk_size and
+                    tokens + sentence_tokens <= max_tokens)
+            # Prefer ending a chunk at a paragraph break once it is half full
+            para_break = paragraph_start and current[-1][1] - current[0][0] >= chunk_size // 2
+            if not fits or para_break:
+                yield current[0][0], current[-1][1]
+                current = _overlap_tail(current, overlap, max_tokens * overlap // chunk_size)
+                tokens = sum(t for _, _, t in current)
+                # The carried sentences must still leave room for this one
+                while current and (end - current[0][0] > chunk_size or
+                                   tokens + sentence_tokens > max_tokens):
+                    tokens -= current.pop(0)[2]
+        current.append((start, end, sentence_tokens))
+        tokens += sentence_tokens
+
+    if current:
+        yield current[0][0], current[-1][1]
+
+
+def _overlap_tail(spans, overlap, overlap_tokens):
+    """Trailing spans within `overlap` characters and `overlap_tokens`, never all of them"""
+    tail = []
+    tokens = 0
+    for span in reversed(spans[1:]):
+        tokens += span[2]
+        if spans[-1][1] - span[0] > overlap or tokens > overlap_tokens:
+            break
+        tail.insert(0, span)
+    return tail
+
+
+def _sentences(text, chunk_size, max_tokens, model):
+    """Yield (start, end, starts_paragraph) for each sentence of `text`"""
+    for paragraph in PARAGRAPH_PATTERN.finditer(text):
+        start = paragraph.start()
+        first = True
+        for match in SENTENCE_BREAK_PATTERN.finditer(text, paragraph.start(), paragraph.end()):
+            for span in _split_long(text, start, match.start(), chunk_size, max_tokens, model):
+                yield span + (first,)
+                first = False
+            start = match.end()
+        for span in _split_long(text, start, paragraph.end(), chunk_size, max_tokens, model):
+            yield span + (first,)
+            first = False
+
+
+def _split_long(text, start, end, chunk_size, max_tokens, model):
+    """Split a span that is too long for one chunk at whitespace"""
+    if end - start <= chunk_size and count_tokens(text[start:end], model) <= max_tokens:
+        yield start, end
+        return
+
+    limit = min(end - start, chunk_size)
+    cut = text.rfind(' ', start + 1, start + limit)
+    if cut <= start:
+        cut = start + limit
+    if count_tokens(text[start:cut], model) > max_tokens:
+        # Dense text (e.g. no spaces): halve until the piece fits the token limit
+        cut = start + max(1, (cut - start) // 2)
+    piece_end = cut
+    while piece_end > start + 1 and text[piece_end - 1].isspace():
+        piece_end -= 1
+    yield from _split_long(text, start, piece_end, chunk_size, max_tokens, model)
+
+    rest = cut
+    while rest < end and text[rest].isspace():
+        rest += 1
+    if rest < end:
+        yield from _split_long(text, rest, end, chunk_size, max_tokens, model)
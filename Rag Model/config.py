@@ -1,6 +1,6 @@
 """
 API Configuration for RAG System
-Supports: OpenAI, Ollama, and other APIs
+Supports: OpenAI, Ollama, and local in-process embeddings
 """
 import os
 from dotenv import load_dotenv
@@ -9,7 +9,7 @@ from dotenv import load_dotenv
 load_dotenv()
 
 # API Selection - Change this to switch between APIs
-API_TYPE = os.getenv('API_TYPE', 'ollama')  # Options: "openai", "ollama"
+API_TYPE = os.getenv('API_TYPE', 'ollama')  # Options: "openai", "ollama", "local"
 
 # ========== OLLAMA Configuration ==========
 OLLAMA_BASE_URL = os.getenv('OLLAMA_BASE_URL', 'http://localhost:11434')
@@ -21,7 +21,18 @@ OPENAI_API_KEY = os.getenv('OPENAI_API_KEY', '')
 OPENAI_EMBEDDING_MODEL = os.getenv('OPENAI_EMBEDDING_MODEL', 'text-embedding-ada-002')
 OPENAI_CHAT_MODEL = os.getenv('OPENAI_CHAT_MODEL', 'gpt-3.5-turbo')
 
+# ========== Local Configuration ==========
+# API_TYPE=local embeds in-process on CPU (sentence-transformers, no network);
+# answers are still generated by LOCAL_CHAT_API ("ollama" or "openai")
+LOCAL_EMBEDDING_MODEL = os.getenv('LOCAL_EMBEDDING_MODEL', 'BAAI/bge-small-en-v1.5')
+# Inference runtime: "torch" or "onnx" (ONNX Runtime)
+LOCAL_EMBEDDING_BACKEND = os.getenv('LOCAL_EMBEDDING_BACKEND', 'torch')
+# Texts per forward pass of the model
+LOCAL_EMBEDDING_BATCH_SIZE = int(os.getenv('LOCAL_EMBEDDING_BATCH_SIZE', '32'))
+LOCAL_CHAT_API = os.getenv('LOCAL_CHAT_API', 'ollama')
+
 # ========== Embedding Dimensions ==========
+# API_TYPE=local reads the dimension from its model instead
 EMBEDDING_DIMENSIONS = {
     "openai": 1536,
     "ollama": 768,  # nomic-embed-text uses 768 dimensions
@@ -30,26 +41,161 @@ EMBEDDING_DIMENSIONS = {
 # ========== Chunking Configuration ==========
 CHUNK_SIZE = int(os.getenv('CHUNK_SIZE', '500'))
 CHUNK_OVERLAP = int(os.getenv('CHUNK_OVERLAP', '100'))
+# Token limit per chunk; keep it within the embedding model's context window
+EMBEDDING_MAX_TOKENS = int(os.getenv('EMBEDDING_MAX_TOKENS', '512'))
+
+# ========== PDF Extraction ==========
+# Text extraction backend: pypdf2, pypdfium2 or pdfminer
+PDF_BACKEND = os.getenv('PDF_BACKEND', 'pypdf2')
+# Worker processes for page extraction (0 = one per CPU)
+PDF_WORKERS = int(os.getenv('PDF_WORKERS', '0'))
+# Documents (or batches) with fewer pages are extracted in-process
+PDF_PARALLEL_MIN_PAGES = int(os.getenv('PDF_PARALLEL_MIN_PAGES', '64'))
+# Pages handed to a worker at a time
+PDF_PAGES_PER_TASK = int(os.getenv('PDF_PAGES_PER_TASK', '8'))
+
+# ========== Background Jobs ==========
+# SQLite job table for background PDF ingestion
+JOBS_DB_PATH = os.getenv('JOBS_DB_PATH', 'jobs.db')
+# Uploads processed at the same time
+INGEST_WORKERS = int(os.getenv('INGEST_WORKERS', '2'))
+
+# ========== Provider Clients ==========
+# Seconds to connect to / wait for a response from the embedding and chat APIs
+PROVIDER_CONNECT_TIMEOUT = float(os.getenv('PROVIDER_CONNECT_TIMEOUT', '5'))
+PROVIDER_READ_TIMEOUT = float(os.getenv('PROVIDER_READ_TIMEOUT', '120'))
+# Retries for connection errors and 502/503/504 responses (rate limits are retried separately)
+PROVIDER_RETRIES = int(os.getenv('PROVIDER_RETRIES', '2'))
+# The same retries for chat requests; a failed generation may still have run and
+# been billed, so they are off by default
+CHAT_RETRIES = int(os.getenv('CHAT_RETRIES', '0'))
+# Keep-alive connections per provider host; keep it at least EMBEDDING_WORKERS
+PROVIDER_POOL_SIZE = int(os.getenv('PROVIDER_POOL_SIZE', '16'))
+
+# ========== Embedding Batching & Concurrency ==========
+# Number of chunks sent per embedding request (1 disables batching)
+EMBEDDING_BATCH_SIZE = int(os.getenv('EMBEDDING_BATCH_SIZE', '64'))
+# Number of embedding requests kept in flight during ingestion
+EMBEDDING_WORKERS = int(os.getenv('EMBEDDING_WORKERS', '4'))
+# Retries for rate-limited (HTTP 429) embedding requests
+EMBEDDING_MAX_RETRIES = int(os.getenv('EMBEDDING_MAX_RETRIES', '5'))
+
+# ========== Embedding Cache ==========
+# Embeddings are cached by hash of model + text, in memory and in SQLite
+EMBEDDING_CACHE_ENABLED = os.getenv('EMBEDDING_CACHE_ENABLED', 'true').lower() == 'true'
+EMBEDDING_CACHE_PATH = os.getenv('EMBEDDING_CACHE_PATH', 'embedding_cache.db')
+EMBEDDING_CACHE_MAX_ENTRIES = int(os.getenv('EMBEDDING_CACHE_MAX_ENTRIES', '200000'))
+EMBEDDING_CACHE_MEMORY_ENTRIES = int(os.getenv('EMBEDDING_CACHE_MEMORY_ENTRIES', '10000'))
+
+# Prompt budget: the chat model's context window (Ollama is run with this num_ctx),
+# tokens kept free for the answer, and the most the chat history may take
+CONTEXT_WINDOW_TOKENS = int(os.getenv('CONTEXT_WINDOW_TOKENS', '8192'))
+ANSWER_RESERVE_TOKENS = int(os.getenv('ANSWER_RESERVE_TOKENS', '1024'))
+HISTORY_MAX_TOKENS = int(os.getenv('HISTORY_MAX_TOKENS', '2000'))
+
+# Answer cache: reuse answers to repeated and near-duplicate questions
+ANSWER_CACHE_ENABLED = os.getenv('ANSWER_CACHE_ENABLED', 'true').lower() == 'true'
+ANSWER_CACHE_MAX_ENTRIES = int(os.getenv('ANSWER_CACHE_MAX_ENTRIES', '1000'))
+ANSWER_CACHE_TTL = int(os.getenv('ANSWER_CACHE_TTL', '3600'))
+ANSWER_CACHE_SIMILARITY = float(os.getenv('ANSWER_CACHE_SIMILARITY', '0.95'))
+
+# ========== Batch Questions ==========
+# Most questions one /api/ask/batch request may send
+ASK_BATCH_MAX_QUESTIONS = int(os.getenv('ASK_BATCH_MAX_QUESTIONS', '500'))
+# Answers generated at the same time per batch; keep PROVIDER_POOL_SIZE at least this
+ASK_BATCH_CONCURRENCY = int(os.getenv('ASK_BATCH_CONCURRENCY', '4'))
+
+# ========== Vector Store ==========
+# Directory holding the segment files and manifest
+VECTOR_DB_DIR = os.getenv('VECTOR_DB_DIR', 'vector_db')
+# Merge segments in the background once there are this many
+COMPACT_SEGMENTS = int(os.getenv('COMPACT_SEGMENTS', '8'))
+
+# ========== Vector Index ==========
+# Index type per segment: "flat", "ivf_flat", "ivf_pq", "hnsw",
+# or the compressed flat scans "fp16", "sq8" and "binary"
+INDEX_TYPE = os.getenv('INDEX_TYPE', 'flat')
+# Segments smaller than this stay flat (exact search is fast enough)
+ANN_MIN_VECTORS = int(os.getenv('ANN_MIN_VECTORS', '1000'))
+# IVF quantizers are trained on the first N vectors of a segment
+INDEX_TRAIN_SIZE = int(os.getenv('INDEX_TRAIN_SIZE', '50000'))
+# IVF lists (0 = about 4 * sqrt(vectors)) and lists probed per search
+IVF_NLIST = int(os.getenv('IVF_NLIST', '0'))
+IVF_NPROBE = int(os.getenv('IVF_NPROBE', '8'))
+# Sub-quantizers for IVF-PQ (must divide the embedding dimension)
+PQ_M = int(os.getenv('PQ_M', '48'))
+# HNSW graph degree and build/search breadth
+HNSW_M = int(os.getenv('HNSW_M', '32'))
+HNSW_EF_CONSTRUCTION = int(os.getenv('HNSW_EF_CONSTRUCTION', '200'))
+HNSW_EF_SEARCH = int(os.getenv('HNSW_EF_SEARCH', '64'))
+# Compressed indexes (ivf_pq, fp16, sq8, binary) fetch k times this many candidates
+# and re-score them with the float vectors; 1 = keep the approximate scores
+QUANTIZED_RERANK_FACTOR = int(os.getenv('QUANTIZED_RERANK_FACTOR', '4'))
+
+# ========== Retrieval ==========
+# "dense" (vectors only), "lexical" (BM25 only) or "hybrid" (both, fused by reciprocal rank)
+RETRIEVAL_MODE = os.getenv('RETRIEVAL_MODE', 'hybrid')
+# Chunks sent to the LLM per question (requests may ask for up to RETRIEVAL_MAX_TOP_K)
+RETRIEVAL_TOP_K = int(os.getenv('RETRIEVAL_TOP_K', '3'))
+RETRIEVAL_MAX_TOP_K = int(os.getenv('RETRIEVAL_MAX_TOP_K', '20'))
+# Chunks less cosine-similar to the question than this are dropped
+RETRIEVAL_MIN_SCORE = float(os.getenv('RETRIEVAL_MIN_SCORE', '0.0'))
+# Maximal Marginal Relevance: 1 = rank by relevance only, lower = prefer chunks
+# unlike those already picked; re-ranks the top MMR_CANDIDATES
+MMR_LAMBDA = float(os.getenv('MMR_LAMBDA', '0.7'))
+MMR_CANDIDATES = int(os.getenv('MMR_CANDIDATES', '20'))
+# Candidates each retriever contributes to the fusion
+HYBRID_CANDIDATES = int(os.getenv('HYBRID_CANDIDATES', '20'))
+# Reciprocal-rank fusion: score = sum of weight / (RRF_K + rank)
+RRF_K = int(os.getenv('RRF_K', '60'))
+HYBRID_DENSE_WEIGHT = float(os.getenv('HYBRID_DENSE_WEIGHT', '1.0'))
+HYBRID_LEXICAL_WEIGHT = float(os.getenv('HYBRID_LEXICAL_WEIGHT', '1.0'))
+# BM25 term-frequency saturation and length normalization
+BM25_K1 = float(os.getenv('BM25_K1', '1.2'))
+BM25_B = float(os.getenv('BM25_B', '0.75'))
+
+# ========== Re-ranking ==========
+# Re-score retrieved chunks with a cross-encoder on CPU (needs sentence-transformers);
+# requests can turn it on or off with "rerank"
+RERANK_ENABLED = os.getenv('RERANK_ENABLED', 'false').lower() == 'true'
+RERANK_MODEL = os.getenv('RERANK_MODEL', 'cross-encoder/ms-marco-MiniLM-L-6-v2')
+# Chunks retrieved for the cross-encoder to pick the top_k from
+RERANK_CANDIDATES = int(os.getenv('RERANK_CANDIDATES', '50'))
+# (question, chunk) pairs per model call, and the tokens of each pair it reads
+RERANK_BATCH_SIZE = int(os.getenv('RERANK_BATCH_SIZE', '16'))
+RERANK_MAX_LENGTH = int(os.getenv('RERANK_MAX_LENGTH', '256'))
+# Time allowed per question; past it fewer chunks are scored or re-ranking is skipped (0 = no limit)
+RERANK_BUDGET_MS = int(os.getenv('RERANK_BUDGET_MS', '300'))
 
 def get_embedding_dimension():
-    """Get the embedding dimension for the selected API"""
+    """Get the embedding dimension for the selected API (loads the model for API_TYPE=local)"""
+    if API_TYPE == "local":
+        from local_embeddings import get_local_embedder
+        return get_local_embedder().dimension
     return EMBEDDING_DIMENSIONS.get(API_TYPE, 1536)
 
 def get_api_config():
     """Get the configuration for the selected API"""
     config = {
         "api_type": API_TYPE,
-        "embedding_dim": get_embedding_dimension()
+        # API_TYPE=local only embeds; its answers come from LOCAL_CHAT_API
+        "chat_api_type": LOCAL_CHAT_API if API_TYPE == "local" else API_TYPE,
+        "embedding_dim": get_embedding_dimension(),
+        "embedding_batch_size": EMBEDDING_BATCH_SIZE,
+        "embedding_workers": EMBEDDING_WORKERS,
+        "embedding_max_retries": EMBEDDING_MAX_RETRIES
     }
     
-    if API_TYPE == "openai":
+    if config["chat_api_type"] == "openai":
         config["api_key"] = OPENAI_API_KEY
         config["embedding_model"] = OPENAI_EMBEDDING_MODEL
         config["chat_model"] = OPENAI_CHAT_MODEL
-    elif API_TYPE == "ollama":
+    elif config["chat_api_type"] == "ollama":
         config["base_url"] = OLLAMA_BASE_URL
         config["embedding_model"] = OLLAMA_EMBEDDING_MODEL
         config["chat_model"] = OLLAMA_CHAT_MODEL
+    if API_TYPE == "local":
+        config["embedding_model"] = LOCAL_EMBEDDING_MODEL
     
     return config
 
@@ -62,5 +208,15 @@ def validate_config():
         print(f"✓ Using Ollama at {OLLAMA_BASE_URL}")
         print(f"✓ Embedding model: {OLLAMA_EMBEDDING_MODEL}")
         print(f"✓ Chat model: {OLLAMA_CHAT_MODEL}")
+    elif API_TYPE == "local":
+        print(f"✓ Embedding model: {LOCAL_EMBEDDING_MODEL} (in-process, {LOCAL_EMBEDDING_BACKEND} on CPU)")
+        if LOCAL_CHAT_API == "openai":
+            if not OPENAI_API_KEY:
+                raise ValueError("OPENAI_API_KEY is not set. Please set it in your environment variables.")
+            print(f"✓ Chat model: {OPENAI_CHAT_MODEL} (OpenAI)")
+        elif LOCAL_CHAT_API == "ollama":
+            print(f"✓ Chat model: {OLLAMA_CHAT_MODEL} (Ollama at {OLLAMA_BASE_URL})")
+        else:
+            raise ValueError(f"Unknown LOCAL_CHAT_API: {LOCAL_CHAT_API}. Use 'openai' or 'ollama'")
     else:
-        raise ValueError(f"Unknown API_TYPE: {API_TYPE}. Use 'openai' or 'ollama'")
+        raise ValueError(f"Unknown API_TYPE: {API_TYPE}. Use 'openai', 'ollama' or 'local'")
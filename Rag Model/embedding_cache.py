@@ -0,0 +1,160 @@
+"""
+Embedding Cache Module
+Content-addressed cache of embeddings: an in-memory LRU in front of a SQLite file
+"""
+import hashlib
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+import numpy as np
+import config as app_config
+
+
+class EmbeddingCache:
+    """
+    Caches vectors keyed by sha256(model + text).
+
+    Lookups hit the in-memory LRU first and then SQLite. The SQLite table is
+    bounded to `max_entries` rows; the least recently used rows are evicted.
+    """
+
+    def __init__(self, path, max_entries=200000, memory_entries=10000):
+        self.path = path
+        self.max_entries = max_entries
+        self.memory_entries = memory_entries
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings ("
+            "key TEXT PRIMARY KEY, dim INTEGER, vector BLOB, last_used REAL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_last_used ON embeddings(last_used)")
+        self._conn.commit()
+        self._disk_entries = self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @staticmethod
+    def make_key(model, text):
+        return hashlib.sha256(f"{model}\0{text}".encode("utf-8")).hexdigest()
+
+    def get_many(self, model, texts):
+        """Return a list aligned with texts: the cached vector, or None on a miss"""
+        keys = [self.make_key(model, text) for text in texts]
+        results = [None] * len(texts)
+
+        with self._lock:
+            disk_lookups = {}
+            for i, key in enumerate(keys):
+                if key in self._memory:
+                    self._memory.move_to_end(key)
+                    results[i] = self._memory[key]
+                else:
+                    disk_lookups.setdefault(key, []).append(i)
+
+            if disk_lookups:
+                found = self._read_rows(list(disk_lookups))
+                for key, vector in found.items():
+                    for i in disk_lookups[key]:
+                        results[i] = vector
+                    self._remember(key, vector)
+
+            hits = sum(1 for vector in results if vector is not None)
+            self.hits += hits
+            self.misses += len(texts) - hits
+
+        return results
+
+    def put_many(self, model, texts, vectors):
+        """Store vectors for texts, evicting the oldest rows past max_entries"""
+        now = time.time()
+        rows = []
+        with self._lock:
+            for text, vector in zip(texts, vectors):
+                key = self.make_key(model, text)
+                vector = np.asarray(vector, dtype='float32')
+                self._remember(key, vector.tolist())
+                rows.append((key, vector.shape[0], vector.tobytes(), now))
+
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO embeddings (key, dim, vector, last_used) VALUES (?, ?, ?, ?)",
+                rows
+            )
+            self._disk_entries = self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+            overflow = self._disk_entries - self.max_entries
+            if overflow > 0:
+                self._conn.execute(
+                    "DELETE FROM embeddings WHERE key IN "
+                    "(SELECT key FROM embeddings ORDER BY last_used LIMIT ?)",
+                    (overflow,)
+                )
+                self._disk_entries -= overflow
+                self.evictions += overflow
+            self._conn.commit()
+
+    def get_stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "evictions": self.evictions,
+            "memory_entries": len(self._memory),
+            "disk_entries": self._disk_entries,
+            "max_entries": self.max_entries
+        }
+
+    def clear(self):
+        with self._lock:
+            self._memory.clear()
+            self._conn.execute("DELETE FROM embeddings")
+            self._conn.commit()
+            self._disk_entries = 0
+
+    def _read_rows(self, keys):
+        found = {}
+        # Stay well under SQLite's bound-parameter limit
+        for start in range(0, len(keys), 500):
+            batch = keys[start:start + 500]
+            placeholders = ",".join("?" * len(batch))
+            rows = self._conn.execute(
+                f"SELECT key, vector FROM embeddings WHERE key IN ({placeholders})", batch
+            ).fetchall()
+            for key, blob in rows:
+                found[key] = np.frombuffer(blob, dtype='float32').tolist()
+            if rows:
+                self._conn.execute(
+                    f"UPDATE embeddings SET last_used = ? WHERE key IN ({placeholders})",
+                    [time.time()] + batch
+                )
+        if found:
+            self._conn.commit()
+        return found
+
+    def _remember(self, key, vector):
+        self._memory[key] = vector
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_entries:
+            self._memory.popitem(last=False)
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_embedding_cache():
+    """Return the shared cache, or None when EMBEDDING_CACHE_ENABLED is off"""
+    global _cache
+    if not app_config.EMBEDDING_CACHE_ENABLED:
+        return None
+    with _cache_lock:
+        if _cache is None:
+            _cache = EmbeddingCache(
+                app_config.EMBEDDING_CACHE_PATH,
+                max_entries=app_config.EMBEDDING_CACHE_MAX_ENTRIES,
+                memory_entries=app_config.EMBEDDING_CACHE_MEMORY_ENTRIES
+            )
+    return _cache
@@ -0,0 +1,209 @@
+"""
+Embeddings Module
+Turns text into vectors using the configured API, one text or a whole batch at a time
+(API_TYPE=local runs the model in this process, see local_embeddings.py)
+"""
+import time
+from concurrent.futures import ThreadPoolExecutor
+from email.utils import parsedate_to_datetime
+import providers
+from embedding_cache import get_embedding_cache
+from local_embeddings import get_local_embedder
+from providers import get_openai_client, track
+
+# Backends found not to support batch requests (e.g. Ollama older than /api/embed)
+_unbatched_backends = set()
+
+
+class RateLimitError(Exception):
+    """Raised when the embedding backend answers HTTP 429"""
+
+    def __init__(self, message, retry_after=None):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+def parse_retry_after(value):
+    """Parse a Retry-After header (seconds or HTTP date) into seconds"""
+    if not value:
+        return None
+    try:
+        return max(float(value), 0.0)
+    except ValueError:
+        pass
+    try:
+        return max(parsedate_to_datetime(value).timestamp() - time.time(), 0.0)
+    except (TypeError, ValueError):
+        return None
+
+
+def with_backoff(func, config):
+    """
+    Call func(), retrying on rate limits.
+    Waits for Retry-After when the server sends it, otherwise backs off exponentially.
+    """
+    max_retries = config.get("embedding_max_retries", 5)
+    for attempt in range(max_retries + 1):
+        try:
+            return func()
+        except Exception as e:
+            retry_after = _rate_limit_delay(e)
+            if retry_after is None or attempt == max_retries:
+                raise
+            time.sleep(retry_after if retry_after > 0 else min(2 ** attempt, 30))
+
+
+def _rate_limit_delay(error):
+    """Seconds to wait for a rate-limit error (0 = use backoff), or None if not rate limited"""
+    if isinstance(error, RateLimitError):
+        return error.retry_after or 0
+    # openai.RateLimitError and friends carry the HTTP response
+    if getattr(error, "status_code", None) == 429:
+        response = getattr(error, "response", None)
+        headers = getattr(response, "headers", None) or {}
+        return parse_retry_after(headers.get("retry-after")) or 0
+    return None
+
+
+def _check_ollama_response(response):
+    if response.status_code == 429:
+        raise RateLimitError(
+            f"Ollama API error: {response.status_code} - {response.text}",
+            parse_retry_after(response.headers.get("Retry-After"))
+        )
+
+
+def get_embedding(text, config):
+    """Get embedding for text using the configured API"""
+    cache = get_embedding_cache()
+    if cache is not None:
+        cached = cache.get_many(cache_model_key(config), [text])[0]
+        if cached is not None:
+            return cached
+
+    embedding = with_backoff(lambda: _embed_one(text, config), config)
+    if cache is not None:
+        cache.put_many(cache_model_key(config), [text], [embedding])
+    return embedding
+
+
+def cache_model_key(config):
+    """Cache namespace: vectors from different models are never interchangeable"""
+    return f"{config['api_type']}:{config['embedding_model']}"
+
+
+def _embed_one(text, config):
+    if config["api_type"] == "openai":
+        client = get_openai_client(config["api_key"])
+        with track("openai", "embed"):
+            response = client.embeddings.create(input=text, model=config["embedding_model"])
+        return response.data[0].embedding
+
+    elif config["api_type"] == "ollama":
+        response = providers.post(
+            "ollama", "embed",
+            f"{config['base_url']}/api/embeddings",
+            json={"model": config["embedding_model"], "prompt": text}
+        )
+        _check_ollama_response(response)
+        if response.status_code == 200:
+            return response.json()["embedding"]
+        else:
+            raise Exception(f"Ollama API error: {response.status_code} - {response.text}")
+
+    elif config["api_type"] == "local":
+        return get_local_embedder().embed([text])[0]
+
+    else:
+        raise ValueError(f"Unknown API type: {config['api_type']}")
+
+
+def get_embeddings(texts, config, batch_size=None, workers=None):
+    """
+    Get embeddings for a list of texts, preserving order.
+    Texts are sent in batches of `batch_size` (config "embedding_batch_size" by default)
+    with up to `workers` batches in flight at once (config "embedding_workers");
+    backends without a batch endpoint fall back to one request per text.
+    Texts already in the embedding cache are not sent at all.
+    """
+    cache = get_embedding_cache()
+    if cache is None:
+        return _fetch_embeddings(texts, config, batch_size, workers)
+
+    model_key = cache_model_key(config)
+    embeddings = cache.get_many(model_key, texts)
+    # Embed each distinct missing text once, even if it repeats in the input
+    missing = list(dict.fromkeys(text for text, vector in zip(texts, embeddings) if vector is None))
+    if missing:
+        fetched = _fetch_embeddings(missing, config, batch_size, workers)
+        cache.put_many(model_key, missing, fetched)
+        by_text = dict(zip(missing, fetched))
+        embeddings = [vector if vector is not None else by_text[text]
+                      for text, vector in zip(texts, embeddings)]
+    return embeddings
+
+
+def _fetch_embeddings(texts, config, batch_size, workers):
+    if batch_size is None:
+        batch_size = config.get("embedding_batch_size", 1)
+    if workers is None:
+        workers = config.get("embedding_workers", 1)
+    batch_size = max(int(batch_size), 1)
+    workers = max(int(workers), 1)
+
+    batches = [texts[start:start + batch_size] for start in range(0, len(texts), batch_size)]
+    if workers == 1 or len(batches) <= 1:
+        results = [embed_batch(batch, config) for batch in batches]
+    else:
+        # map() yields in submission order, so chunk order is preserved
+        with ThreadPoolExecutor(max_workers=min(workers, len(batches))) as pool:
+            results = list(pool.map(lambda batch: embed_batch(batch, config), batches))
+
+    embeddings = []
+    for batch_embeddings in results:
+        embeddings.extend(batch_embeddings)
+    return embeddings
+
+
+def embed_batch(texts, config):
+    """Embed one batch of texts with a single request where the backend allows it"""
+    return with_backoff(lambda: _embed_batch(texts, config), config)
+
+
+def _embed_batch(texts, config):
+    texts = list(texts)
+    if not texts:
+        return []
+
+    backend_key = (config["api_type"], config.get("base_url"), config["embedding_model"])
+    if len(texts) == 1 or backend_key in _unbatched_backends:
+        return [_embed_one(text, config) for text in texts]
+
+    if config["api_type"] == "openai":
+        client = get_openai_client(config["api_key"])
+        with track("openai", "embed_batch"):
+            response = client.embeddings.create(input=texts, model=config["embedding_model"])
+        # The API documents `index` on each item; don't rely on response order
+        return [item.embedding for item in sorted(response.data, key=lambda item: item.index)]
+
+    elif config["api_type"] == "ollama":
+        response = providers.post(
+            "ollama", "embed_batch",
+            f"{config['base_url']}/api/embed",
+            json={"model": config["embedding_model"], "input": texts}
+        )
+        _check_ollama_response(response)
+        if response.status_code == 200:
+            return response.json()["embeddings"]
+        elif response.status_code in (404, 405, 501):
+            # Older Ollama servers only have the single-prompt /api/embeddings
+            _unbatched_backends.add(backend_key)
+            return [_embed_one(text, config) for text in texts]
+        else:
+            raise Exception(f"Ollama API error: {response.status_code} - {response.text}")
+
+    elif config["api_type"] == "local":
+        return get_local_embedder().embed(texts)
+
+    else:
+        return [_embed_one(text, config) for text in texts]
@@ -0,0 +1,69 @@
+"""
+File Lock Module
+Exclusive lock on a file, shared by every process that opens the same path.
+
+Used to serialize vector store commits between processes (the web server and
+the command-line tools, or several server workers). The lock is released by
+the OS if its holder dies, so a crash never leaves it stuck.
+"""
+import os
+
+
+class FileLock:
+    """Blocking exclusive lock on `path` (created if missing)"""
+
+    def __init__(self, path):
+        self.path = path
+        self._file = None
+
+    def acquire(self, blocking=True):
+        """Take the lock; with blocking=False, return False instead of waiting for it"""
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        f = open(self.path, "a+b")
+        try:
+            if os.name == "nt":
+                import msvcrt
+                f.seek(0)
+                while True:
+                    try:
+                        # LK_LOCK gives up after 10 one-second tries; keep waiting
+                        msvcrt.locking(f.fileno(), msvcrt.LK_LOCK if blocking else msvcrt.LK_NBLCK, 1)
+                        break
+                    except OSError:
+                        if not blocking:
+                            f.close()
+                            return False
+            else:
+                import fcntl
+                try:
+                    fcntl.flock(f.fileno(), fcntl.LOCK_EX | (0 if blocking else fcntl.LOCK_NB))
+                except BlockingIOError:
+                    f.close()
+                    return False
+        except BaseException:
+            f.close()
+            raise
+        self._file = f
+        return True
+
+    def release(self):
+        f, self._file = self._file, None
+        if f is None:
+            return
+        try:
+            if os.name == "nt":
+                import msvcrt
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+            else:
+                import fcntl
+                fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+        finally:
+            f.close()
+
+    def __enter__(self):
+        self.acquire()
+        return self
+
+    def __exit__(self, *exc):
+        self.release()
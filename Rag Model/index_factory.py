@@ -0,0 +1,204 @@
+"""
+Index Factory Module
+Builds the FAISS index used for each vector-store segment and its search parameters.
+
+Supported INDEX_TYPE values:
+    flat      - exact brute-force inner product (IndexFlatIP)
+    ivf_flat  - inverted lists over full vectors; tune with nprobe
+    ivf_pq    - inverted lists over product-quantized codes; tune with nprobe
+    hnsw      - graph index over full vectors; tune with efSearch
+    fp16      - exact scan over half-precision vectors (1/2 the memory of flat)
+    sq8       - exact scan over 8-bit scalar-quantized vectors (1/4 the memory)
+    binary    - Hamming scan over one sign bit per dimension (1/32 the memory)
+
+Scores from compressed codes (ivf_pq, sq8, fp16, binary) are approximate, so
+those searches fetch QUANTIZED_RERANK_FACTOR times as many candidates and
+re-score them exactly against the float vectors, which stay on disk
+(memory-mapped) next to the index.
+
+Segments smaller than ANN_MIN_VECTORS always use a flat index, where a
+brute-force scan is already fast and there is too little data to train on.
+"""
+import math
+import faiss
+import numpy as np
+import config as app_config
+
+INDEX_TYPES = ("flat", "ivf_flat", "ivf_pq", "hnsw", "fp16", "sq8", "binary")
+# Index types that score compressed codes and are re-ranked with the float vectors
+RERANKED_TYPES = ("ivf_pq", "fp16", "sq8", "binary")
+
+
+def choose_index_type(num_vectors, index_type=None):
+    """Index type for a segment of `num_vectors` vectors"""
+    index_type = index_type or app_config.INDEX_TYPE
+    if index_type not in INDEX_TYPES:
+        raise ValueError(f"Unknown INDEX_TYPE: {index_type}. Use one of {', '.join(INDEX_TYPES)}")
+    if index_type != "flat" and num_vectors < app_config.ANN_MIN_VECTORS:
+        return "flat"
+    if index_type == "ivf_pq" and num_vectors < 256:
+        # Each PQ sub-quantizer trains 256 centroids
+        return "flat"
+    return index_type
+
+
+def build_index(vectors, dim, index_type=None):
+    """
+    Create, train and fill an index for `vectors`.
+    IVF quantizers and the sq8 value ranges are trained on the first
+    INDEX_TRAIN_SIZE vectors.
+    Returns (index, index_type).
+    """
+    vectors = np.ascontiguousarray(vectors, dtype='float32')
+    index_type = choose_index_type(len(vectors), index_type)
+
+    if index_type == "flat":
+        index = faiss.IndexFlatIP(dim)
+
+    elif index_type == "hnsw":
+        index = faiss.IndexHNSWFlat(dim, app_config.HNSW_M, faiss.METRIC_INNER_PRODUCT)
+        index.hnsw.efConstruction = app_config.HNSW_EF_CONSTRUCTION
+
+    elif index_type == "binary":
+        # packbits pads the last byte with zero bits, which never differ
+        index = faiss.IndexBinaryFlat(8 * math.ceil(dim / 8))
+        index.add(binary_codes(vectors))
+        return index, index_type
+
+    elif index_type in ("fp16", "sq8"):
+        qtype = faiss.ScalarQuantizer.QT_fp16 if index_type == "fp16" else faiss.ScalarQuantizer.QT_8bit
+        index = faiss.IndexScalarQuantizer(dim, qtype, faiss.METRIC_INNER_PRODUCT)
+
+    else:
+        nlist = ivf_nlist(len(vectors))
+        quantizer = faiss.IndexFlatIP(dim)
+        if index_type == "ivf_flat":
+            index = faiss.IndexIVFFlat(quantizer, dim, nlist, faiss.METRIC_INNER_PRODUCT)
+        else:
+            index = faiss.IndexIVFPQ(quantizer, dim, nlist, pq_subquantizers(dim), 8,
+                                     faiss.METRIC_INNER_PRODUCT)
+        index.nprobe = app_config.IVF_NPROBE
+
+    if not index.is_trained:
+        index.train(vectors[:max(app_config.INDEX_TRAIN_SIZE, _min_train_size(index))])
+    index.add(vectors)
+    return index, index_type
+
+
+def search_index(index, query_vectors, k, params=None):
+    """
+    Top k (scores, indices) of `index` for unit query vectors, in FAISS's form.
+    Binary indexes are searched with the queries' sign codes; their Hamming
+    distances are mapped to [-1, 1] so they rank like cosine similarities.
+    """
+    if isinstance(index, faiss.IndexBinary):
+        distances, indices = index.search(binary_codes(query_vectors), k, params=params)
+        return 1 - 2 * distances.astype('float32') / index.d, indices
+    return index.search(query_vectors, k, params=params)
+
+
+def rerank_depth(index_type, k, available):
+    """Candidates to fetch from a segment for its top k (more for compressed codes)"""
+    if index_type in RERANKED_TYPES:
+        k *= max(app_config.QUANTIZED_RERANK_FACTOR, 1)
+    return min(k, available)
+
+
+def rescore(vectors, query_vectors, indices, k):
+    """
+    Exact top k of candidate `indices` (FAISS's -1 padding allowed), scored
+    against the float `vectors`. Returns (scores, indices) in FAISS's form.
+    """
+    scores = np.full(indices.shape, -np.inf, dtype='float32')
+    for q, row in enumerate(indices):
+        found = row >= 0
+        scores[q, found] = vectors[row[found]] @ query_vectors[q]
+    top = np.argsort(-scores, axis=1, kind='stable')[:, :k]
+    return np.take_along_axis(scores, top, axis=1), np.take_along_axis(indices, top, axis=1)
+
+
+def binary_codes(vectors):
+    """One sign bit per dimension, packed 8 to a byte"""
+    return np.packbits(np.asarray(vectors) > 0, axis=1)
+
+
+def write_index(index, path):
+    if isinstance(index, faiss.IndexBinary):
+        faiss.write_index_binary(index, path)
+    else:
+        faiss.write_index(index, path)
+
+
+def read_index(path, index_type="flat"):
+    """Load a segment's index with the configured search defaults"""
+    if index_type == "binary":
+        return faiss.read_index_binary(path)
+    return configure_index(faiss.read_index(path))
+
+
+def search_params(index, nprobe=None, ef_search=None, selector=None):
+    """
+    Per-request search parameters for `index`, or None to use its defaults.
+    `selector` (a faiss.IDSelector) restricts the search to the ids it accepts.
+    """
+    ivf = _as_ivf(index)
+    if ivf is not None and (nprobe or selector is not None):
+        return faiss.SearchParametersIVF(nprobe=int(nprobe or ivf.nprobe), sel=selector)
+    if isinstance(index, faiss.IndexHNSW) and (ef_search or selector is not None):
+        return faiss.SearchParametersHNSW(efSearch=int(ef_search or index.hnsw.efSearch),
+                                          sel=selector)
+    if selector is not None:
+        return faiss.SearchParameters(sel=selector)
+    return None
+
+
+def configure_index(index):
+    """Apply the configured default nprobe/efSearch to a freshly loaded index"""
+    ivf = _as_ivf(index)
+    if ivf is not None:
+        ivf.nprobe = app_config.IVF_NPROBE
+    elif isinstance(index, faiss.IndexHNSW):
+        index.hnsw.efSearch = app_config.HNSW_EF_SEARCH
+    return index
+
+
+def keeps_vector_file(index_type):
+    """
+    Whether segments of this type also keep their float vectors in a .vectors.npy file.
+    Only a flat index can hand back its vectors cheaply and exactly; the others need
+    the originals for re-ranking, compaction and rebuilding when INDEX_TYPE changes.
+    """
+    return index_type != "flat"
+
+
+def ivf_nlist(num_vectors):
+    """Number of IVF lists: IVF_NLIST, or about 4 * sqrt(n) when it is 0"""
+    nlist = app_config.IVF_NLIST or int(4 * math.sqrt(num_vectors))
+    # k-means needs at least one training point per list
+    return max(1, min(nlist, num_vectors))
+
+
+def pq_subquantizers(dim):
+    """Largest PQ_M that divides the dimension (PQ needs d % m == 0)"""
+    m = min(app_config.PQ_M, dim)
+    while dim % m:
+        m -= 1
+    return m
+
+
+def _min_train_size(index):
+    ivf = _as_ivf(index)
+    size = ivf.nlist if ivf is not None else 0
+    if isinstance(index, faiss.IndexIVFPQ):
+        # 256 centroids per PQ sub-quantizer
+        size = max(size, 256)
+    return size
+
+
+def _as_ivf(index):
+    if isinstance(index, faiss.IndexBinary):
+        return None
+    try:
+        return faiss.extract_index_ivf(index)
+    except RuntimeError:
+        return None
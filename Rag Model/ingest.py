@@ -0,0 +1,120 @@
+"""
+Ingest Module
+The PDF ingestion pipeline: extract -> chunk -> embed -> index.
+
+`progress` receives start_stage(name, total, unit) and advance(count) calls
+for each stage (see jobs.JobProgress).
+
+Uploads are deduplicated by content: a file whose SHA-256 is already stored is
+not processed again, and under a new name it is recorded as an alias of the
+stored document, so filters by either name find the same chunks. A changed
+version of a stored document is chunked as usual, but only chunks
+whose text is not in the old version are embedded; the rest reuse their stored
+vectors, and the old version is replaced in one commit.
+"""
+import hashlib
+import numpy as np
+from chunker import chunk_pages
+from embeddings import get_embeddings
+from pdf_extractor import extract_pages, page_count
+from vector_store import chunk_hash, store
+
+
+def file_hash(filepath):
+    """SHA-256 of a file, read in 1 MB blocks"""
+    digest = hashlib.sha256()
+    with open(filepath, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def ingest_pdf(filepath, filename, config, progress):
+    """
+    Add a PDF to the vector store, or replace the stored version of it.
+    Returns its page and chunk counts and "status": "added", "updated" or
+    "unchanged" (the same content is already stored, as "duplicate_of").
+    """
+    content_hash = file_hash(filepath)
+    duplicate = duplicate_result(filename, content_hash)
+    if duplicate:
+        return duplicate
+    total_pages = page_count(filepath)
+
+    # Chunk pages as the extraction workers return them
+    progress.start_stage("extracting", total_pages, "pages")
+    chunks = []
+    chunk_metadata = []
+    for page_number, page_text in extract_pages(filepath):
+        for chunk_text, metadata in chunk_pages([(page_number, page_text)],
+                                                model=config.get("embedding_model")):
+            metadata['filename'] = filename
+            chunks.append(chunk_text)
+            chunk_metadata.append(metadata)
+        progress.advance()
+
+    return index_chunks(filename, content_hash, total_pages, chunks, chunk_metadata,
+                        config, progress)
+
+
+def duplicate_result(filename, content_hash):
+    """
+    The "unchanged" result if a file with this content is already stored, else
+    None; a new `filename` becomes an alias of the stored document
+    """
+    duplicate_of = store.find_document(content_hash)
+    if not duplicate_of:
+        return None
+    snapshot = store.snapshot()
+    replaced = 0
+    if filename != duplicate_of and snapshot["aliases"].get(filename) != duplicate_of:
+        replaced = store.add_alias(filename, duplicate_of)
+    stored = snapshot["documents"][duplicate_of]
+    return {
+        "filename": filename,
+        "status": "unchanged",
+        "duplicate_of": duplicate_of,
+        "total_pages": stored["pages"],
+        "total_chunks": stored["chunks"],
+        "embedded_chunks": 0,
+        "replaced_chunks": replaced
+    }
+
+
+def index_chunks(filename, content_hash, total_pages, chunks, chunk_metadata, config, progress):
+    """Embed a document's chunks (those not already stored) and commit it to the store"""
+    if not chunks:
+        raise ValueError("No text could be extracted from the PDF")
+
+    # Embed each distinct chunk text once, skipping those the old version has
+    hashes = [chunk_hash(chunk) for chunk in chunks]
+    vectors = store.document_vectors(filename)
+    updated = bool(vectors)
+    reused = sum(1 for h in hashes if h in vectors)
+    missing = {h: chunk for h, chunk in zip(hashes, chunks) if h not in vectors}
+    missing_hashes, texts = list(missing), list(missing.values())
+
+    # Each step keeps every embedding worker busy with one batch
+    progress.start_stage("embedding", len(texts), "chunks")
+    step = config["embedding_batch_size"] * config["embedding_workers"]
+    for start in range(0, len(texts), step):
+        batch = texts[start:start + step]
+        for h, embedding in zip(missing_hashes[start:start + step], get_embeddings(batch, config)):
+            vectors[h] = embedding
+        progress.advance(len(batch))
+
+    progress.start_stage("indexing", len(chunks), "chunks")
+    embeddings = np.array([vectors[h] for h in hashes], dtype='float32')
+    replaced = store.append(embeddings, chunks, chunk_metadata, filename,
+                            total_pages, config["embedding_dim"], content_hash)
+    progress.advance(len(chunks))
+
+    return {
+        "filename": filename,
+        "status": "updated" if updated else "added",
+        "total_pages": total_pages,
+        "total_chunks": len(chunks),
+        "embedded_chunks": len(texts),
+        "reused_chunks": reused,
+        "replaced_chunks": replaced
+    }
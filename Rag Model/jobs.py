@@ -0,0 +1,225 @@
+"""
+Job Queue Module
+Runs long tasks (PDF ingestion) on a local worker pool and records their
+progress in a SQLite job table, so clients poll instead of blocking.
+
+A job moves through queued -> running -> completed | failed. While running,
+its handler reports per-stage progress through a JobProgress; progress is kept
+in memory and written to the table at most every PROGRESS_FLUSH_SECONDS.
+Jobs still queued when the server stopped are re-queued on start; jobs that
+were running are marked failed, since their work may be half done.
+"""
+import json
+import sqlite3
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+import config as app_config
+
+PROGRESS_FLUSH_SECONDS = 0.5
+
+
+class JobProgress:
+    """Per-stage progress of one running job"""
+
+    def __init__(self, queue, job_id):
+        self._queue = queue
+        self._job_id = job_id
+        self.stage = None
+        self.stages = {}
+
+    def start_stage(self, name, total=None, unit="items"):
+        """Begin a stage of `total` units (None when not known up front)"""
+        if self.stage:
+            self._finish(self.stages[self.stage])
+        self.stage = name
+        self.stages[name] = {"done": 0, "total": total, "unit": unit,
+                             "seconds": 0.0, "per_second": None, "_start": time.time()}
+        self._queue._update(self._job_id, self, force=True)
+
+    def advance(self, count=1, total=None):
+        """Record `count` more units done in the current stage"""
+        stage = self.stages[self.stage]
+        stage["done"] += count
+        if total is not None:
+            stage["total"] = total
+        elapsed = time.time() - stage["_start"]
+        stage["seconds"] = round(elapsed, 3)
+        stage["per_second"] = round(stage["done"] / elapsed, 1) if elapsed > 0 else None
+        self._queue._update(self._job_id, self)
+
+    def finish(self):
+        if self.stage:
+            self._finish(self.stages[self.stage])
+        self.stage = None
+
+    def as_dict(self):
+        return {"stage": self.stage,
+                "stages": {name: {k: v for k, v in stage.items() if not k.startswith("_")}
+                           for name, stage in list(self.stages.items())}}
+
+    @staticmethod
+    def _finish(stage):
+        elapsed = time.time() - stage["_start"]
+        stage["seconds"] = round(elapsed, 3)
+        stage["per_second"] = round(stage["done"] / elapsed, 1) if elapsed > 0 else None
+        if stage["total"] is None:
+            stage["total"] = stage["done"]
+
+
+class JobQueue:
+    """
+    SQLite-backed job table plus a thread pool that runs the jobs.
+    `handlers` maps a job kind to handler(payload, progress) -> result dict.
+    """
+
+    def __init__(self, path, handlers, workers=2):
+        self.path = path
+        self.handlers = handlers
+        self._lock = threading.Lock()
+        self._live = {}  # job id -> (JobProgress, last flush time)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS jobs ("
+            "id TEXT PRIMARY KEY, kind TEXT, payload TEXT, status TEXT, progress TEXT, "
+            "result TEXT, error TEXT, created_at REAL, started_at REAL, finished_at REAL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_jobs_created ON jobs(created_at)")
+        self._conn.commit()
+        self._executor = ThreadPoolExecutor(max_workers=max(1, workers),
+                                            thread_name_prefix="job-worker")
+        self._recover()
+
+    def submit(self, kind, payload):
+        """Record a queued job, start it when a worker is free, and return its id"""
+        if kind not in self.handlers:
+            raise ValueError(f"Unknown job kind: {kind}")
+        job_id = uuid.uuid4().hex
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO jobs (id, kind, payload, status, progress, created_at) "
+                "VALUES (?, ?, ?, 'queued', ?, ?)",
+                (job_id, kind, json.dumps(payload), json.dumps({"stage": None, "stages": {}}),
+                 time.time())
+            )
+            self._conn.commit()
+        self._executor.submit(self._run, job_id, kind, payload)
+        return job_id
+
+    def get(self, job_id):
+        """The job as a dict, or None if there is no such job"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT id, kind, payload, status, progress, result, error, "
+                "created_at, started_at, finished_at FROM jobs WHERE id = ?", (job_id,)
+            ).fetchone()
+            live = self._live.get(job_id)
+            progress = live[0].as_dict() if live else None
+        return self._as_dict(row, progress) if row else None
+
+    def list(self, limit=50):
+        """Most recent jobs first"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT id, kind, payload, status, progress, result, error, "
+                "created_at, started_at, finished_at FROM jobs "
+                "ORDER BY created_at DESC LIMIT ?", (limit,)
+            ).fetchall()
+            live = {job_id: progress.as_dict() for job_id, (progress, _) in self._live.items()}
+        return [self._as_dict(row, live.get(row[0])) for row in rows]
+
+    def get_stats(self):
+        with self._lock:
+            counts = dict(self._conn.execute(
+                "SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall())
+        return {status: counts.get(status, 0)
+                for status in ("queued", "running", "completed", "failed")}
+
+    def _run(self, job_id, kind, payload):
+        progress = JobProgress(self, job_id)
+        with self._lock:
+            self._live[job_id] = (progress, 0.0)
+            self._conn.execute("UPDATE jobs SET status = 'running', started_at = ? WHERE id = ?",
+                               (time.time(), job_id))
+            self._conn.commit()
+
+        try:
+            result = self.handlers[kind](payload, progress)
+            status, error = "completed", None
+        except Exception as e:
+            result, status, error = None, "failed", str(e)
+        progress.finish()
+
+        with self._lock:
+            self._live.pop(job_id, None)
+            self._conn.execute(
+                "UPDATE jobs SET status = ?, progress = ?, result = ?, error = ?, finished_at = ? "
+                "WHERE id = ?",
+                (status, json.dumps(progress.as_dict()), json.dumps(result), error, time.time(),
+                 job_id)
+            )
+            self._conn.commit()
+
+    def _update(self, job_id, progress, force=False):
+        """Persist progress, at most every PROGRESS_FLUSH_SECONDS unless forced"""
+        now = time.time()
+        with self._lock:
+            _, flushed_at = self._live.get(job_id, (progress, 0.0))
+            if not force and now - flushed_at < PROGRESS_FLUSH_SECONDS:
+                return
+            self._live[job_id] = (progress, now)
+            self._conn.execute("UPDATE jobs SET progress = ? WHERE id = ?",
+                               (json.dumps(progress.as_dict()), job_id))
+            self._conn.commit()
+
+    def _recover(self):
+        """Re-queue jobs left queued by a previous run; fail the interrupted ones"""
+        with self._lock:
+            self._conn.execute(
+                "UPDATE jobs SET status = 'failed', error = 'Interrupted by a server restart', "
+                "finished_at = ? WHERE status = 'running'", (time.time(),)
+            )
+            self._conn.commit()
+            queued = self._conn.execute(
+                "SELECT id, kind, payload FROM jobs WHERE status = 'queued' ORDER BY created_at"
+            ).fetchall()
+        for job_id, kind, payload in queued:
+            if kind in self.handlers:
+                self._executor.submit(self._run, job_id, kind, json.loads(payload))
+
+    @staticmethod
+    def _as_dict(row, live_progress=None):
+        (job_id, kind, payload, status, progress, result, error,
+         created_at, started_at, finished_at) = row
+        progress = live_progress or json.loads(progress or "{}")
+        end = finished_at or time.time()
+        return {
+            "id": job_id,
+            "kind": kind,
+            "status": status,
+            "stage": progress.get("stage"),
+            "stages": progress.get("stages", {}),
+            "filename": json.loads(payload).get("filename"),
+            "result": json.loads(result) if result else None,
+            "error": error,
+            "created_at": created_at,
+            "started_at": started_at,
+            "finished_at": finished_at,
+            "queued_seconds": round((started_at or end) - created_at, 3),
+            "run_seconds": round(end - started_at, 3) if started_at else None
+        }
+
+
+_queue = None
+_queue_lock = threading.Lock()
+
+
+def get_job_queue(handlers=None):
+    """Return the shared job queue, creating it with `handlers` on first use"""
+    global _queue
+    with _queue_lock:
+        if _queue is None:
+            _queue = JobQueue(app_config.JOBS_DB_PATH, handlers or {},
+                              workers=app_config.INGEST_WORKERS)
+    return _queue
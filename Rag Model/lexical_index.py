@@ -0,0 +1,178 @@
+"""
+Lexical Index Module
+BM25 inverted index over chunk texts, one per vector-store segment.
+
+An index is one file next to the segment's FAISS index:
+
+    <prefix>.bm25.npz
+        terms        # sorted vocabulary (looked up with searchsorted, no dict to build)
+        offsets      # int64[terms + 1] start of each term's postings
+        doc_ids      # int32 chunk numbers, ascending within a term
+        tfs          # float32 term frequencies
+        doc_lengths  # int32 tokens per chunk
+
+BM25 statistics (chunk count, average length, document frequencies) are summed
+over all the segments being searched, so scores are comparable across segments.
+Tokens are lowercased words; identifiers such as "ERR-404" or "v2.1" are kept
+whole and also indexed by their parts.
+"""
+import os
+import re
+import numpy as np
+import config as app_config
+
+SUFFIXES = (".bm25.npz",)
+
+TOKEN_PATTERN = re.compile(r"\w+(?:[-./:]\w+)*")
+PART_PATTERN = re.compile(r"\w+")
+
+
+def tokenize(text):
+    """Lowercased word tokens; compound identifiers also yield their parts"""
+    tokens = []
+    for match in TOKEN_PATTERN.finditer(text.lower()):
+        token = match.group()
+        tokens.append(token)
+        if not token.isalnum():
+            tokens.extend(PART_PATTERN.findall(token))
+    return tokens
+
+
+class LexicalIndex:
+    """Read-only BM25 postings of one segment"""
+
+    def __init__(self, prefix):
+        self.prefix = prefix
+        with np.load(prefix + ".bm25.npz") as data:
+            self.terms = data["terms"]
+            self.offsets = data["offsets"]
+            self.doc_ids = data["doc_ids"]
+            self.tfs = data["tfs"]
+            self.doc_lengths = data["doc_lengths"]
+        self.total_length = int(self.doc_lengths.sum())
+
+    def __len__(self):
+        return len(self.doc_lengths)
+
+    def postings(self, term):
+        """(doc_ids, tfs) of a term; empty arrays if it does not occur"""
+        i = int(np.searchsorted(self.terms, term))
+        if i == len(self.terms) or self.terms[i] != term:
+            return self.doc_ids[:0], self.tfs[:0]
+        start, end = self.offsets[i], self.offsets[i + 1]
+        return self.doc_ids[start:end], self.tfs[start:end]
+
+    @staticmethod
+    def write(prefix, texts):
+        """Tokenize chunk texts and write their index"""
+        postings = {}
+        doc_lengths = np.zeros(len(texts), dtype='<i4')
+        for doc_id, text in enumerate(texts):
+            tokens = tokenize(text)
+            doc_lengths[doc_id] = len(tokens)
+            counts = {}
+            for token in tokens:
+                counts[token] = counts.get(token, 0) + 1
+            for token, count in counts.items():
+                postings.setdefault(token, []).append((doc_id, count))
+
+        terms = sorted(postings)
+        offsets = np.zeros(len(terms) + 1, dtype='<i8')
+        np.cumsum([len(postings[term]) for term in terms], out=offsets[1:])
+        pairs = np.array([pair for term in terms for pair in postings[term]],
+                         dtype='<i8').reshape(-1, 2)
+        LexicalIndex._save(prefix, np.array(terms, dtype=str), offsets,
+                           pairs[:, 0].astype('<i4'), pairs[:, 1].astype('<f4'), doc_lengths)
+        return LexicalIndex(prefix)
+
+    @staticmethod
+    def merge(prefix, indexes, keeps=None):
+        """
+        Concatenate the indexes of several segments (in order) without re-tokenizing.
+        `keeps` optionally gives each index a boolean mask of the chunks to keep.
+        """
+        terms = np.unique(np.concatenate([index.terms for index in indexes])) if indexes \
+            else np.zeros(0, dtype=str)
+        term_ids, doc_ids, tfs, doc_lengths = [], [], [], []
+        base = 0
+        for index, keep in zip(indexes, keeps or [None] * len(indexes)):
+            # Global term id of every posting, then shift chunk numbers past earlier segments
+            index_term_ids = np.repeat(np.searchsorted(terms, index.terms), np.diff(index.offsets))
+            index_doc_ids, index_tfs, lengths = index.doc_ids, index.tfs, index.doc_lengths
+            if keep is not None:
+                live = keep[index_doc_ids]
+                renumber = np.cumsum(keep) - 1
+                index_term_ids, index_tfs = index_term_ids[live], index_tfs[live]
+                index_doc_ids = renumber[index_doc_ids[live]]
+                lengths = lengths[keep]
+            term_ids.append(index_term_ids)
+            doc_ids.append(index_doc_ids.astype('<i4') + base)
+            tfs.append(index_tfs)
+            doc_lengths.append(lengths)
+            base += len(lengths)
+
+        term_ids = np.concatenate(term_ids) if term_ids else np.zeros(0, dtype='<i8')
+        # Drop terms that only occurred in dropped chunks
+        used = np.unique(term_ids)
+        terms, term_ids = terms[used], np.searchsorted(used, term_ids)
+        order = np.argsort(term_ids, kind='stable')  # keeps chunk numbers ascending per term
+        offsets = np.zeros(len(terms) + 1, dtype='<i8')
+        np.cumsum(np.bincount(term_ids, minlength=len(terms)), out=offsets[1:])
+        LexicalIndex._save(
+            prefix, terms, offsets,
+            np.concatenate(doc_ids)[order] if doc_ids else np.zeros(0, dtype='<i4'),
+            np.concatenate(tfs)[order] if tfs else np.zeros(0, dtype='<f4'),
+            np.concatenate(doc_lengths) if doc_lengths else np.zeros(0, dtype='<i4'))
+        return LexicalIndex(prefix)
+
+    @staticmethod
+    def exists(prefix):
+        return all(os.path.exists(prefix + suffix) for suffix in SUFFIXES)
+
+    @staticmethod
+    def _save(prefix, terms, offsets, doc_ids, tfs, doc_lengths):
+        # np.savez appends .npz to names without it; write the temp file under that name
+        tmp_path = prefix + ".bm25.tmp.npz"
+        np.savez(tmp_path, terms=terms, offsets=offsets, doc_ids=doc_ids, tfs=tfs,
+                 doc_lengths=doc_lengths)
+        os.replace(tmp_path, prefix + ".bm25.npz")
+
+
+def bm25_search(indexes, query, k, k1=None, b=None, masks=None):
+    """
+    Score `query` against several indexes as one corpus.
+    `masks` optionally restricts each index: None searches all of it, False
+    skips it, a boolean array keeps only the chunks marked True.
+    Returns the top k as (score, index_position, doc_id), best first.
+    """
+    k1 = app_config.BM25_K1 if k1 is None else k1
+    b = app_config.BM25_B if b is None else b
+    total_docs = sum(len(index) for index in indexes)
+    if total_docs == 0:
+        return []
+    avg_length = max(sum(index.total_length for index in indexes) / total_docs, 1.0)
+
+    terms = list(dict.fromkeys(tokenize(query)))
+    postings = [[index.postings(term) for term in terms] for index in indexes]
+    doc_freqs = [sum(len(p[t][0]) for p in postings) for t in range(len(terms))]
+    idfs = [np.log(1 + (total_docs - df + 0.5) / (df + 0.5)) for df in doc_freqs]
+
+    hits = []
+    masks = masks or [None] * len(indexes)
+    for position, index in enumerate(indexes):
+        if masks[position] is False:
+            continue
+        scores = np.zeros(len(index), dtype='float32')
+        norms = k1 * (1 - b + b * index.doc_lengths / avg_length)
+        for idf, (doc_ids, tfs) in zip(idfs, postings[position]):
+            if len(doc_ids):
+                scores[doc_ids] += idf * tfs * (k1 + 1) / (tfs + norms[doc_ids])
+        if masks[position] is not None:
+            scores[~masks[position]] = 0
+        matched = np.flatnonzero(scores)
+        if len(matched) > k:
+            matched = matched[np.argpartition(-scores[matched], k - 1)[:k]]
+        hits.extend((float(scores[i]), position, int(i)) for i in matched)
+
+    hits.sort(key=lambda hit: hit[0], reverse=True)
+    return hits[:k]
@@ -0,0 +1,96 @@
+"""
+Local Embeddings Module
+Runs a sentence-embedding model in-process on CPU for API_TYPE=local.
+
+The model (LOCAL_EMBEDDING_MODEL) is loaded once per process through
+sentence-transformers and shared by every caller. It runs on PyTorch or, with
+LOCAL_EMBEDDING_BACKEND=onnx, on ONNX Runtime. Texts are encoded
+LOCAL_EMBEDDING_BATCH_SIZE at a time, one call at a time, since concurrent
+calls would only split the same CPU cores. Nothing leaves the machine: there
+is no network latency, per-call cost or rate limit, and the embedding
+dimension is read from the model instead of the EMBEDDING_DIMENSIONS table.
+
+Needs `pip install sentence-transformers` (`sentence-transformers[onnx]` for
+the onnx backend). The model is downloaded on first use unless it is already
+in the Hugging Face cache or LOCAL_EMBEDDING_MODEL is a local directory.
+
+This module is copied verbatim into both apps, which are built from their own
+folders (see the Dockerfiles); change both copies together.
+"""
+import threading
+import time
+import config as app_config
+
+BACKENDS = ("torch", "onnx")
+
+
+class LocalEmbedder:
+    """A sentence-embedding model loaded in this process"""
+
+    def __init__(self, model_name, backend="torch", batch_size=32):
+        if backend not in BACKENDS:
+            raise ValueError(f"Unknown LOCAL_EMBEDDING_BACKEND: {backend}. Use one of {', '.join(BACKENDS)}")
+        try:
+            from sentence_transformers import SentenceTransformer
+        except ImportError:
+            raise ImportError("API_TYPE=local needs sentence-transformers: "
+                              "pip install sentence-transformers")
+        start = time.perf_counter()
+        options = {} if backend == "torch" else {"backend": backend}
+        self.model = SentenceTransformer(model_name, device="cpu", **options)
+        self.model_name = model_name
+        self.backend = backend
+        self.batch_size = max(batch_size, 1)
+        self.dimension = self.model.get_sentence_embedding_dimension()
+        self.load_seconds = time.perf_counter() - start
+        self.texts = 0
+        self.seconds = 0.0
+        self._lock = threading.Lock()
+
+    def embed(self, texts):
+        """Embeddings of `texts` as lists of floats, in order"""
+        texts = list(texts)
+        if not texts:
+            return []
+        with self._lock:
+            start = time.perf_counter()
+            vectors = self.model.encode(texts, batch_size=self.batch_size,
+                                        convert_to_numpy=True, show_progress_bar=False)
+            self.seconds += time.perf_counter() - start
+            self.texts += len(texts)
+        return vectors.tolist()
+
+    def get_stats(self):
+        return {
+            "model": self.model_name,
+            "backend": self.backend,
+            "dimension": self.dimension,
+            "load_seconds": round(self.load_seconds, 2),
+            "texts": self.texts,
+            "seconds": round(self.seconds, 3),
+            "embeddings_per_second": round(self.texts / self.seconds, 1) if self.seconds else None
+        }
+
+
+_embedder = None
+_embedder_lock = threading.Lock()
+
+
+def get_local_embedder():
+    """Return the shared local model, loading it on first use"""
+    global _embedder
+    with _embedder_lock:
+        if _embedder is None:
+            _embedder = LocalEmbedder(
+                app_config.LOCAL_EMBEDDING_MODEL,
+                backend=app_config.LOCAL_EMBEDDING_BACKEND,
+                batch_size=app_config.LOCAL_EMBEDDING_BATCH_SIZE
+            )
+            print(f"✓ Loaded {_embedder.model_name} ({_embedder.dimension} dims, "
+                  f"{_embedder.backend} on CPU) in {_embedder.load_seconds:.1f}s")
+    return _embedder
+
+
+def get_local_embedder_stats():
+    """Throughput of the local model, or None if it has not been loaded"""
+    return _embedder.get_stats() if _embedder is not None else None
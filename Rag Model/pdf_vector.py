@@ -1,116 +1,309 @@
-import faiss
-import PyPDF2
+"""
+PDF to Vectors
+Builds the vector store from PDFs on the command line.
+
+Usage:
+    python pdf_vector.py                          # replace the database with one PDF
+    python pdf_vector.py ingest <dir|glob> [...]  # add many PDFs, resumably
+        [--batch 16] [--checkpoint FILE] [--restart]
+
+`ingest` adds every PDF under the given directories (recursively) or matching
+the given glob patterns; documents are named by their path relative to the
+directory. A background thread hashes, extracts and chunks the next batch of
+files (their pages share the extraction process pool) while the current file
+is embedded and written. Each finished file is appended to a checkpoint file,
+so a run that was interrupted skips the files it already stored. Files whose
+content is already stored are not processed again and changed files replace
+their stored version (see ingest.py).
+"""
+import argparse
+import glob
+import json
+import queue
+import threading
+import time
 import numpy as np
-import pickle
 import os
-import requests
 from config import get_api_config, validate_config, get_embedding_dimension
+from embeddings import get_embeddings
+from chunker import chunk_pages
+from ingest import duplicate_result, file_hash, index_chunks
+import pdf_extractor
+from pdf_extractor import extract_documents, extract_pages, page_count
+from vector_store import store
+
+CHECKPOINT_NAME = "ingest_checkpoint.jsonl"
 
 # Validate and get configuration
 validate_config()
 config = get_api_config()
 
 
-def get_embedding(text, config):
-    """Get embedding for text using the configured API"""
-    if config["api_type"] == "openai":
-        from openai import OpenAI
-        client = OpenAI(api_key=config["api_key"])
-        response = client.embeddings.create(input=text, model=config["embedding_model"])
-        return response.data[0].embedding
-    
-    elif config["api_type"] == "ollama":
-        # Ollama API call
-        response = requests.post(
-            f"{config['base_url']}/api/embeddings",
-            json={"model": config["embedding_model"], "prompt": text}
-        )
-        if response.status_code == 200:
-            return response.json()["embedding"]
-        else:
-            raise Exception(f"Ollama API error: {response.status_code} - {response.text}")
-    
-    else:
-        raise ValueError(f"Unknown API type: {config['api_type']}")
-
-
 def pdf_to_vectors(pdf_path):
     # Read PDF
     print(f"📄 Reading PDF: {pdf_path}")
-    with open(pdf_path, 'rb') as f:
-        pdf_reader = PyPDF2.PdfReader(f)
-        total_pages = len(pdf_reader.pages)
-
-        # Extract text from each page separately
-        page_texts = []
-        for page_num, page in enumerate(pdf_reader.pages):
-            page_text = page.extract_text()
-            page_texts.append({
-                'text': page_text,
-                'page_number': page_num + 1
-            })
-
-        # Combine all text for chunking
-        text = ''.join([p['text'] for p in page_texts])
-
-    print(f"📊 Total pages: {total_pages}")
-    print(f"📊 Total text length: {len(text):,} characters")
-    print(f"📊 Average characters per page: {len(text) // total_pages:,}")
-
-    # Create chunks with page tracking
     chunks = []
     chunk_metadata = []
+    total_chars = 0
+    total_pages = page_count(pdf_path)
 
-    for i in range(0, len(text), 400):
-        chunk_text = text[i:i + 500]
-        chunks.append(chunk_text)
-
-        # Estimate which page this chunk belongs to
-        estimated_page = min((i // (len(text) // total_pages)) + 1, total_pages)
-        chunk_metadata.append({
-            'start_pos': i,
-            'estimated_page': estimated_page
-        })
+    # Chunk each page as soon as it is extracted; chunks keep their exact page
+    for page_number, page_text in extract_pages(pdf_path):
+        total_chars += len(page_text)
+        for chunk_text, metadata in chunk_pages([(page_number, page_text)],
+                                                model=config.get("embedding_model")):
+            chunks.append(chunk_text)
+            chunk_metadata.append(metadata)
 
+    print(f"📊 Total pages: {total_pages}")
+    print(f"📊 Total text length: {total_chars:,} characters")
+    print(f"📊 Average characters per page: {total_chars // max(total_pages, 1):,}")
     print(f"✂️  Created {len(chunks)} chunks")
+    if not chunks:
+        raise ValueError(f"No text could be extracted from {pdf_path}")
 
     # Get embeddings using configured API
     print(f"🔄 Getting embeddings using {config['api_type'].upper()} API...")
+    # Each step keeps every embedding worker busy with one batch
+    step = config["embedding_batch_size"] * config["embedding_workers"]
     embeddings = []
-    for i, chunk in enumerate(chunks):
-        print(f"Processing {i + 1}/{len(chunks)}")
-        embedding = get_embedding(chunk, config)
-        embeddings.append(embedding)
+    for start in range(0, len(chunks), step):
+        batch = chunks[start:start + step]
+        embeddings.extend(get_embeddings(batch, config))
+        print(f"Processing {start + len(batch)}/{len(chunks)}")
 
-    # Create FAISS index
-    print("🗂️  Creating FAISS index...")
+    # Replace the vector database with this PDF, in one commit
+    print("💾 Saving to the vector store...")
     embeddings = np.array(embeddings)
-    embedding_dim = config["embedding_dim"]
-    index = faiss.IndexFlatIP(embedding_dim)
-    index.add(embeddings.astype('float32'))
-
-    # Save to files
-    print("💾 Saving to files...")
-    faiss.write_index(index, "vectors.index")
-    with open("chunks.pkl", "wb") as f:
-        pickle.dump({
-            'chunks': chunks,
-            'metadata': chunk_metadata,
-            'total_pages': total_pages
-        }, f)
+    filename = os.path.basename(pdf_path)
+    for meta in chunk_metadata:
+        meta['filename'] = filename
+    store.append(embeddings, chunks, chunk_metadata, filename, total_pages, config["embedding_dim"],
+                 replace_all=True)
 
     print("✅ Vector database created successfully!")
-    print(f"📁 Files saved: vectors.index, chunks.pkl")
+    print(f"📁 Files saved: {store.db_dir}/")
     print(f"📊 Vector shape: {embeddings.shape}")
     print(f"🔢 Sample vector (first 5 dims): {embeddings[0][:5]}")
 
     return embeddings, chunks
 
 
-# Usage
-if __name__ == "__main__":
+class Throughput:
+    """
+    Pages and chunks stored per second since the run started; also the
+    `progress` that ingest.index_chunks reports to
+    """
+
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.pages = 0
+        self.chunks = 0
+        self.embedded = 0
+        self._stage = None
+
+    def start_stage(self, name, total=None, unit="items"):
+        self._stage = name
+
+    def advance(self, count=1, total=None):
+        if self._stage == "embedding":
+            self.embedded += count
+        elif self._stage == "indexing":
+            self.chunks += count
+
+    def rates(self):
+        elapsed = max(time.perf_counter() - self.start, 1e-9)
+        return self.pages / elapsed, self.chunks / elapsed
+
+
+def find_pdfs(patterns, root):
+    """
+    Sorted (path, document name) of the PDFs under directories or matching globs.
+    Names are paths relative to `root`, so a file keeps its name whichever
+    inputs a run is given (a stored name is replaced by the next file with that
+    name). Raises ValueError for files outside `root`.
+    """
+    root = os.path.abspath(root)
+    found = {}
+    for pattern in patterns:
+        if os.path.isdir(pattern):
+            paths = [os.path.join(folder, name) for folder, _, names in os.walk(pattern)
+                     for name in names if name.lower().endswith(".pdf")]
+        else:
+            paths = [path for path in glob.glob(pattern, recursive=True)
+                     if path.lower().endswith(".pdf") and os.path.isfile(path)]
+        for path in map(os.path.abspath, paths):
+            try:
+                name = os.path.relpath(path, root)
+            except ValueError:
+                name = None  # another drive
+            if name is None or name == os.pardir or name.startswith(os.pardir + os.sep):
+                raise ValueError(f"{path} is outside {root}; "
+                                 f"pass --root with a folder holding every input")
+            found[path] = name.replace(os.sep, "/")
+    return sorted(found.items())
+
+
+def read_checkpoint(path):
+    """The latest checkpoint record of each file"""
+    records = {}
+    if os.path.exists(path):
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    continue  # a line cut short by a crash
+                records[record["path"]] = record
+    return records
+
+
+def prepare_files(files, batch_size, items):
+    """
+    Background stage: hash, extract and chunk `files` a batch at a time and
+    put one dict per file on the `items` queue, then None
+    """
+    try:
+        for start in range(0, len(files), batch_size):
+            prepared = []
+            for path, name in files[start:start + batch_size]:
+                stat = os.stat(path)
+                item = {"path": path, "name": name, "size": stat.st_size,
+                        "mtime": stat.st_mtime_ns, "sha256": file_hash(path),
+                        "chunks": None, "error": None}
+                item["duplicate"] = store.find_document(item["sha256"]) is not None
+                prepared.append(item)
+
+            to_extract = [item for item in prepared if not item["duplicate"]]
+            pages = {path: (texts, error) for path, texts, error
+                     in extract_documents([item["path"] for item in to_extract])}
+            for item in prepared:
+                if not item["duplicate"]:
+                    texts, item["error"] = pages[item["path"]]
+                    if texts is not None:
+                        item["total_pages"] = len(texts)
+                        item["chunks"], item["metadata"] = [], []
+                        for chunk_text, metadata in chunk_pages(enumerate(texts, start=1),
+                                                                model=config.get("embedding_model")):
+                            metadata['filename'] = item["name"]
+                            item["chunks"].append(chunk_text)
+                            item["metadata"].append(metadata)
+                items.put(item)
+        items.put(None)
+    except Exception as e:
+        items.put(e)
+
+
+def ingest_files(args):
+    """Add every PDF matched by args.paths, skipping those the checkpoint shows as done"""
+    root = os.path.abspath(args.root)
+    try:
+        files = find_pdfs(args.paths, root)
+    except ValueError as e:
+        print(f"❌ {e}")
+        return
+    checkpoint_path = args.checkpoint or os.path.join(store.db_dir, CHECKPOINT_NAME)
+    if args.restart and os.path.exists(checkpoint_path):
+        os.remove(checkpoint_path)
+    records = read_checkpoint(checkpoint_path)
+
+    # A checkpoint record only counts while its content is still stored under the same name
+    snapshot = store.snapshot()
+    stored = {}
+    if snapshot:
+        stored = {name: doc["sha256"] for name, doc in snapshot["documents"].items()}
+        stored.update((alias, stored[name]) for alias, name in snapshot["aliases"].items())
+    todo = []
+    for path, name in files:
+        record, stat = records.get(path), os.stat(path)
+        if record and record["status"] != "failed" and record["size"] == stat.st_size and \
+                record["mtime"] == stat.st_mtime_ns and record["name"] == name and \
+                stored.get(name) == record["sha256"]:
+            continue
+        todo.append((path, name))
+    print(f"📂 {len(files)} PDFs found, {len(files) - len(todo)} already ingested, "
+          f"{len(todo)} to go (checkpoint: {checkpoint_path})")
+    if not todo:
+        return
+
+    items = queue.Queue(maxsize=2 * args.batch)
+    threading.Thread(target=prepare_files, args=(todo, args.batch, items), daemon=True).start()
+    meter = Throughput()
+    counts = {"added": 0, "updated": 0, "unchanged": 0, "failed": 0}
+    os.makedirs(os.path.dirname(os.path.abspath(checkpoint_path)), exist_ok=True)
+    try:
+        with open(checkpoint_path, "a", encoding="utf-8") as checkpoint:
+            for n in range(1, len(todo) + 1):
+                item = items.get()
+                if isinstance(item, Exception):
+                    raise item
+                try:
+                    result = duplicate_result(item["name"], item["sha256"])
+                    if result is None and item["error"]:
+                        raise ValueError(item["error"])
+                    if result is None:
+                        result = index_chunks(item["name"], item["sha256"], item["total_pages"],
+                                              item["chunks"], item["metadata"], config, meter)
+                        meter.pages += result["total_pages"]
+                    status, error = result["status"], None
+                except Exception as e:
+                    result, status, error = None, "failed", str(e)
+                counts[status] += 1
+
+                checkpoint.write(json.dumps({
+                    "path": item["path"], "root": root, "name": item["name"], "size": item["size"],
+                    "mtime": item["mtime"], "sha256": item["sha256"], "status": status,
+                    "error": error, "finished_at": time.time()
+                }) + "\n")
+                checkpoint.flush()
+                os.fsync(checkpoint.fileno())
+
+                pages_s, chunks_s = meter.rates()
+                if error:
+                    print(f"❌ [{n}/{len(todo)}] {item['name']}: {error}")
+                else:
+                    print(f"✅ [{n}/{len(todo)}] {item['name']}: {status}, "
+                          f"{result['total_pages']} pages, {result['total_chunks']} chunks "
+                          f"({result['embedded_chunks']} embedded) | "
+                          f"{pages_s:.1f} pages/s, {chunks_s:.1f} chunks/s")
+    finally:
+        pdf_extractor.shutdown()
+
+    elapsed = time.perf_counter() - meter.start
+    pages_s, chunks_s = meter.rates()
+    print(f"\n📊 {len(todo)} files in {elapsed:.1f}s: " +
+          ", ".join(f"{count} {status}" for status, count in counts.items()))
+    print(f"📊 {meter.pages:,} pages ({pages_s:.1f}/s), {meter.chunks:,} chunks ({chunks_s:.1f}/s), "
+          f"{meter.embedded:,} embedded")
+    if counts["failed"]:
+        print("🔁 Failed files are retried on the next run")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build the RAG vector store from PDFs")
+    subparsers = parser.add_subparsers(dest="command")
+    ingest = subparsers.add_parser("ingest", help="add every PDF in directories or globs, resumably")
+    ingest.add_argument("paths", nargs="+", help="directories (searched recursively) or glob patterns")
+    ingest.add_argument("--root", default=".",
+                        help="documents are named by their path relative to this folder "
+                             "(default: the current directory)")
+    ingest.add_argument("--batch", type=int, default=16,
+                        help="files hashed and extracted together ahead of embedding")
+    ingest.add_argument("--checkpoint",
+                        help=f"progress file (default: <VECTOR_DB_DIR>/{CHECKPOINT_NAME})")
+    ingest.add_argument("--restart", action="store_true",
+                        help="ignore the checkpoint; stored files are still recognized by content")
+    args = parser.parse_args()
+    if args.command == "ingest":
+        ingest_files(args)
+        return
+
     # Convert PDF to vectors (run this once)
     pdf_file = r"d:\GenAI\Rag Model\RangeshPandian_Resume.pdf.pdf"  # Change to your PDF file
     embeddings, chunks = pdf_to_vectors(pdf_file)
 
-    print("\n🎉 Setup complete! Now you can run 'ask_questions.py' to chat with your PDF!")
\ No newline at end of file
+    print("\n🎉 Setup complete! Now you can run 'ask_questions.py' to chat with your PDF!")
+
+
+if __name__ == "__main__":
+    main()
\ No newline at end of file
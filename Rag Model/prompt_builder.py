@@ -0,0 +1,134 @@
+"""
+Prompt Builder Module
+Assembles the chat messages for a question within a token budget.
+
+The budget is CONTEXT_WINDOW_TOKENS minus ANSWER_RESERVE_TOKENS kept free for
+the answer. The system prompt and the question always go in. The chat history
+gets up to HISTORY_MAX_TOKENS: the newest turns are kept word for word and the
+older ones are compacted into one summary message that keeps the opening
+words of each turn. Retrieved chunks fill the rest, best first; the first
+chunk that does not fit is cut to the space left (if at least MIN_CHUNK_TOKENS)
+and the rest are dropped.
+"""
+import config as app_config
+from tokens import count_tokens, truncate_tokens
+
+# Role and separator tokens the chat format adds around every message
+MESSAGE_OVERHEAD_TOKENS = 4
+# A chunk cut shorter than this is not worth sending
+MIN_CHUNK_TOKENS = 32
+# Length of each compacted history turn in the summary
+SUMMARY_TURN_TOKENS = 40
+# Share of the history budget kept for the summary when not every turn fits
+SUMMARY_SHARE = 0.25
+
+HISTORY_ROLES = ("user", "assistant")
+
+
+class PromptBudgetError(ValueError):
+    """The system prompt and question alone do not fit in the budget"""
+
+
+def build_messages(system_prompt, question, chunks, history=None, model=None):
+    """
+    Build [system, (history summary), history..., user] messages.
+    `chunks` are (label, text) pairs, best first.
+    Returns (messages, positions of the chunks used, token report).
+    """
+    budget = app_config.CONTEXT_WINDOW_TOKENS - app_config.ANSWER_RESERVE_TOKENS
+    question_part = f"Question: {question}\n\nAnswer based on the context:"
+    fixed = message_tokens(system_prompt, model) + \
+        message_tokens(f"Context: \n\n{question_part}", model)
+    if fixed > budget:
+        raise PromptBudgetError(f"The question is too long: the prompt needs {fixed} tokens "
+                                f"and the budget is {budget}")
+
+    history_messages, compacted = compact_history(
+        history or [], min(app_config.HISTORY_MAX_TOKENS, budget - fixed), model)
+    remaining = budget - fixed - sum(message_tokens(m["content"], model) for m in history_messages)
+
+    context_parts, used = [], []
+    truncated = False
+    for position, (label, text) in enumerate(chunks):
+        part = f"{label}: {text}"
+        tokens = count_tokens(part + "\n\n", model)
+        if tokens > remaining:
+            if remaining >= MIN_CHUNK_TOKENS:
+                context_parts.append(truncate_tokens(part, remaining - 1, model))
+                used.append(position)
+                truncated = True
+            break
+        context_parts.append(part)
+        used.append(position)
+        remaining -= tokens
+
+    context = "\n\n".join(context_parts)
+    user_content = f"Context: {context}\n\n{question_part}"
+    messages = [{"role": "system", "content": system_prompt}] + history_messages + \
+        [{"role": "user", "content": user_content}]
+
+    # Counted on the final messages, so the report is exact
+    system_tokens = message_tokens(system_prompt, model)
+    history_tokens = sum(message_tokens(m["content"], model) for m in history_messages)
+    user_tokens = message_tokens(user_content, model)
+    question_tokens = message_tokens(f"Context: \n\n{question_part}", model)
+    report = {
+        "budget": budget,
+        "total": system_tokens + history_tokens + user_tokens,
+        "system": system_tokens,
+        "history": history_tokens,
+        "context": user_tokens - question_tokens,
+        "question": question_tokens,
+        "answer_reserve": app_config.ANSWER_RESERVE_TOKENS,
+        "history_turns": sum(1 for m in history_messages if m["role"] in HISTORY_ROLES),
+        "history_turns_compacted": compacted,
+        "chunks": len(used),
+        "chunks_dropped": len(chunks) - len(used),
+        "chunk_truncated": truncated
+    }
+    return messages, used, report
+
+
+def compact_history(history, max_tokens, model=None):
+    """
+    Fit chat history into max_tokens: the newest turns word for word, older
+    ones as a summary message in front of them.
+    Returns (messages, number of turns compacted into the summary).
+    """
+    turns = [{"role": m["role"], "content": m["content"]} for m in history
+             if isinstance(m, dict) and m.get("role") in HISTORY_ROLES and m.get("content")]
+
+    total = sum(message_tokens(m["content"], model) for m in turns)
+    verbatim_tokens = max_tokens if total <= max_tokens else int(max_tokens * (1 - SUMMARY_SHARE))
+    kept, used = [], 0
+    for message in reversed(turns):
+        tokens = message_tokens(message["content"], model)
+        if used + tokens > verbatim_tokens:
+            break
+        kept.insert(0, message)
+        used += tokens
+    older = turns[:len(turns) - len(kept)]
+    if not older:
+        return kept, 0
+
+    # Newest of the older turns first, until the summary fills the space left
+    header = "Summary of the earlier conversation:"
+    summary_tokens = message_tokens(header, model)
+    lines = []
+    for message in reversed(older):
+        text = " ".join(message["content"].split())
+        short = truncate_tokens(text, SUMMARY_TURN_TOKENS, model)
+        line = f"- {message['role'].capitalize()}: {short}{'...' if short != text else ''}"
+        tokens = count_tokens(line + "\n", model)
+        if used + summary_tokens + tokens > max_tokens:
+            break
+        lines.insert(0, line)
+        summary_tokens += tokens
+    if not lines:
+        return kept, len(older)
+    return [{"role": "system", "content": "\n".join([header] + lines)}] + kept, len(older)
+
+
+def message_tokens(content, model=None):
+    """Tokens a chat message with this content takes up in the prompt"""
+    return count_tokens(content, model) + MESSAGE_OVERHEAD_TOKENS
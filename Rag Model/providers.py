@@ -0,0 +1,168 @@
+"""
+Providers Module
+Shared, pooled clients for the embedding and chat APIs, with per-provider metrics.
+
+HTTP APIs (Ollama and friends) go through one requests.Session per provider,
+which keeps connections alive. Embedding requests retry connection errors and
+502/503/504 responses (PROVIDER_RETRIES); chat requests retry only CHAT_RETRIES
+times, default 0, since a failed generation may still have run and been billed.
+OpenAI clients are created once per API key and reused, with the same retry
+split. Every call is timed into a latency histogram and counted, with errors
+broken down by HTTP status or exception type; see get_metrics().
+
+This module is copied verbatim into both apps, which are built from their own
+folders (see the Dockerfiles); change both copies together.
+"""
+import threading
+import time
+from contextlib import contextmanager
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+import config as app_config
+
+# Upper bounds (ms) of the latency histogram buckets; the last bucket is open-ended
+LATENCY_BUCKETS_MS = (25, 50, 100, 250, 500, 1000, 2500, 5000, 10000, 30000)
+
+_sessions = {}
+_openai_clients = {}
+_metrics = {}
+_lock = threading.Lock()
+
+
+def get_session(provider, retries=None):
+    """The shared keep-alive session for a provider, retrying `retries` times"""
+    if retries is None:
+        retries = app_config.PROVIDER_RETRIES
+    with _lock:
+        session = _sessions.get((provider, retries))
+        if session is None:
+            retry = Retry(
+                total=retries,
+                backoff_factor=0.5,
+                status_forcelist=(502, 503, 504),
+                # The APIs are all POST; callers choose how many retries are safe
+                allowed_methods=None,
+                raise_on_status=False
+            )
+            adapter = HTTPAdapter(pool_connections=4, pool_maxsize=app_config.PROVIDER_POOL_SIZE,
+                                  max_retries=retry)
+            session = requests.Session()
+            session.mount("http://", adapter)
+            session.mount("https://", adapter)
+            _sessions[(provider, retries)] = session
+    return session
+
+
+def post(provider, operation, url, **kwargs):
+    """
+    POST through the provider's session with the configured timeouts, recording
+    latency and errors. With stream=True the latency is the time to the headers.
+    Chat operations ("chat", "chat_stream") retry CHAT_RETRIES times.
+    """
+    kwargs.setdefault("timeout", (app_config.PROVIDER_CONNECT_TIMEOUT,
+                                  app_config.PROVIDER_READ_TIMEOUT))
+    start = time.perf_counter()
+    try:
+        response = get_session(provider, _retries(operation)).post(url, **kwargs)
+    except Exception as e:
+        _record(provider, operation, time.perf_counter() - start, type(e).__name__)
+        raise
+    error = f"HTTP {response.status_code}" if response.status_code >= 400 else None
+    _record(provider, operation, time.perf_counter() - start, error)
+    return response
+
+
+def get_openai_client(api_key, base_url=None, chat=False):
+    """
+    A shared OpenAI client (it keeps its own connection pool). Pass chat=True
+    for chat completions so they retry CHAT_RETRIES times, not PROVIDER_RETRIES.
+    """
+    max_retries = app_config.CHAT_RETRIES if chat else app_config.PROVIDER_RETRIES
+    key = (api_key, base_url, max_retries)
+    with _lock:
+        client = _openai_clients.get(key)
+        if client is None:
+            from openai import OpenAI
+            client = OpenAI(
+                api_key=api_key,
+                base_url=base_url,
+                timeout=app_config.PROVIDER_READ_TIMEOUT,
+                max_retries=max_retries
+            )
+            _openai_clients[key] = client
+    return client
+
+
+@contextmanager
+def track(provider, operation):
+    """Time a block that calls a provider SDK, counting any exception as an error"""
+    start = time.perf_counter()
+    try:
+        yield
+    except Exception as e:
+        status = getattr(e, "status_code", None)
+        _record(provider, operation, time.perf_counter() - start,
+                f"HTTP {status}" if status else type(e).__name__)
+        raise
+    _record(provider, operation, time.perf_counter() - start, None)
+
+
+def get_metrics():
+    """Per-provider request counts, error counts and latency histograms"""
+    with _lock:
+        metrics = {}
+        for provider, m in _metrics.items():
+            metrics[provider] = {
+                "requests": m["requests"],
+                "errors": m["errors"],
+                "error_types": dict(m["error_types"]),
+                "operations": dict(m["operations"]),
+                "mean_ms": round(m["total_ms"] / m["requests"], 1) if m["requests"] else None,
+                "max_ms": round(m["max_ms"], 1),
+                "p50_ms": _percentile(m, 0.50),
+                "p95_ms": _percentile(m, 0.95),
+                # Bucket upper bounds in ms; None is the open-ended last bucket
+                "histogram_ms": [{"le": bound, "count": count} for bound, count
+                                 in zip(LATENCY_BUCKETS_MS + (None,), m["histogram"])]
+            }
+        return metrics
+
+
+def _retries(operation):
+    """Retries for a request: chat generation is not safe to repeat by default"""
+    if operation.startswith("chat"):
+        return app_config.CHAT_RETRIES
+    return app_config.PROVIDER_RETRIES
+
+
+def _record(provider, operation, seconds, error):
+    elapsed_ms = seconds * 1000
+    bucket = next((i for i, bound in enumerate(LATENCY_BUCKETS_MS) if elapsed_ms <= bound),
+                  len(LATENCY_BUCKETS_MS))
+    with _lock:
+        m = _metrics.setdefault(provider, {
+            "requests": 0, "errors": 0, "error_types": {}, "operations": {},
+            "total_ms": 0.0, "max_ms": 0.0, "histogram": [0] * (len(LATENCY_BUCKETS_MS) + 1)
+        })
+        m["requests"] += 1
+        m["operations"][operation] = m["operations"].get(operation, 0) + 1
+        m["total_ms"] += elapsed_ms
+        m["max_ms"] = max(m["max_ms"], elapsed_ms)
+        m["histogram"][bucket] += 1
+        if error:
+            m["errors"] += 1
+            m["error_types"][error] = m["error_types"].get(error, 0) + 1
+
+
+def _percentile(m, q):
+    """Upper bound of the histogram bucket holding the q-th quantile"""
+    if not m["requests"]:
+        return None
+    seen = 0
+    for bound, count in zip(LATENCY_BUCKETS_MS, m["histogram"]):
+        seen += count
+        if seen >= q * m["requests"]:
+            return bound
+    # Open-ended last bucket: the slowest call is the best bound we have
+    return round(m["max_ms"], 1)
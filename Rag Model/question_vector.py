@@ -1,50 +1,28 @@
-import faiss
 import numpy as np
-import pickle
-import os
-import requests
-from config import get_api_config, validate_config
+import providers
+from config import get_api_config, validate_config, RETRIEVAL_TOP_K, CONTEXT_WINDOW_TOKENS
+from embeddings import get_embedding
+from prompt_builder import build_messages
+from providers import get_openai_client, track
+from vector_store import store
 
 # Validate and get configuration
 validate_config()
 config = get_api_config()
 
 
-def get_embedding(text, config):
-    """Get embedding for text using the configured API"""
-    if config["api_type"] == "openai":
-        from openai import OpenAI
-        client = OpenAI(api_key=config["api_key"])
-        response = client.embeddings.create(input=text, model=config["embedding_model"])
-        return response.data[0].embedding
-    
-    elif config["api_type"] == "ollama":
-        # Ollama API call
-        response = requests.post(
-            f"{config['base_url']}/api/embeddings",
-            json={"model": config["embedding_model"], "prompt": text}
-        )
-        if response.status_code == 200:
-            return response.json()["embedding"]
-        else:
-            raise Exception(f"Ollama API error: {response.status_code} - {response.text}")
-    
-    else:
-        raise ValueError(f"Unknown API type: {config['api_type']}")
-
-
 def get_chat_response(messages, config):
     """Get chat response using the configured API"""
-    if config["api_type"] == "openai":
-        from openai import OpenAI
-        client = OpenAI(api_key=config["api_key"])
-        response = client.chat.completions.create(
-            model=config["chat_model"],
-            messages=messages
-        )
+    if config["chat_api_type"] == "openai":
+        client = get_openai_client(config["api_key"], chat=True)
+        with track("openai", "chat"):
+            response = client.chat.completions.create(
+                model=config["chat_model"],
+                messages=messages
+            )
         return response.choices[0].message.content
     
-    elif config["api_type"] == "ollama":
+    elif config["chat_api_type"] == "ollama":
         # Ollama API call
         # Convert messages to prompt format for Ollama
         prompt = ""
@@ -56,12 +34,14 @@ def get_chat_response(messages, config):
             elif role == "user":
                 prompt += f"User: {content}\n\n"
         
-        response = requests.post(
+        response = providers.post(
+            "ollama", "chat",
             f"{config['base_url']}/api/generate",
             json={
                 "model": config["chat_model"],
                 "prompt": prompt,
-                "stream": False
+                "stream": False,
+                "options": {"num_ctx": CONTEXT_WINDOW_TOKENS}
             }
         )
         if response.status_code == 200:
@@ -70,59 +50,41 @@ def get_chat_response(messages, config):
             raise Exception(f"Ollama API error: {response.status_code} - {response.text}")
     
     else:
-        raise ValueError(f"Unknown API type: {config['api_type']}")
+        raise ValueError(f"Unknown API type: {config['chat_api_type']}")
 
 
 def ask_question(question):
-    # Check if vector files exist
-    if not os.path.exists("vectors.index") or not os.path.exists("chunks.pkl"):
+    # Check if the vector database exists
+    snapshot = store.snapshot()
+    if snapshot is None:
         print("❌ Error: Vector database not found!")
         print("🔧 Please run 'pdf_vector.py' first to create the database.")
         return None
 
     try:
-        # Load saved data
-        index = faiss.read_index("vectors.index")
-        with open("chunks.pkl", "rb") as f:
-            data = pickle.load(f)
-
-        chunks = data['chunks']
-        metadata = data['metadata']
-        total_pages = data['total_pages']
+        total_pages = snapshot['total_pages']
 
         # Get question embedding
         query_embedding = get_embedding(question, config)
         query_vector = np.array(query_embedding).reshape(1, -1)
 
         # Search similar chunks
-        scores, indices = index.search(query_vector.astype('float32'), 3)
+        hits = store.search(query_vector, RETRIEVAL_TOP_K, snapshot=snapshot,
+                            query_texts=[question])[0]
 
         # Show similarity scores and page info for debugging
-        print(f"🔍 Found {len(indices[0])} relevant chunks:")
-        for i, (score, idx) in enumerate(zip(scores[0], indices[0])):
-            page_num = metadata[idx]['estimated_page']
-            print(f"   Chunk {i + 1}: Score {score:.3f} (≈Page {page_num})")
-
-        # Build context with page information
-        context_parts = []
-        for idx in indices[0]:
-            chunk_text = chunks[idx]
-            page_num = metadata[idx]['estimated_page']
-            context_parts.append(f"[Page {page_num}]: {chunk_text}")
-
-        context = '\n\n'.join(context_parts)
-
-        # Get answer using configured API
-        messages = [
-            {
-                "role": "system",
-                "content": f"You are answering questions about a {total_pages}-page document. When providing answers, mention page numbers when relevant."
-            },
-            {
-                "role": "user",
-                "content": f"Context: {context}\n\nQuestion: {question}\n\nAnswer based on the context:"
-            }
-        ]
+        print(f"🔍 Found {len(hits)} relevant chunks:")
+        for i, hit in enumerate(hits):
+            page_num = hit['metadata']['page_number']
+            print(f"   Chunk {i + 1}: Score {hit['score']:.3f} (Page {page_num})")
+
+        # Build context with page information, within the prompt token budget
+        messages, _, _ = build_messages(
+            f"You are answering questions about a {total_pages}-page document. When providing answers, mention page numbers when relevant.",
+            question,
+            [(f"[Page {hit['metadata']['page_number']}]", hit['text']) for hit in hits],
+            model=config.get("chat_model")
+        )
         
         answer = get_chat_response(messages, config)
         return answer
@@ -134,7 +96,13 @@ def ask_question(question):
 
 def main():
     # Check if database exists
-    if not os.path.exists("vectors.index") or not os.path.exists("chunks.pkl"):
+    try:
+        snapshot = store.snapshot()
+    except Exception as e:
+        print(f"❌ Error loading database: {str(e)}")
+        return
+
+    if snapshot is None:
         print("❌ Vector database not found!")
         print("🔧 Please run 'pdf_to_vectors.py' first to create the database.")
         print("📋 Steps:")
@@ -142,19 +110,10 @@ def main():
         print("   2. Then run: python ask_questions.py")
         return
 
-    # Load database info
-    try:
-        index = faiss.read_index("vectors.index")
-        with open("chunks.pkl", "rb") as f:
-            data = pickle.load(f)
-
-        chunks = data['chunks']
-        total_pages = data['total_pages']
-
-        print(f"✅ Database loaded: {len(chunks)} chunks from {total_pages} pages")
-    except Exception as e:
-        print(f"❌ Error loading database: {str(e)}")
-        return
+    total_chunks = snapshot['total_chunks']
+    total_pages = snapshot['total_pages']
+    sample_chunk = snapshot['segments'][0]['chunks'].get_text(0)
+    print(f"✅ Database loaded: {total_chunks} chunks from {total_pages} pages")
 
     # Interactive question loop
     print("\n" + "=" * 60)
@@ -175,10 +134,10 @@ def main():
         if question.lower() == 'info':
             print(f"📊 Database Info:")
             print(f"   • Total pages: {total_pages}")
-            print(f"   • Total chunks: {len(chunks)}")
+            print(f"   • Total chunks: {total_chunks}")
             print(f"   • Vector dimensions: 1536")
-            print(f"   • Average chunks per page: {len(chunks) / total_pages:.1f}")
-            print(f"   • Sample chunk: {chunks[0][:100]}...")
+            print(f"   • Average chunks per page: {total_chunks / total_pages:.1f}")
+            print(f"   • Sample chunk: {sample_chunk[:100]}...")
             continue
 
         # Skip empty questions
@@ -196,4 +155,4 @@ def main():
 
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
\ No newline at end of file
@@ -0,0 +1,136 @@
+"""
+Reranker Module
+Re-scores retrieved chunks against the question with a cross-encoder on CPU.
+
+With re-ranking on, retrieval fetches RERANK_CANDIDATES chunks instead of
+top_k, and a small cross-encoder (RERANK_MODEL, run through
+sentence-transformers) reads each (question, chunk) pair together and scores
+it. The best top_k go to the LLM. Pairs are scored RERANK_BATCH_SIZE at a
+time, best retrieved first, within RERANK_BUDGET_MS per question:
+
+    - the measured cost per pair caps how many candidates are scored, and
+      each batch is cut to what fits in the time left
+    - candidates that were not scored in time are dropped; the best of
+      those scored are ranked
+    - if fewer than top_k could be scored, re-ranking is skipped and the
+      retrieval order is kept; every skip lowers the cost estimate a little,
+      so a model that has sped up again (e.g. after a load spike) is retried
+
+Needs `pip install sentence-transformers`; the model is downloaded on first use.
+"""
+import threading
+import time
+import config as app_config
+
+# Weight of the newest batch in the running cost-per-pair estimate
+COST_SMOOTHING = 0.5
+
+
+class Reranker:
+    """Cross-encoder over (question, chunk) pairs with a per-question latency budget"""
+
+    def __init__(self, model_name, batch_size=16, budget_ms=300, max_length=256):
+        try:
+            from sentence_transformers import CrossEncoder
+        except ImportError:
+            raise ImportError("Re-ranking needs sentence-transformers: "
+                              "pip install sentence-transformers")
+        self.model_name = model_name
+        self.batch_size = max(batch_size, 1)
+        self.budget_ms = budget_ms
+        self.model = CrossEncoder(model_name, device="cpu", max_length=max_length)
+        self.ms_per_pair = None
+        # One batch at a time: concurrent CPU batches only fight over the cores
+        self._lock = threading.Lock()
+        self.reranked = 0
+        self.partial = 0
+        self.skipped = 0
+        self.pairs_scored = 0
+
+    def rerank(self, question, hits, k):
+        """
+        The best k of `hits` (in retrieval order) by cross-encoder score, each
+        with "rerank_score".
+        Returns (hits, report); when re-ranking is skipped the hits are the
+        first k, unchanged.
+        """
+        start = time.perf_counter()
+        wanted = min(k, len(hits))
+        limit = len(hits)
+        if self.budget_ms > 0 and self.ms_per_pair:
+            limit = min(limit, int(self.budget_ms / self.ms_per_pair))
+
+        scores = []
+        while wanted <= limit and len(scores) < limit:
+            size = min(self.batch_size, limit - len(scores))
+            if scores and self.budget_ms > 0:
+                remaining_ms = self.budget_ms - (time.perf_counter() - start) * 1000
+                size = min(size, int(remaining_ms / self.ms_per_pair))
+                if size <= 0:
+                    break
+            batch = hits[len(scores):len(scores) + size]
+            scores.extend(self._score([(question, hit["text"]) for hit in batch]))
+
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        report = {
+            "model": self.model_name,
+            "candidates": len(hits),
+            "scored": len(scores),
+            "skipped": len(scores) < wanted,
+            "ms": round(elapsed_ms, 2)
+        }
+        if report["skipped"]:
+            self.skipped += 1
+            if not scores and self.ms_per_pair:
+                self.ms_per_pair *= 1 - COST_SMOOTHING
+            return hits[:k], report
+
+        self.reranked += 1
+        if len(scores) < len(hits):
+            self.partial += 1
+        order = sorted(range(len(scores)), key=lambda i: scores[i], reverse=True)[:k]
+        return [dict(hits[i], rerank_score=scores[i]) for i in order], report
+
+    def get_stats(self):
+        return {
+            "model": self.model_name,
+            "budget_ms": self.budget_ms,
+            "ms_per_pair": round(self.ms_per_pair, 3) if self.ms_per_pair else None,
+            "reranked": self.reranked,
+            "partial": self.partial,
+            "skipped": self.skipped,
+            "pairs_scored": self.pairs_scored
+        }
+
+    def _score(self, pairs):
+        with self._lock:
+            started = time.perf_counter()
+            scores = self.model.predict(pairs, batch_size=len(pairs), show_progress_bar=False)
+            cost = (time.perf_counter() - started) * 1000 / len(pairs)
+            self.ms_per_pair = cost if self.ms_per_pair is None else \
+                (1 - COST_SMOOTHING) * self.ms_per_pair + COST_SMOOTHING * cost
+            self.pairs_scored += len(pairs)
+        return [float(score) for score in scores]
+
+
+_reranker = None
+_reranker_lock = threading.Lock()
+
+
+def get_reranker():
+    """Return the shared reranker, loading its model on first use"""
+    global _reranker
+    with _reranker_lock:
+        if _reranker is None:
+            _reranker = Reranker(
+                app_config.RERANK_MODEL,
+                batch_size=app_config.RERANK_BATCH_SIZE,
+                budget_ms=app_config.RERANK_BUDGET_MS,
+                max_length=app_config.RERANK_MAX_LENGTH
+            )
+    return _reranker
+
+
+def get_reranker_stats():
+    """Stats of the shared reranker, or None if it has not been loaded"""
+    return _reranker.get_stats() if _reranker is not None else None
@@ -108,16 +108,7 @@ async function handleFile(file) {
     progressFill.style.width = '0%';
     progressText.textContent = 'Uploading...';
     
-    // Simulate upload progress
-    let progress = 0;
-    const progressInterval = setInterval(() => {
-        progress += 10;
-        if (progress <= 90) {
-            progressFill.style.width = progress + '%';
-        }
-    }, 200);
-    
-    // Upload file
+    // Upload file; the server queues it and returns a job to poll
     const formData = new FormData();
     formData.append('file', file);
     
@@ -128,39 +119,81 @@ async function handleFile(file) {
         });
         
         const data = await response.json();
+        if (!data.success) {
+            throw new Error(data.error);
+        }
         
-        clearInterval(progressInterval);
-        progressFill.style.width = '100%';
+        const job = await pollJob(data.job_id, (job) => {
+            progressFill.style.width = jobPercent(job) + '%';
+            progressText.textContent = jobProgressText(job);
+        });
         
-        if (data.success) {
-            progressText.textContent = 'Processing complete!';
-            
-            setTimeout(() => {
-                uploadProgress.classList.add('hidden');
-                showDocumentInfo({
-                    total_chunks: data.total_chunks,
-                    total_pages: data.total_pages
-                });
-                showChatSection();
-                showNotification('PDF processed successfully!', 'success');
-            }, 1000);
-        } else {
-            progressText.textContent = 'Error: ' + data.error;
-            showNotification('Error processing PDF: ' + data.error, 'error');
-            setTimeout(() => {
-                uploadProgress.classList.add('hidden');
-            }, 3000);
+        if (job.status !== 'completed') {
+            throw new Error(job.error || 'Processing failed');
         }
+        
+        progressFill.style.width = '100%';
+        progressText.textContent = 'Processing complete!';
+        
+        setTimeout(() => {
+            uploadProgress.classList.add('hidden');
+            showDocumentInfo({
+                total_chunks: job.result.total_chunks,
+                total_pages: job.result.total_pages
+            });
+            showChatSection();
+            showNotification('PDF processed successfully!', 'success');
+        }, 1000);
     } catch (error) {
-        clearInterval(progressInterval);
-        progressText.textContent = 'Upload failed';
-        showNotification('Error uploading file: ' + error.message, 'error');
+        progressText.textContent = 'Error: ' + error.message;
+        showNotification('Error processing PDF: ' + error.message, 'error');
         setTimeout(() => {
             uploadProgress.classList.add('hidden');
         }, 3000);
     }
 }
 
+// Share of the progress bar given to each ingest stage
+const JOB_STAGE_WEIGHTS = { extracting: [0, 30], embedding: [30, 95], indexing: [95, 100] };
+
+async function pollJob(jobId, onProgress, interval = 500) {
+    while (true) {
+        const response = await fetch(`${API_BASE}/jobs/${jobId}`);
+        const data = await response.json();
+        if (!data.success) {
+            throw new Error(data.error);
+        }
+        
+        onProgress(data.job);
+        if (data.job.status === 'completed' || data.job.status === 'failed') {
+            return data.job;
+        }
+        await new Promise(resolve => setTimeout(resolve, interval));
+    }
+}
+
+function jobPercent(job) {
+    const [start, end] = JOB_STAGE_WEIGHTS[job.stage] || [0, 0];
+    const stage = job.stages[job.stage];
+    if (!stage || !stage.total) {
+        return start;
+    }
+    return Math.round(start + (end - start) * stage.done / stage.total);
+}
+
+function jobProgressText(job) {
+    if (job.status === 'queued') {
+        return 'Waiting in queue...';
+    }
+    const stage = job.stages[job.stage];
+    if (!stage) {
+        return 'Processing...';
+    }
+    const label = job.stage.charAt(0).toUpperCase() + job.stage.slice(1);
+    const rate = stage.per_second ? ` (${stage.per_second} ${stage.unit}/s)` : '';
+    return `${label} ${stage.done}/${stage.total ?? '?'} ${stage.unit}${rate}`;
+}
+
 // ==================== UI Management ====================
 function showDocumentInfo(data) {
     const documentInfo = document.getElementById('documentInfo');
@@ -227,7 +260,7 @@ async function askQuestion() {
                 content: msg.content
             }));
 
-        const response = await fetch(`${API_BASE}/ask`, {
+        const response = await fetch(`${API_BASE}/ask/stream`, {
             method: 'POST',
             headers: {
                 'Content-Type': 'application/json'
@@ -238,21 +271,36 @@ async function askQuestion() {
             })
         });
         
-        const data = await response.json();
-        
-        // Remove loading indicator
-        removeLoadingMessage(loadingId);
-        
-        if (data.success) {
-            addMessage(data.answer, 'bot', data.relevant_chunks);
-        } else {
-            addMessage('Sorry, I encountered an error: ' + data.error, 'bot');
-            showNotification('Error: ' + data.error, 'error');
+        if (!response.ok) {
+            const data = await response.json();
+            throw new Error(data.error);
         }
+        
+        // The answer is streamed in: relevant chunks first, then tokens
+        let answerParagraph = null;
+        let answerEntry = null;
+        await readEventStream(response, (event, data) => {
+            if (event === 'chunks') {
+                removeLoadingMessage(loadingId);
+                answerParagraph = addMessage('', 'bot', data.relevant_chunks);
+                answerEntry = chatHistory[chatHistory.length - 1];
+                const prompt = data.prompt;
+                console.log(`Prompt: ${prompt.total}/${prompt.budget} tokens (history ${prompt.history}, context ${prompt.context}), ${prompt.history_turns_compacted} older turns summarized`);
+            } else if (event === 'token') {
+                answerEntry.content += data.text;
+                answerParagraph.textContent = answerEntry.content;
+                const messagesContainer = document.getElementById('chatMessages');
+                messagesContainer.scrollTop = messagesContainer.scrollHeight;
+            } else if (event === 'done') {
+                console.log(`Answer: ${data.tokens} tokens, first token ${data.ttft_ms} ms, ${data.tokens_per_second} tokens/s`);
+            } else if (event === 'error') {
+                throw new Error(data.error);
+            }
+        });
     } catch (error) {
         removeLoadingMessage(loadingId);
-        addMessage('Sorry, I encountered a network error. Please try again.', 'bot');
-        showNotification('Network error: ' + error.message, 'error');
+        addMessage('Sorry, I encountered an error: ' + error.message, 'bot');
+        showNotification('Error: ' + error.message, 'error');
     } finally {
         // Re-enable input
         input.disabled = false;
@@ -313,6 +361,40 @@ function addMessage(content, type, chunks = null) {
     
     // Store in history
     chatHistory.push({ type, content, chunks, timestamp: new Date() });
+    
+    return messageParagraph;
+}
+
+// Read a Server-Sent Events response, calling onEvent(event, data) per event
+async function readEventStream(response, onEvent) {
+    const reader = response.body.getReader();
+    const decoder = new TextDecoder();
+    let buffer = '';
+    
+    while (true) {
+        const { done, value } = await reader.read();
+        if (done) {
+            break;
+        }
+        buffer += decoder.decode(value, { stream: true });
+        
+        let boundary;
+        while ((boundary = buffer.indexOf('\n\n')) !== -1) {
+            const raw = buffer.slice(0, boundary);
+            buffer = buffer.slice(boundary + 2);
+            
+            let event = 'message';
+            let data = '';
+            raw.split('\n').forEach(line => {
+                if (line.startsWith('event: ')) {
+                    event = line.slice(7);
+                } else if (line.startsWith('data: ')) {
+                    data += line.slice(6);
+                }
+            });
+            onEvent(event, data ? JSON.parse(data) : null);
+        }
+    }
 }
 
 function addLoadingMessage() {
@@ -0,0 +1,57 @@
+import numpy as np
+import pytest
+import config as app_config
+from vector_store import VectorStore
+
+DIM = 64
+CHUNKS = 300
+
+
+def add_document(store, name, vectors):
+    store.append(vectors, [f"{name} chunk {i}" for i in range(len(vectors))],
+                 [{"start_pos": 0, "estimated_page": 1, "filename": name}] * len(vectors),
+                 name, 1, DIM)
+
+
+@pytest.mark.parametrize("index_type", ["flat", "ivf_pq", "sq8", "binary"])
+def test_old_snapshot_still_searches_deleted_document(tmp_path, monkeypatch, index_type):
+    monkeypatch.setattr(app_config, "INDEX_TYPE", index_type)
+    monkeypatch.setattr(app_config, "ANN_MIN_VECTORS", 1)
+    store = VectorStore(str(tmp_path))
+    rng = np.random.default_rng(0)
+    vectors = {name: rng.standard_normal((CHUNKS, DIM)).astype('float32')
+               for name in ("a.pdf", "b.pdf")}
+    for name, doc_vectors in vectors.items():
+        add_document(store, name, doc_vectors)
+
+    query = vectors["a.pdf"][:1]
+    old = store.snapshot()
+    before = store.search(query, 5, snapshot=old, mode="dense", min_score=-1, mmr_lambda=1)
+    assert before[0][0]["text"] == "a.pdf chunk 0"
+
+    # Deleting a.pdf drops its segment and files; the old snapshot must not notice
+    assert store.delete_document("a.pdf") == CHUNKS
+    assert store.search(query, 5, snapshot=old, mode="dense", min_score=-1, mmr_lambda=1) == before
+    assert all(hit["metadata"]["filename"] == "b.pdf"
+               for hit in store.search(query, 5, mode="dense", min_score=-1, mmr_lambda=1)[0])
+
+
+def test_alias_is_searched_and_deleted_without_a_second_copy(tmp_path):
+    store = VectorStore(str(tmp_path))
+    vectors = np.random.default_rng(1).standard_normal((20, DIM)).astype('float32')
+    add_document(store, "a.pdf", vectors)
+    store.add_alias("copy.pdf", "a.pdf")
+
+    snapshot = store.snapshot()
+    assert snapshot["total_chunks"] == 20
+    assert snapshot["documents"]["a.pdf"]["aliases"] == ["copy.pdf"]
+    hits = store.search(vectors[:1], 3, documents=["copy.pdf"], mode="dense")[0]
+    assert hits[0]["text"] == "a.pdf chunk 0"
+
+    # Deleting the alias keeps the document; deleting the document drops its aliases
+    assert store.delete_document("copy.pdf") == 20
+    assert store.snapshot()["files"] == ["a.pdf"]
+    store.add_alias("copy.pdf", "a.pdf")
+    store.delete_document("a.pdf")
+    assert store.snapshot() is None
+    assert VectorStore(str(tmp_path)).snapshot() is None
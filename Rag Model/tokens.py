@@ -0,0 +1,46 @@
+"""
+Token Counting Module
+Counts tokens for chunking and prompt budgets.
+
+Uses tiktoken when it is installed (exact for OpenAI models, a close estimate
+for others); otherwise falls back to the usual ~4 characters per token.
+"""
+from functools import lru_cache
+
+CHARS_PER_TOKEN = 4
+
+
+@lru_cache(maxsize=8)
+def _get_encoding(model):
+    try:
+        import tiktoken
+    except ImportError:
+        return None
+    try:
+        return tiktoken.encoding_for_model(model) if model else tiktoken.get_encoding("cl100k_base")
+    except KeyError:
+        # Not an OpenAI model name (e.g. an Ollama model); cl100k is a fair estimate
+        return tiktoken.get_encoding("cl100k_base")
+
+
+def count_tokens(text, model=None):
+    """Number of tokens in text for the given model"""
+    if not text:
+        return 0
+    encoding = _get_encoding(model)
+    if encoding is None:
+        return max(1, (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN)
+    return len(encoding.encode(text, disallowed_special=()))
+
+
+def truncate_tokens(text, max_tokens, model=None):
+    """The longest prefix of text that is at most max_tokens tokens"""
+    if max_tokens <= 0:
+        return ""
+    encoding = _get_encoding(model)
+    if encoding is None:
+        return text[:max_tokens * CHARS_PER_TOKEN]
+    tokens = encoding.encode(text, disallowed_special=())
+    if len(tokens) <= max_tokens:
+        return text
+    return encoding.decode(tokens[:max_tokens])
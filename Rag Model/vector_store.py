@@ -0,0 +1,1096 @@
+"""
+Vector Store Module
+Keeps the FAISS vectors and chunk data resident in memory for the RAG backend.
+
+On disk the store is a directory of append-only segments plus a manifest:
+
+    vector_db/
+        manifest.json            # segment list, totals, versions
+        seg-000001.index         # FAISS index for one upload
+        seg-000001.offsets.npy   # chunk texts and metadata for that upload,
+        seg-000001.text.bin      #   in the memory-mapped columnar format
+        seg-000001.meta.npy      #   described in chunk_store.py
+        seg-000001.bm25.npz      # BM25 postings for the same chunks (lexical_index.py)
+
+Each upload writes one new segment and rewrites only the small manifest, so
+ingest cost is proportional to the new document. Once there are too many
+segments a background thread merges the small ones together. Segments use the
+index type chosen by index_factory.py; non-flat segments also keep their float
+vectors in seg-NNNNNN.vectors.npy for compaction and index rebuilds. Segments
+with compressed indexes (ivf_pq, fp16, sq8, binary) hold only the codes in
+memory; their candidates are re-scored against the memory-mapped float vectors.
+
+Vectors are L2-normalized before they are indexed and queries are normalized
+before they are searched, so inner-product scores are cosine similarities.
+The original norms are kept in seg-NNNNNN.norms.npy.
+
+Searches are dense (FAISS), lexical (BM25) or hybrid, where the two rankings
+are merged by reciprocal-rank fusion: each chunk scores the sum over the
+retrievers of weight / (RRF_K + rank), so exact identifiers and numbers that
+embeddings blur still surface, without having to calibrate BM25 against
+cosine scores.
+
+Each segment's manifest entry maps the documents in it to their chunk ranges
+("documents"). A search can be restricted to some documents: segments holding
+none of them are skipped, and within a mixed segment only their ranges are
+searched (through a FAISS ID selector, or an exact scan of the range's
+vectors for ANN indexes, whose graphs and lists do not filter well).
+Deleting a document drops the segments that hold only that document and
+tombstones its ranges in the others ("deleted"); tombstoned chunks are never
+returned and are dropped for good when their segment is next compacted.
+Documents also record the SHA-256 of their file ("sha256"), so re-uploads of
+the same content can be recognized; appending a document that is already
+stored replaces the old version in the same commit. A re-upload under another
+name is recorded as an alias of the stored document ("aliases" in the
+manifest) instead of a second copy of its chunks: searches and deletes accept
+either name, and deleting the stored document deletes its aliases too.
+
+Writers in any process serialize on the lock file vector_db/manifest.lock:
+under it they re-read the manifest if another process has committed since,
+write their new segment files, then replace manifest.json atomically (written
+to a temp file, fsynced, renamed). A crash before the rename leaves only
+unreferenced segment files; readers keep searching the snapshot they hold
+and pick up other processes' commits on their next snapshot() call.
+
+The manifest "version" changes on every commit; "corpus_version" changes only
+when documents are added or removed (not on compaction or index rebuilds), so
+results cached against it stay valid until the content changes.
+"""
+import hashlib
+import json
+import os
+import pickle
+import threading
+import time
+from contextlib import contextmanager
+import faiss
+import numpy as np
+import config as app_config
+from chunk_store import ChunkStore, SUFFIXES as CHUNK_SUFFIXES
+from file_lock import FileLock
+from index_factory import (build_index, choose_index_type, keeps_vector_file, read_index,
+                           rerank_depth, rescore, search_index, search_params, write_index)
+from lexical_index import LexicalIndex, bm25_search, SUFFIXES as LEXICAL_SUFFIXES
+
+MANIFEST_NAME = "manifest.json"
+LOCK_NAME = "manifest.lock"
+
+RETRIEVAL_MODES = ("dense", "lexical", "hybrid")
+
+# Compact a segment on its own once this share of its chunks is deleted
+PURGE_DELETED_FRACTION = 0.25
+
+# Files written by the original single-file format, migrated on first load
+LEGACY_INDEX_PATH = "vectors.index"
+LEGACY_CHUNKS_PATH = "chunks.pkl"
+
+
+def normalize_vectors(vectors):
+    """Return (unit-length float32 copy of vectors, their original L2 norms)"""
+    vectors = np.array(vectors, dtype='float32', copy=True, ndmin=2)
+    norms = np.linalg.norm(vectors, axis=1).astype('float32')
+    faiss.normalize_L2(vectors)
+    return vectors, norms
+
+
+def chunk_hash(text):
+    """Content hash of a chunk text; equal texts have equal embeddings"""
+    return hashlib.sha1(text.encode('utf-8')).hexdigest()
+
+
+def reciprocal_rank_fusion(rankings, weights, rrf_k):
+    """
+    Merge rankings ({name: [(score, segment, idx), ...] best first}) into
+    [(fused_score, segment, idx, {name: score}), ...] best first.
+    """
+    fused = {}
+    for name, hits in rankings.items():
+        for rank, (score, segment, idx) in enumerate(hits, start=1):
+            key = (segment["name"], idx)
+            if key not in fused:
+                fused[key] = [0.0, segment, idx, {}]
+            fused[key][0] += weights[name] / (rrf_k + rank)
+            fused[key][3][name] = score
+    return sorted((tuple(hit) for hit in fused.values()), key=lambda hit: hit[0], reverse=True)
+
+
+def maximal_marginal_relevance(relevance, vectors, k, mmr_lambda):
+    """
+    Positions of up to k items chosen greedily by
+    mmr_lambda * relevance - (1 - mmr_lambda) * (max similarity to the items already chosen).
+    `vectors` are unit vectors, so similarity is their inner product.
+    """
+    k = min(k, len(relevance))
+    if k == 0:
+        return []
+    similarity = vectors @ vectors.T
+    chosen = [int(np.argmax(relevance))]
+    closest = similarity[chosen[0]].copy()
+    available = np.ones(len(relevance), dtype=bool)
+    available[chosen[0]] = False
+    while len(chosen) < k:
+        marginal = mmr_lambda * relevance - (1 - mmr_lambda) * closest
+        marginal[~available] = -np.inf
+        pick = int(np.argmax(marginal))
+        chosen.append(pick)
+        available[pick] = False
+        np.maximum(closest, similarity[pick], out=closest)
+    return chosen
+
+
+class VectorStore:
+    """
+    Process-wide holder for the segmented FAISS store.
+
+    Readers grab the current snapshot (a plain dict) and search it without
+    locking. Writers serialize on a lock (a thread lock plus the lock file
+    shared with other processes), build a new snapshot next to the old one
+    and swap the reference, so a search never sees a half-written index.
+    """
+
+    def __init__(self, db_dir=None, compact_segments=None):
+        self.db_dir = db_dir or app_config.VECTOR_DB_DIR
+        self.compact_segments = compact_segments or app_config.COMPACT_SEGMENTS
+        self._write_lock = threading.RLock()
+        self._file_lock = FileLock(os.path.join(self.db_dir, LOCK_NAME))
+        self._lock_depth = 0
+        self._manifest_stamp = None
+        self._compacting = False
+        self._snapshot = None
+        self._manifest = None
+        self.stats = {
+            "loaded": False,
+            "version": 0,
+            "last_load_ms": None,
+            "last_swap_ms": None,
+            "last_append_ms": None,
+            "last_compaction_ms": None,
+            "loaded_at": None,
+            "swapped_at": None,
+            "swap_count": 0,
+            "compactions": 0
+        }
+
+    @property
+    def manifest_path(self):
+        return os.path.join(self.db_dir, MANIFEST_NAME)
+
+    def exists_on_disk(self):
+        return os.path.exists(self.manifest_path)
+
+    def load(self):
+        """Load the manifest and every segment from disk (once at startup)"""
+        with self._locked():
+            start = time.perf_counter()
+            if not self.exists_on_disk():
+                self._migrate_legacy_files()
+
+            if self.exists_on_disk():
+                with open(self.manifest_path, "r", encoding="utf-8") as f:
+                    self._manifest = json.load(f)
+            else:
+                self._manifest = self._empty_manifest()
+            # Manifests from before corpus versions: the commit version is as good a start
+            self._manifest.setdefault("corpus_version", self._manifest["version"])
+
+            segments = [self._read_segment(seg) for seg in self._manifest["segments"]]
+            self._snapshot = self._make_snapshot(segments, self._corpus_version(), self._aliases())
+            self._manifest_stamp = self._disk_stamp()
+            self._migrate_segments()
+            self.stats["loaded"] = True
+            self.stats["version"] = self._manifest["version"]
+            self.stats["last_load_ms"] = round((time.perf_counter() - start) * 1000, 2)
+            self.stats["loaded_at"] = time.time()
+        return self._snapshot
+
+    def snapshot(self):
+        """Return the current snapshot, or None if the database is empty"""
+        if not self.stats["loaded"]:
+            self.load()
+        elif self._disk_stamp() != self._manifest_stamp:
+            self._try_refresh()
+        return self._snapshot
+
+    def search(self, query_vectors, k, snapshot=None, nprobe=None, ef_search=None,
+               query_texts=None, mode=None, min_score=None, mmr_lambda=None, documents=None):
+        """
+        Search every segment and merge the results.
+        `nprobe` / `ef_search` override the IVF / HNSW defaults for this search.
+        `mode` overrides RETRIEVAL_MODE; the lexical and hybrid modes need
+        `query_texts` and fall back to dense search without them.
+        `min_score` (default RETRIEVAL_MIN_SCORE) drops chunks whose cosine
+        similarity to the query is lower; `mmr_lambda` (default MMR_LAMBDA) below
+        1 re-ranks the top MMR_CANDIDATES by Maximal Marginal Relevance. Both need
+        query vectors.
+        `documents` restricts the search to the chunks of those filenames.
+        Returns one list per query of hits: {"score", "text", "metadata"}, plus
+        "similarity" (cosine to the query) when there are query vectors.
+        Hybrid hits are scored by fusion and also carry "dense_score" and
+        "lexical_score" (None where that retriever did not return the chunk).
+        """
+        mode = mode or app_config.RETRIEVAL_MODE
+        if mode not in RETRIEVAL_MODES:
+            raise ValueError(f"Unknown retrieval mode: {mode}. Use one of {', '.join(RETRIEVAL_MODES)}")
+        if query_texts is None:
+            mode = "dense"
+        num_queries = len(query_texts) if query_texts is not None else len(query_vectors)
+        snapshot = snapshot or self.snapshot()
+        if snapshot is None:
+            return [[] for _ in range(num_queries)]
+
+        min_score = app_config.RETRIEVAL_MIN_SCORE if min_score is None else min_score
+        mmr_lambda = app_config.MMR_LAMBDA if mmr_lambda is None else mmr_lambda
+        if query_vectors is not None:
+            query_vectors, _ = normalize_vectors(query_vectors)
+        rerank = query_vectors is not None
+        # Candidates to rank before the threshold and MMR cut them down to k
+        pool = max(k, app_config.MMR_CANDIDATES) if rerank and mmr_lambda < 1 else k
+
+        if documents is not None:
+            documents = {snapshot["aliases"].get(name, name) for name in documents}
+        if mode == "dense":
+            rankings = [[(score, segment, idx, {}) for score, segment, idx in hits]
+                        for hits in self._dense_search(query_vectors, pool, snapshot,
+                                                       nprobe, ef_search, documents)]
+        elif mode == "lexical":
+            rankings = [[(score, segment, idx, {}) for score, segment, idx
+                         in self._lexical_search(text, pool, snapshot, documents)]
+                        for text in query_texts]
+        else:
+            depth = max(pool, app_config.HYBRID_CANDIDATES)
+            dense = self._dense_search(query_vectors, depth, snapshot, nprobe, ef_search,
+                                       documents)
+            weights = {"dense": app_config.HYBRID_DENSE_WEIGHT,
+                       "lexical": app_config.HYBRID_LEXICAL_WEIGHT}
+            rankings = []
+            for dense_hits, text in zip(dense, query_texts):
+                fused = reciprocal_rank_fusion(
+                    {"dense": dense_hits,
+                     "lexical": self._lexical_search(text, depth, snapshot, documents)},
+                    weights, app_config.RRF_K)
+                rankings.append([(score, segment, idx, {"dense_score": scores.get("dense"),
+                                                        "lexical_score": scores.get("lexical")})
+                                 for score, segment, idx, scores in fused[:pool]])
+
+        results = []
+        for q, ranked in enumerate(rankings):
+            if rerank:
+                ranked = self._rerank(query_vectors[q], ranked, k, min_score, mmr_lambda)
+            results.append([dict(self._hit(score, segment, idx), **extra)
+                            for score, segment, idx, extra in ranked[:k]])
+        return results
+
+    def _rerank(self, query_vector, ranked, k, min_score, mmr_lambda):
+        """Apply the similarity threshold and MMR to ranked (score, segment, idx, extra) hits"""
+        if not ranked:
+            return ranked
+        vectors = self._chunk_vectors([(segment, idx) for _, segment, idx, _ in ranked])
+        similarity = vectors @ query_vector
+        keep = np.flatnonzero(similarity >= min_score)
+        if mmr_lambda < 1 and len(keep) > 1:
+            # Relevance on the retriever's own scale, so MMR works for fused and BM25 scores too
+            scores = np.array([ranked[i][0] for i in keep], dtype='float32')
+            relevance = scores / scores.max() if scores.max() > 0 else scores
+            keep = keep[maximal_marginal_relevance(relevance, vectors[keep], k, mmr_lambda)]
+        return [ranked[i][:3] + (dict(ranked[i][3], similarity=float(similarity[i])),)
+                for i in keep]
+
+    def _chunk_vectors(self, pairs):
+        """Unit vectors of (segment, idx) pairs, in order"""
+        vectors = [None] * len(pairs)
+        by_segment = {}
+        for position, (segment, idx) in enumerate(pairs):
+            by_segment.setdefault(segment["name"], (segment, []))[1].append((position, idx))
+        for segment, items in by_segment.values():
+            ids = np.array([idx for _, idx in items], dtype='int64')
+            if keeps_vector_file(segment["index_type"]):
+                found = self._segment_vectors(segment)[ids]
+            else:
+                found = segment["index"].reconstruct_batch(ids)
+            for (position, _), vector in zip(items, found):
+                vectors[position] = vector
+        return np.array(vectors, dtype='float32')
+
+    def _dense_search(self, query_vectors, k, snapshot, nprobe, ef_search, documents=None):
+        """Top k (score, segment, idx) per unit query vector, best first"""
+        candidates = [[] for _ in range(len(query_vectors))]
+        for segment in snapshot["segments"]:
+            ranges = self._document_ranges(segment, documents)
+            if ranges == []:
+                continue
+            available = segment["live"] if ranges is None else sum(e - s for s, e in ranges)
+            seg_k = min(k, available)
+            if seg_k == 0:
+                continue
+            if ranges is not None and keeps_vector_file(segment["index_type"]):
+                scores, indices = self._scan_ranges(segment, ranges, query_vectors, seg_k)
+            else:
+                selector = segment["selector"] if ranges is None else self._range_selector(ranges)
+                params = search_params(segment["index"], nprobe=nprobe, ef_search=ef_search,
+                                       selector=selector)
+                depth = rerank_depth(segment["index_type"], seg_k, available)
+                scores, indices = search_index(segment["index"], query_vectors, depth, params=params)
+                if depth > seg_k:
+                    scores, indices = rescore(self._segment_vectors(segment), query_vectors,
+                                              indices, seg_k)
+            for q, (row_scores, row_indices) in enumerate(zip(scores, indices)):
+                for score, idx in zip(row_scores, row_indices):
+                    if idx >= 0:
+                        candidates[q].append((float(score), segment, int(idx)))
+
+        for hits in candidates:
+            hits.sort(key=lambda hit: hit[0], reverse=True)
+            del hits[k:]
+        return candidates
+
+    def _lexical_search(self, query_text, k, snapshot, documents=None):
+        """Top k BM25 (score, segment, idx) over all segments, best first"""
+        segments = snapshot["segments"]
+        masks = []
+        for segment in segments:
+            ranges = self._document_ranges(segment, documents)
+            if ranges is None:
+                masks.append(segment["live_mask"])
+            elif not ranges:
+                masks.append(False)
+            else:
+                mask = np.zeros(segment["index"].ntotal, dtype=bool)
+                for start, end in ranges:
+                    mask[start:end] = True
+                masks.append(mask)
+        return [(score, segments[position], idx) for score, position, idx
+                in bm25_search([segment["lexical"] for segment in segments], query_text, k,
+                               masks=masks)]
+
+    @staticmethod
+    def _document_ranges(segment, documents):
+        """
+        Chunk ranges of `documents` in a segment: None when the whole segment
+        is wanted, an empty list when none of its documents are.
+        """
+        if documents is None:
+            return None
+        ranges = [(doc["start"], doc["end"]) for doc in segment["documents"]
+                  if doc["name"] in documents]
+        return None if len(ranges) == len(segment["documents"]) else ranges
+
+    @staticmethod
+    def _range_selector(ranges):
+        ids = np.concatenate([np.arange(start, end, dtype='int64') for start, end in ranges])
+        return faiss.IDSelectorBatch(len(ids), faiss.swig_ptr(ids))
+
+    def _scan_ranges(self, segment, ranges, query_vectors, k):
+        """Exact top k over chunk ranges of a segment, in FAISS's (scores, indices) form"""
+        vectors = self._segment_vectors(segment)
+        ids = np.concatenate([np.arange(start, end) for start, end in ranges])
+        scores = np.concatenate([vectors[start:end] @ query_vectors.T for start, end in ranges])
+        top = np.argsort(-scores, axis=0)[:k].T
+        return np.take_along_axis(scores.T, top, axis=1), ids[top]
+
+    @staticmethod
+    def _hit(score, segment, idx):
+        return {
+            "score": score,
+            "text": segment["chunks"].get_text(idx),
+            "metadata": segment["chunks"].get_metadata(idx)
+        }
+
+    def export_vectors(self, snapshot=None):
+        """All float vectors in the store, in segment order (for benchmarks and rebuilds)"""
+        snapshot = snapshot or self.snapshot()
+        if snapshot is None:
+            return None
+        return np.concatenate([self._segment_vectors(segment) for segment in snapshot["segments"]])
+
+    def export_norms(self, snapshot=None):
+        """Original (pre-normalization) L2 norms of every vector, in segment order"""
+        snapshot = snapshot or self.snapshot()
+        if snapshot is None:
+            return None
+        return np.concatenate([self._segment_norms(segment) for segment in snapshot["segments"]])
+
+    def append(self, embeddings, new_chunks, new_metadata, filename, total_pages, embedding_dim,
+               content_hash=None, replace_all=False):
+        """
+        Write a document as a new segment, update the manifest, and swap the snapshot.
+        A stored document with the same filename is replaced in the same commit;
+        with `replace_all`, every stored document is (so the store is never
+        left empty in between, as with clear() then append()).
+        Returns the number of stored chunks removed.
+        """
+        with self._locked():
+            start = time.perf_counter()
+            self.snapshot()
+            stored_dim = self._manifest.get("dim")
+            if not replace_all and self._snapshot is not None and stored_dim and \
+                    stored_dim != embedding_dim:
+                raise ValueError(f"The vector database holds {stored_dim}-dimensional vectors and the "
+                                 f"embedding model makes {embedding_dim}-dimensional ones; clear it "
+                                 f"(or set another VECTOR_DB_DIR) after switching embedding models")
+
+            vectors, norms = normalize_vectors(embeddings)
+            index, index_type = build_index(vectors, embedding_dim)
+            segment = self._write_segment(index, index_type, vectors, norms, list(new_chunks),
+                                          list(new_metadata), [filename], total_pages,
+                                          content_hash)
+            if replace_all:
+                segments, dropped = [], self._snapshot_segments()
+                replaced = sum(seg["live"] for seg in dropped)
+            else:
+                segments, dropped, replaced = self._without_document(self._snapshot_segments(),
+                                                                     filename)
+
+            manifest = dict(self._manifest)
+            manifest["corpus_version"] = self._corpus_version() + 1
+            manifest["dim"] = embedding_dim
+            # The filename now names a document of its own
+            manifest["aliases"] = {} if replace_all else \
+                {alias: name for alias, name in self._aliases().items() if alias != filename}
+            manifest["segments"] = [self._segment_entry(seg) for seg in segments + [segment]]
+            self._commit(manifest, segments + [segment], start)
+            self._delete_segment_files([self._segment_entry(seg) for seg in dropped])
+            self.stats["last_append_ms"] = self.stats["last_swap_ms"]
+
+        self._maybe_compact()
+        return replaced
+
+    def clear(self):
+        """Remove the database from disk and memory"""
+        with self._locked():
+            start = time.perf_counter()
+            self.snapshot()
+            old_entries = self._manifest["segments"]
+            manifest = self._empty_manifest()
+            manifest["version"] = self._manifest["version"]
+            manifest["corpus_version"] = self._corpus_version() + 1
+            # Never reuse segment names; a compaction may still be writing one
+            manifest["next_segment"] = self._manifest["next_segment"]
+            self._commit(manifest, [], start)
+            self._delete_segment_files(old_entries)
+
+    def add_alias(self, alias, filename):
+        """
+        Make `alias` another name for the stored document `filename` (a
+        re-upload of the same file under a new name). A stored document named
+        `alias` is replaced in the same commit. Returns the number of its chunks
+        removed.
+        """
+        with self._locked():
+            start = time.perf_counter()
+            self.snapshot()
+            if self._snapshot is None or filename not in self._snapshot["documents"]:
+                raise ValueError(f"Document not found: {filename}")
+            if alias == filename:
+                return 0
+            segments, dropped, replaced = self._without_document(self._snapshot_segments(), alias)
+
+            manifest = dict(self._manifest)
+            manifest["corpus_version"] = self._corpus_version() + 1
+            manifest["segments"] = [self._segment_entry(segment) for segment in segments]
+            manifest["aliases"] = {name: filename if target == alias else target
+                                   for name, target in self._aliases().items()}
+            manifest["aliases"][alias] = filename
+            self._commit(manifest, segments, start)
+            self._delete_segment_files([self._segment_entry(segment) for segment in dropped])
+        return replaced
+
+    def delete_document(self, filename):
+        """
+        Remove a document's chunks without rebuilding any index: segments that
+        hold only this document are dropped, its ranges in the others are
+        tombstoned, and its aliases are removed. Deleting an alias removes only
+        that name. Returns the number of chunks no longer found under the name
+        (0 if it is not stored).
+        """
+        with self._locked():
+            start = time.perf_counter()
+            self.snapshot()
+            aliases = self._aliases()
+            if self._snapshot is not None and filename in self._snapshot["aliases"]:
+                removed = self._snapshot["documents"][aliases.pop(filename)]["chunks"]
+                self._commit(dict(self._manifest, aliases=aliases,
+                                  corpus_version=self._corpus_version() + 1),
+                             self._snapshot_segments(), start)
+                return removed
+            segments, dropped, removed = self._without_document(self._snapshot_segments(), filename)
+            if not removed:
+                return 0
+
+            manifest = dict(self._manifest)
+            manifest["corpus_version"] = self._corpus_version() + 1
+            manifest["segments"] = [self._segment_entry(segment) for segment in segments]
+            manifest["aliases"] = {alias: name for alias, name in aliases.items() if name != filename}
+            self._commit(manifest, segments, start)
+            self._delete_segment_files([self._segment_entry(segment) for segment in dropped])
+
+        self._maybe_compact()
+        return removed
+
+    def find_document(self, content_hash):
+        """Name of a stored document whose file has this SHA-256, or None"""
+        snapshot = self.snapshot()
+        if snapshot is None or not content_hash:
+            return None
+        return next((name for name, doc in snapshot["documents"].items()
+                     if doc["sha256"] == content_hash), None)
+
+    def document_vectors(self, filename):
+        """
+        {chunk_hash: original (un-normalized) vector} for the stored chunks of a
+        document, so an updated version only has to embed the chunks that changed
+        """
+        snapshot = self.snapshot()
+        vectors = {}
+        for segment in snapshot["segments"] if snapshot else []:
+            for doc in segment["documents"]:
+                if doc["name"] != filename:
+                    continue
+                found = self._range_vectors(segment, doc["start"], doc["end"])
+                found = found * self._segment_norms(segment)[doc["start"]:doc["end"], None]
+                for i, vector in zip(range(doc["start"], doc["end"]), found):
+                    vectors[chunk_hash(segment["chunks"].get_text(i))] = vector
+        return vectors
+
+    def _without_document(self, segments, filename):
+        """
+        (segments with the document's ranges tombstoned, segments that held only
+        the document, number of chunks removed)
+        """
+        kept, dropped, removed = [], [], 0
+        for segment in segments:
+            ranges = [[doc["start"], doc["end"]] for doc in segment["documents"]
+                      if doc["name"] == filename]
+            if not ranges:
+                kept.append(segment)
+                continue
+            removed += sum(end - begin for begin, end in ranges)
+            remaining = [doc for doc in segment["documents"] if doc["name"] != filename]
+            if remaining:
+                kept.append(self._segment(segment["name"], segment["index"],
+                                          segment["index_type"], segment["chunks"],
+                                          segment["lexical"], remaining,
+                                          segment["deleted"] + ranges,
+                                          segment["vectors"], segment["norms"]))
+            else:
+                dropped.append(segment)
+        return kept, dropped, removed
+
+    def get_stats(self):
+        """Return load/swap timings and the size of the resident snapshot"""
+        stats = dict(self.stats)
+        snapshot = self._snapshot
+        stats["resident_vectors"] = snapshot["total_chunks"] if snapshot else 0
+        stats["segments"] = len(snapshot["segments"]) if snapshot else 0
+        stats["index_types"] = sorted({seg["index_type"] for seg in snapshot["segments"]}) \
+            if snapshot else []
+        stats["compacting"] = self._compacting
+        stats["deleted_chunks"] = sum(seg["index"].ntotal - seg["live"] for seg in snapshot["segments"]) \
+            if snapshot else 0
+        # Resident index size against the float32 vectors it stands in for
+        segments = snapshot["segments"] if snapshot else []
+        index_bytes = sum(self._index_bytes(segment) for segment in segments)
+        dim = (self._manifest.get("dim") or 0) if self._manifest else 0
+        float_bytes = sum(4 * dim * segment["index"].ntotal for segment in segments)
+        stats["index_mb"] = round(index_bytes / (1024 * 1024), 2)
+        stats["float_vectors_mb"] = round(float_bytes / (1024 * 1024), 2)
+        stats["corpus_version"] = self._corpus_version() if self._manifest else 0
+        return stats
+
+    def corpus_version(self):
+        """Version of the store's content; changes only when documents are added or removed"""
+        self.snapshot()
+        return self._corpus_version()
+
+    # ---------- Compaction ----------
+
+    def _maybe_compact(self):
+        snapshot = self._snapshot
+        if snapshot is None:
+            return
+        if len(snapshot["segments"]) < self.compact_segments and \
+                not any(self._mostly_deleted(segment) for segment in snapshot["segments"]):
+            return
+        with self._write_lock:
+            if self._compacting:
+                return
+            self._compacting = True
+        threading.Thread(target=self._compact, daemon=True).start()
+
+    def _compact(self):
+        """
+        Merge the small segments of the current snapshot into one new segment,
+        or rewrite segments that are mostly deleted chunks; tombstoned chunks
+        are left out either way.
+        """
+        again = False
+        try:
+            start = time.perf_counter()
+            with self._locked():
+                current = self._snapshot_segments()
+            segments = self._compaction_candidates(current) \
+                if len(current) >= self.compact_segments else []
+            if len(segments) < 2:
+                segments = [segment for segment in current if self._mostly_deleted(segment)]
+            if not segments:
+                return
+
+            # Build the merged segment outside the lock; uploads keep appending
+            keeps = [segment["live_mask"] for segment in segments]
+            vectors = np.concatenate([self._segment_vectors(segment) if keep is None
+                                      else self._segment_vectors(segment)[keep]
+                                      for segment, keep in zip(segments, keeps)])
+            norms = np.concatenate([self._segment_norms(segment) if keep is None
+                                    else self._segment_norms(segment)[keep]
+                                    for segment, keep in zip(segments, keeps)])
+            if len(vectors) == 0:
+                return
+            merged_index, index_type = build_index(vectors, vectors.shape[1])
+            files, documents, base = [], [], 0
+            for segment, keep in zip(segments, keeps):
+                files.extend(f for f in segment["chunks"].files if f not in files)
+                # Chunk numbers after the segments before it and without its deleted chunks
+                renumber = np.cumsum(keep) - 1 if keep is not None else None
+                for doc in segment["documents"]:
+                    first = int(renumber[doc["start"]]) if renumber is not None else doc["start"]
+                    documents.append(dict(doc, start=base + first,
+                                          end=base + first + doc["end"] - doc["start"]))
+                base += segment["live"]
+
+            name = self._next_segment_name()
+            write_index(merged_index, self._segment_path(name) + ".index")
+            if keeps_vector_file(index_type):
+                np.save(self._segment_path(name) + ".vectors.npy", vectors)
+            np.save(self._segment_path(name) + ".norms.npy", norms)
+            chunk_store = ChunkStore.merge(self._segment_path(name),
+                                           [segment["chunks"] for segment in segments], files, keeps)
+            lexical = LexicalIndex.merge(self._segment_path(name),
+                                         [segment["lexical"] for segment in segments], keeps)
+            merged = self._segment(name, merged_index, index_type, chunk_store, lexical, documents)
+
+            with self._locked():
+                merged_names = {segment["name"] for segment in segments}
+                current = self._snapshot_segments()
+                by_name = {segment["name"]: segment for segment in current}
+                if any(by_name.get(segment["name"]) is not segment for segment in segments):
+                    # The store was cleared, a document deleted or the segments compacted
+                    # (by another process) while we were merging; start over from the new state
+                    self._delete_segment_files([self._segment_entry(merged)])
+                    again = True
+                    return
+                # The merged segment takes the place of the oldest segment it replaces
+                position = next(i for i, segment in enumerate(current)
+                                if segment["name"] in merged_names)
+                remaining = [segment for segment in current if segment["name"] not in merged_names]
+                new_segments = remaining[:position] + [merged] + remaining[position:]
+                manifest = dict(self._manifest)
+                manifest["segments"] = [self._segment_entry(segment) for segment in new_segments]
+                self._commit(manifest, new_segments, time.perf_counter())
+                self._delete_segment_files([self._segment_entry(segment) for segment in segments])
+                self.stats["compactions"] += 1
+                self.stats["last_compaction_ms"] = round((time.perf_counter() - start) * 1000, 2)
+                # Uploads that arrived while we merged may have added enough segments
+                again = True
+        except Exception as e:
+            print(f"⚠️ Segment compaction failed: {e}")
+        finally:
+            self._compacting = False
+        if again:
+            self._maybe_compact()
+
+    @staticmethod
+    def _mostly_deleted(segment):
+        total = segment["index"].ntotal
+        return total > 0 and (total - segment["live"]) / total >= PURGE_DELETED_FRACTION
+
+    @staticmethod
+    def _compaction_candidates(segments):
+        """
+        Leave out leading segments that are bigger than everything after them,
+        so a large (possibly ANN-trained) segment is only rebuilt once the
+        small ones add up to its size.
+        """
+        while len(segments) > 1:
+            if segments[0]["index"].ntotal <= sum(seg["index"].ntotal for seg in segments[1:]):
+                break
+            segments = segments[1:]
+        return segments
+
+    @staticmethod
+    def _segment_vectors(segment):
+        """Float vectors of a segment, in chunk order"""
+        if segment["vectors"] is not None:
+            return segment["vectors"]
+        return segment["index"].reconstruct_n(0, segment["index"].ntotal)
+
+    def _range_vectors(self, segment, start, end):
+        """Float vectors of chunks start..end of a segment"""
+        if keeps_vector_file(segment["index_type"]):
+            return np.array(self._segment_vectors(segment)[start:end])
+        return segment["index"].reconstruct_n(start, end - start)
+
+    def _index_bytes(self, segment):
+        """Size of a segment's index file, about what the index takes in memory"""
+        try:
+            return os.path.getsize(self._segment_path(segment["name"]) + ".index")
+        except OSError:
+            # Compacted away by another process since this snapshot was taken
+            return 0
+
+    @staticmethod
+    def _segment_norms(segment):
+        """Pre-normalization norms of a segment (all ones if they were never recorded)"""
+        if segment["norms"] is not None:
+            return segment["norms"]
+        return np.ones(segment["index"].ntotal, dtype='float32')
+
+    def _migrate_segments(self):
+        """
+        Rebuild segments written before vectors were normalized, or whose
+        index type no longer matches INDEX_TYPE. Runs once, at load time.
+        Like compaction, each rebuilt segment is written under a new name and
+        the old files are deleted only after the manifest is committed, so a
+        crash leaves the store as it was and older snapshots keep their files.
+        """
+        if self._snapshot is None:
+            # Nothing stored yet; everything written from now on is normalized
+            self._manifest["normalized"] = True
+            return
+        renormalize = not self._manifest.get("normalized", False)
+        segments = list(self._snapshot["segments"])
+        replaced, written = [], []
+        try:
+            for i, segment in enumerate(segments):
+                wanted = choose_index_type(segment["index"].ntotal)
+                if wanted == segment["index_type"] and not renormalize:
+                    continue
+                vectors = np.array(self._segment_vectors(segment))
+                norms = segment["norms"]
+                if renormalize:
+                    print(f"🔄 Normalizing the vectors of {segment['name']}...")
+                    vectors, norms = normalize_vectors(vectors)
+                if wanted != segment["index_type"]:
+                    print(f"🔄 Rebuilding {segment['name']} as a {wanted} index...")
+
+                index, index_type = build_index(vectors, vectors.shape[1], wanted)
+                name = self._next_segment_name()
+                written.append(name)
+                prefix = self._segment_path(name)
+                write_index(index, prefix + ".index")
+                if keeps_vector_file(index_type):
+                    np.save(prefix + ".vectors.npy", vectors)
+                if norms is not None:
+                    np.save(prefix + ".norms.npy", norms)
+                chunk_store = ChunkStore.merge(prefix, [segment["chunks"]], segment["chunks"].files)
+                lexical = LexicalIndex.merge(prefix, [segment["lexical"]])
+                segments[i] = self._segment(name, index, index_type, chunk_store, lexical,
+                                            segment["documents"], segment["deleted"])
+                replaced.append(segment)
+        except BaseException:
+            self._delete_segment_files([{"name": name} for name in written])
+            raise
+
+        if replaced or renormalize:
+            manifest = dict(self._manifest, normalized=True)
+            manifest["segments"] = [self._segment_entry(segment) for segment in segments]
+            self._commit(manifest, segments, time.perf_counter())
+            self._delete_segment_files([self._segment_entry(segment) for segment in replaced])
+
+    # ---------- Disk format ----------
+
+    def _commit(self, manifest, segments, start):
+        """Persist the manifest atomically and swap in the matching snapshot"""
+        manifest["version"] = manifest.get("version", 0) + 1
+        os.makedirs(self.db_dir, exist_ok=True)
+        tmp_path = self.manifest_path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(manifest, f, indent=2)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.manifest_path)
+
+        self._manifest = manifest
+        self._manifest_stamp = self._disk_stamp()
+        self._snapshot = self._make_snapshot(segments, self._corpus_version(), self._aliases())
+        self.stats["version"] = manifest["version"]
+        self.stats["swap_count"] += 1
+        self.stats["last_swap_ms"] = round((time.perf_counter() - start) * 1000, 2)
+        self.stats["swapped_at"] = time.time()
+
+    @contextmanager
+    def _locked(self):
+        """
+        Hold the write lock of this process and the lock file of the store,
+        with the snapshot brought up to date with commits made elsewhere
+        """
+        with self._write_lock:
+            if self._lock_depth == 0:
+                self._file_lock.acquire()
+            self._lock_depth += 1
+            try:
+                if self._lock_depth == 1:
+                    self._refresh()
+                yield
+            finally:
+                self._lock_depth -= 1
+                if self._lock_depth == 0:
+                    self._file_lock.release()
+
+    def _try_refresh(self):
+        """
+        Pick up another process's commit unless a writer holds the lock; a
+        reader keeps the snapshot it has rather than wait for the write
+        """
+        if not self._write_lock.acquire(blocking=False):
+            return
+        try:
+            # Inside _locked() this thread has refreshed already
+            if self._lock_depth == 0 and self._file_lock.acquire(blocking=False):
+                try:
+                    self._refresh()
+                finally:
+                    self._file_lock.release()
+        finally:
+            self._write_lock.release()
+
+    def _refresh(self):
+        """Swap in the manifest on disk if another process has committed since we read ours"""
+        stamp = self._disk_stamp()
+        if self._manifest is None or stamp is None or stamp == self._manifest_stamp:
+            return
+        with open(self.manifest_path, "r", encoding="utf-8") as f:
+            manifest = json.load(f)
+        if manifest["version"] == self._manifest["version"]:
+            self._manifest_stamp = stamp
+            return
+        manifest.setdefault("corpus_version", manifest["version"])
+        manifest["next_segment"] = max(manifest["next_segment"], self._manifest["next_segment"])
+
+        # Segments that did not change keep their loaded objects (and open files)
+        loaded = {segment["name"]: segment for segment in self._snapshot_segments()}
+        segments = []
+        for entry in manifest["segments"]:
+            segment = loaded.get(entry["name"])
+            if segment is None or self._segment_entry(segment) != entry:
+                segment = self._read_segment(entry)
+            segments.append(segment)
+        self._manifest = manifest
+        self._snapshot = self._make_snapshot(segments, self._corpus_version(), self._aliases())
+        self._manifest_stamp = stamp
+        self.stats["version"] = manifest["version"]
+
+    def _disk_stamp(self):
+        """Identity of the manifest file; every commit replaces it with a new file"""
+        try:
+            stat = os.stat(self.manifest_path)
+        except FileNotFoundError:
+            return None
+        return stat.st_ino, stat.st_mtime_ns, stat.st_size
+
+    def _next_segment_name(self):
+        """
+        Reserve a segment name by creating its index file; a name another
+        process has reserved but not committed yet is skipped
+        """
+        os.makedirs(self.db_dir, exist_ok=True)
+        with self._write_lock:
+            number = self._manifest["next_segment"]
+            while True:
+                name = f"seg-{number:06d}"
+                try:
+                    os.close(os.open(self._segment_path(name) + ".index",
+                                     os.O_CREAT | os.O_EXCL | os.O_WRONLY))
+                    break
+                except FileExistsError:
+                    number += 1
+            self._manifest = dict(self._manifest, next_segment=number + 1)
+        return name
+
+    def _segment_path(self, name):
+        return os.path.join(self.db_dir, name)
+
+    def _write_segment(self, index, index_type, vectors, norms, chunks, metadata, files, total_pages,
+                       content_hash=None):
+        # Every filename referenced by a chunk must be in the segment's file table
+        files = list(files)
+        files.extend(name for name in dict.fromkeys(m.get('filename') for m in metadata)
+                     if name and name not in files)
+
+        name = self._next_segment_name()
+        write_index(index, self._segment_path(name) + ".index")
+        if keeps_vector_file(index_type):
+            np.save(self._segment_path(name) + ".vectors.npy", vectors)
+        if norms is not None:
+            np.save(self._segment_path(name) + ".norms.npy", norms)
+        chunk_store = ChunkStore.write(self._segment_path(name), chunks, metadata, files)
+        lexical = LexicalIndex.write(self._segment_path(name), chunks)
+        return self._segment(name, index, index_type, chunk_store, lexical,
+                             self._segment_documents(chunk_store, total_pages, content_hash))
+
+    def _read_segment(self, entry):
+        prefix = self._segment_path(entry["name"])
+        if not ChunkStore.exists(prefix) and os.path.exists(prefix + ".chunks.pkl"):
+            # Segment written before the columnar chunk format; convert it once
+            with open(prefix + ".chunks.pkl", "rb") as f:
+                data = pickle.load(f)
+            ChunkStore.write(prefix, data['chunks'], data['metadata'], entry.get("files", []))
+            os.remove(prefix + ".chunks.pkl")
+
+        index = read_index(prefix + ".index", entry.get("index_type", "flat"))
+        chunk_store = ChunkStore(prefix, entry.get("files", []))
+        if LexicalIndex.exists(prefix):
+            lexical = LexicalIndex(prefix)
+        else:
+            # Segment written before hybrid retrieval; index its chunks once
+            print(f"🔄 Building the BM25 index of {entry['name']}...")
+            lexical = LexicalIndex.write(prefix, list(chunk_store.iter_texts()))
+        documents = entry.get("documents")
+        if documents is None:
+            # Segment written before per-document ranges; derive them from its chunks
+            documents = self._segment_documents(chunk_store, entry.get("total_pages", 0))
+        return self._segment(entry["name"], index, entry.get("index_type", "flat"),
+                             chunk_store, lexical, documents, entry.get("deleted", []))
+
+    def _delete_segment_files(self, entries):
+        for entry in entries:
+            suffixes = (".index", ".vectors.npy", ".norms.npy") + CHUNK_SUFFIXES + LEXICAL_SUFFIXES
+            for suffix in suffixes:
+                path = self._segment_path(entry["name"]) + suffix
+                try:
+                    if os.path.exists(path):
+                        os.remove(path)
+                except OSError as e:
+                    # Windows refuses to delete files that are still memory-mapped
+                    # by an older snapshot; they are orphaned rather than corrupted.
+                    print(f"⚠️ Could not remove {path}: {e}")
+
+    @staticmethod
+    def _segment_documents(chunk_store, total_pages, content_hash=None):
+        """The documents of a segment with their chunk ranges, from its chunks' file ids"""
+        runs = chunk_store.document_runs()
+        documents = []
+        for file_id, start, end, max_page in runs:
+            name = chunk_store.files[file_id] if 0 <= file_id < len(chunk_store.files) else "unknown"
+            if documents and documents[-1]["name"] == name and documents[-1]["end"] == start:
+                documents[-1].update(end=end, pages=max(documents[-1]["pages"], max_page))
+            else:
+                documents.append({"name": name, "start": start, "end": end, "pages": max_page,
+                                  "sha256": None})
+        if len(documents) == 1:
+            documents[0]["pages"] = total_pages or documents[0]["pages"]
+            documents[0]["sha256"] = content_hash
+        return documents
+
+    def _segment(self, name, index, index_type, chunk_store, lexical, documents, deleted=(),
+                 vectors=None, norms=None):
+        """
+        A segment as held by snapshots. Its float vectors and norms are
+        memory-mapped here (unless given), like its chunks and BM25 index, so a
+        snapshot can still read them after a newer commit deletes the files.
+        """
+        prefix = self._segment_path(name)
+        if vectors is None and os.path.exists(prefix + ".vectors.npy"):
+            vectors = np.load(prefix + ".vectors.npy", mmap_mode='r')
+        if norms is None and os.path.exists(prefix + ".norms.npy"):
+            norms = np.load(prefix + ".norms.npy", mmap_mode='r')
+        deleted = [[int(start), int(end)] for start, end in deleted]
+        segment = {
+            "name": name,
+            "index": index,
+            "index_type": index_type,
+            "chunks": chunk_store,
+            "lexical": lexical,
+            "vectors": vectors,
+            "norms": norms,
+            "files": chunk_store.files,
+            "documents": documents,
+            "deleted": deleted,
+            "live": sum(doc["end"] - doc["start"] for doc in documents),
+            "total_pages": sum(doc["pages"] for doc in documents),
+            "selector": None,
+            "live_mask": None
+        }
+        if deleted:
+            # Built once per segment version, so searches do not pay for them
+            live_mask = np.ones(index.ntotal, dtype=bool)
+            for start, end in deleted:
+                live_mask[start:end] = False
+            segment["live_mask"] = live_mask
+            deleted_ids = np.flatnonzero(~live_mask).astype('int64')
+            segment["deleted_selector"] = faiss.IDSelectorBatch(len(deleted_ids),
+                                                                faiss.swig_ptr(deleted_ids))
+            segment["selector"] = faiss.IDSelectorNot(segment["deleted_selector"])
+        return segment
+
+    def _migrate_legacy_files(self):
+        """Turn an existing vectors.index + chunks.pkl into the first segment"""
+        if not (os.path.exists(LEGACY_INDEX_PATH) and os.path.exists(LEGACY_CHUNKS_PATH)):
+            return
+        print("🔄 Migrating vectors.index/chunks.pkl to the segmented vector store...")
+        index = faiss.read_index(LEGACY_INDEX_PATH)
+        with open(LEGACY_CHUNKS_PATH, "rb") as f:
+            data = pickle.load(f)
+
+        # Legacy vectors are raw; leave normalized=False so load() normalizes them
+        self._manifest = dict(self._empty_manifest(), normalized=False)
+        segment = self._write_segment(index, "flat", None, None, data['chunks'], data['metadata'],
+                                      data.get('files', []), data.get('total_pages', 0))
+        manifest = dict(self._manifest, dim=index.d, segments=[self._segment_entry(segment)])
+        self._commit(manifest, [segment], time.perf_counter())
+        os.remove(LEGACY_INDEX_PATH)
+        os.remove(LEGACY_CHUNKS_PATH)
+
+    def _snapshot_segments(self):
+        return list(self._snapshot["segments"]) if self._snapshot else []
+
+    def _aliases(self):
+        """{alias: stored document name} (a copy; manifests from before aliases have none)"""
+        return dict(self._manifest.get("aliases", {}))
+
+    def _corpus_version(self):
+        return self._manifest["corpus_version"]
+
+    @staticmethod
+    def _empty_manifest():
+        return {"version": 0, "corpus_version": 0, "dim": None, "normalized": True,
+                "next_segment": 1, "segments": [], "aliases": {}}
+
+    @staticmethod
+    def _segment_entry(segment):
+        return {
+            "name": segment["name"],
+            "vectors": segment["index"].ntotal,
+            "index_type": segment["index_type"],
+            "files": segment["files"],
+            "total_pages": segment["total_pages"],
+            "documents": segment["documents"],
+            "deleted": segment["deleted"]
+        }
+
+    @staticmethod
+    def _make_snapshot(segments, corpus_version, aliases):
+        if not segments:
+            return None
+        documents = {}
+        for segment in segments:
+            for doc in segment["documents"]:
+                entry = documents.setdefault(doc["name"], {"chunks": 0, "pages": 0,
+                                                           "sha256": doc.get("sha256"),
+                                                           "aliases": []})
+                entry["chunks"] += doc["end"] - doc["start"]
+                entry["pages"] = max(entry["pages"], doc["pages"])
+        aliases = {alias: name for alias, name in aliases.items() if name in documents}
+        for alias, name in sorted(aliases.items()):
+            documents[name]["aliases"].append(alias)
+        return {
+            "segments": segments,
+            "total_chunks": sum(segment["live"] for segment in segments),
+            "total_pages": sum(segment["total_pages"] for segment in segments),
+            "files": list(documents) + sorted(aliases),
+            "documents": documents,
+            "aliases": aliases,
+            "corpus_version": corpus_version
+        }
+
+
+# Shared instance used by the Flask app
+store = VectorStore()
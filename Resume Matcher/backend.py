@@ -16,6 +16,8 @@ from resume_processor import process_resume, process_multiple_resumes, extract_t
 from job_processor import process_job_description
 from skill_extractor import extract_skills, extract_job_requirements, calculate_skill_match
 from matcher import match_multiple_resumes, get_match_summary
+from providers import get_metrics
+from local_embeddings import get_local_embedder_stats
 
 app = Flask(__name__, static_folder='static')
 CORS(app)
@@ -86,7 +88,9 @@ def check_status():
         "success": True,
         "resumes_loaded": len(session_data["resumes"]),
         "job_loaded": session_data["job"] is not None,
-        "has_results": session_data["match_results"] is not None
+        "has_results": session_data["match_results"] is not None,
+        "providers": get_metrics(),
+        "local_embeddings": get_local_embedder_stats()
     })
 
 
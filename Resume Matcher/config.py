@@ -1,6 +1,6 @@
 """
 API Configuration for Resume Matcher
-Supports: OpenAI, Ollama, Hugging Face APIs
+Supports: OpenAI, Ollama, Hugging Face APIs and local in-process embeddings
 """
 import os
 from dotenv import load_dotenv
@@ -9,7 +9,7 @@ from dotenv import load_dotenv
 load_dotenv()
 
 # API Selection - Change this to switch between APIs
-API_TYPE = os.getenv('API_TYPE', 'huggingface')  # Options: "openai", "ollama", "huggingface", "openrouter"
+API_TYPE = os.getenv('API_TYPE', 'huggingface')  # Options: "openai", "ollama", "huggingface", "openrouter", "local"
 
 # ========== Hugging Face Configuration ==========
 HF_API_KEY = os.getenv('HF_API_KEY', '')
@@ -31,7 +31,18 @@ OPENROUTER_API_KEY = os.getenv('OPENROUTER_API_KEY', '')
 OPENROUTER_EMBEDDING_MODEL = os.getenv('OPENROUTER_EMBEDDING_MODEL', 'text-embedding-ada-002')
 OPENROUTER_CHAT_MODEL = os.getenv('OPENROUTER_CHAT_MODEL', 'openai/gpt-oss-120b:free')
 
+# ========== Local Configuration ==========
+# API_TYPE=local embeds in-process on CPU (sentence-transformers, no network);
+# skills are still extracted by LOCAL_CHAT_API ("ollama", "openai", "huggingface" or "openrouter")
+LOCAL_EMBEDDING_MODEL = os.getenv('LOCAL_EMBEDDING_MODEL', 'BAAI/bge-small-en-v1.5')
+# Inference runtime: "torch" or "onnx" (ONNX Runtime)
+LOCAL_EMBEDDING_BACKEND = os.getenv('LOCAL_EMBEDDING_BACKEND', 'torch')
+# Texts per forward pass of the model
+LOCAL_EMBEDDING_BATCH_SIZE = int(os.getenv('LOCAL_EMBEDDING_BATCH_SIZE', '32'))
+LOCAL_CHAT_API = os.getenv('LOCAL_CHAT_API', 'ollama')
+
 # ========== Embedding Dimensions ==========
+# API_TYPE=local reads the dimension from its model instead
 EMBEDDING_DIMENSIONS = {
     "openai": 1536,
     "openrouter": 1536,  # OpenRouter with text-embedding-ada-002 uses 1536 dimensions
@@ -43,9 +54,34 @@ EMBEDDING_DIMENSIONS = {
 CHUNK_SIZE = int(os.getenv('CHUNK_SIZE', '500'))
 CHUNK_OVERLAP = int(os.getenv('CHUNK_OVERLAP', '100'))
 
+# ========== Provider Clients ==========
+# Seconds to connect to / wait for a response from the embedding and chat APIs
+PROVIDER_CONNECT_TIMEOUT = float(os.getenv('PROVIDER_CONNECT_TIMEOUT', '5'))
+PROVIDER_READ_TIMEOUT = float(os.getenv('PROVIDER_READ_TIMEOUT', '120'))
+# Retries for connection errors and 502/503/504 responses
+PROVIDER_RETRIES = int(os.getenv('PROVIDER_RETRIES', '2'))
+# The same retries for chat requests; a failed generation may still have run and
+# been billed, so they are off by default
+CHAT_RETRIES = int(os.getenv('CHAT_RETRIES', '0'))
+# Keep-alive connections per provider host
+PROVIDER_POOL_SIZE = int(os.getenv('PROVIDER_POOL_SIZE', '16'))
+
+# ========== PDF Extraction ==========
+# Text extraction backend: pypdf2, pypdfium2 or pdfminer
+PDF_BACKEND = os.getenv('PDF_BACKEND', 'pypdf2')
+# Worker processes for page extraction (0 = one per CPU)
+PDF_WORKERS = int(os.getenv('PDF_WORKERS', '0'))
+# Documents (or batches of resumes) with fewer pages are extracted in-process
+PDF_PARALLEL_MIN_PAGES = int(os.getenv('PDF_PARALLEL_MIN_PAGES', '64'))
+# Pages handed to a worker at a time
+PDF_PAGES_PER_TASK = int(os.getenv('PDF_PAGES_PER_TASK', '8'))
+
 
 def get_embedding_dimension():
-    """Get the embedding dimension for the selected API"""
+    """Get the embedding dimension for the selected API (loads the model for API_TYPE=local)"""
+    if API_TYPE == "local":
+        from local_embeddings import get_local_embedder
+        return get_local_embedder().dimension
     return EMBEDDING_DIMENSIONS.get(API_TYPE, 384)
 
 
@@ -53,51 +89,66 @@ def get_api_config():
     """Get the configuration for the selected API"""
     config = {
         "api_type": API_TYPE,
+        # API_TYPE=local only embeds; skill extraction uses LOCAL_CHAT_API
+        "chat_api_type": LOCAL_CHAT_API if API_TYPE == "local" else API_TYPE,
         "embedding_dim": get_embedding_dimension()
     }
     
-    if API_TYPE == "openai":
+    if config["chat_api_type"] == "openai":
         config["api_key"] = OPENAI_API_KEY
         config["embedding_model"] = OPENAI_EMBEDDING_MODEL
         config["chat_model"] = OPENAI_CHAT_MODEL
-    elif API_TYPE == "ollama":
+    elif config["chat_api_type"] == "ollama":
         config["base_url"] = OLLAMA_BASE_URL
         config["embedding_model"] = OLLAMA_EMBEDDING_MODEL
         config["chat_model"] = OLLAMA_CHAT_MODEL
-    elif API_TYPE == "huggingface":
+    elif config["chat_api_type"] == "huggingface":
         config["api_key"] = HF_API_KEY
         config["embedding_model"] = HF_EMBEDDING_MODEL
         config["chat_model"] = HF_CHAT_MODEL
         config["base_url"] = "https://router.huggingface.co/hf-inference"
-    elif API_TYPE == "openrouter":
+    elif config["chat_api_type"] == "openrouter":
         config["api_key"] = OPENROUTER_API_KEY
         config["embedding_model"] = OPENROUTER_EMBEDDING_MODEL
         config["chat_model"] = OPENROUTER_CHAT_MODEL
         config["base_url"] = "https://openrouter.ai/api/v1"
+    if API_TYPE == "local":
+        config["embedding_model"] = LOCAL_EMBEDDING_MODEL
     
     return config
 
 
 def validate_config():
     """Validate the configuration"""
-    if API_TYPE == "openai":
+    chat_api = API_TYPE
+    if API_TYPE == "local":
+        print(f"✓ Embedding model: {LOCAL_EMBEDDING_MODEL} (in-process, {LOCAL_EMBEDDING_BACKEND} on CPU)")
+        chat_api = LOCAL_CHAT_API
+        if chat_api not in ("openai", "ollama", "huggingface", "openrouter"):
+            raise ValueError(f"Unknown LOCAL_CHAT_API: {chat_api}. "
+                             f"Use 'openai', 'ollama', 'huggingface', or 'openrouter'")
+    
+    if chat_api == "openai":
         if not OPENAI_API_KEY:
             raise ValueError("OPENAI_API_KEY is not set. Please set it in your .env file.")
-    elif API_TYPE == "ollama":
+    elif chat_api == "ollama":
         print(f"✓ Using Ollama at {OLLAMA_BASE_URL}")
-        print(f"✓ Embedding model: {OLLAMA_EMBEDDING_MODEL}")
+        if API_TYPE != "local":
+            print(f"✓ Embedding model: {OLLAMA_EMBEDDING_MODEL}")
         print(f"✓ Chat model: {OLLAMA_CHAT_MODEL}")
-    elif API_TYPE == "huggingface":
+    elif chat_api == "huggingface":
         if not HF_API_KEY:
             raise ValueError("HF_API_KEY is not set. Please set it in your .env file.")
         print(f"✓ Using Hugging Face API")
-        print(f"✓ Embedding model: {HF_EMBEDDING_MODEL}")
+        if API_TYPE != "local":
+            print(f"✓ Embedding model: {HF_EMBEDDING_MODEL}")
         print(f"✓ Chat model: {HF_CHAT_MODEL}")
-    elif API_TYPE == "openrouter":
+    elif chat_api == "openrouter":
         if not OPENROUTER_API_KEY:
             raise ValueError("OPENROUTER_API_KEY is not set. Please set it in your .env file.")
         print(f"✓ Using OpenRouter API")
         print(f"✓ Chat model: {OPENROUTER_CHAT_MODEL}")
-        print(f"✓ Embedding model: {OPENROUTER_EMBEDDING_MODEL}")
+        if API_TYPE != "local":
+            print(f"✓ Embedding model: {OPENROUTER_EMBEDDING_MODEL}")
     else:
-        raise ValueError(f"Unknown API_TYPE: {API_TYPE}. Use 'openai', 'ollama', 'huggingface', or 'openrouter'")
+        raise ValueError(f"Unknown API_TYPE: {API_TYPE}. Use 'openai', 'ollama', 'huggingface', 'openrouter', or 'local'")
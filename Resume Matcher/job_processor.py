@@ -2,18 +2,20 @@
 Job Processor Module
 Handles job description parsing and processing
 """
-import PyPDF2
 import os
-import requests
+import providers
 from config import get_api_config
+from providers import get_openai_client, track
+from local_embeddings import get_local_embedder
+from pdf_extractor import extract_text
 
 
 def get_embedding(text, config):
     """Get embedding for text using the configured API"""
     if config["api_type"] == "openai":
-        from openai import OpenAI
-        client = OpenAI(api_key=config["api_key"])
-        response = client.embeddings.create(input=text, model=config["embedding_model"])
+        client = get_openai_client(config["api_key"])
+        with track("openai", "embed"):
+            response = client.embeddings.create(input=text, model=config["embedding_model"])
         return response.data[0].embedding
     
     elif config["api_type"] == "openrouter":
@@ -22,7 +24,8 @@ def get_embedding(text, config):
             "Content-Type": "application/json"
         }
 
-        response = requests.post(
+        response = providers.post(
+            "openrouter", "embed",
             f"{config['base_url']}/embeddings",
             headers=headers,
             json={
@@ -38,7 +41,8 @@ def get_embedding(text, config):
             raise Exception(f"OpenRouter API error: {response.status_code} - {response.text}")
     
     elif config["api_type"] == "ollama":
-        response = requests.post(
+        response = providers.post(
+            "ollama", "embed",
             f"{config['base_url']}/api/embeddings",
             json={"model": config["embedding_model"], "prompt": text}
         )
@@ -61,7 +65,7 @@ def get_embedding(text, config):
             "inputs": text[:2000] if len(text) > 2000 else text
         }
         
-        response = requests.post(url, headers=headers, json=data)
+        response = providers.post("huggingface", "embed", url, headers=headers, json=data)
         
         if response.status_code == 200:
             result = response.json()
@@ -73,6 +77,9 @@ def get_embedding(text, config):
         else:
             raise Exception(f"Hugging Face API error: {response.status_code} - {response.text}")
     
+    elif config["api_type"] == "local":
+        return get_local_embedder().embed([text])[0]
+    
     else:
         raise ValueError(f"Unknown API type: {config['api_type']}")
 
@@ -82,19 +89,12 @@ def extract_text_from_pdf(pdf_path):
     Extract text content from a PDF file
     """
     try:
-        with open(pdf_path, 'rb') as f:
-            pdf_reader = PyPDF2.PdfReader(f)
-            total_pages = len(pdf_reader.pages)
-            
-            full_text = ""
-            for page in pdf_reader.pages:
-                full_text += page.extract_text() + "\n"
-            
-            return {
-                "success": True,
-                "text": full_text.strip(),
-                "total_pages": total_pages
-            }
+        page_texts = extract_text(pdf_path)
+        return {
+            "success": True,
+            "text": "\n".join(page_texts).strip(),
+            "total_pages": len(page_texts)
+        }
             
     except Exception as e:
         return {
@@ -0,0 +1,244 @@
+"""
+PDF Extractor Module
+Extracts page texts from PDFs, fanning pages out over a process pool.
+
+Supported PDF_BACKEND values:
+    pypdf2     - PyPDF2 (default, always installed)
+    pypdfium2  - PDFium bindings; much faster on large documents (pip install pypdfium2)
+    pdfminer   - pdfminer.six; slower, but better at multi-column layouts (pip install pdfminer.six)
+
+Documents with at least PDF_PARALLEL_MIN_PAGES pages are split into ranges of
+PDF_PAGES_PER_TASK pages, each extracted in a worker process. Page texts are
+streamed back in page order as soon as their range finishes, so callers can
+chunk and embed early pages while later ones are still being extracted.
+Each worker keeps the last WORKER_DOCUMENTS PDFs it read open, so a document
+is parsed once per worker rather than once per range.
+
+The Rag Model and Resume Matcher apps each ship an identical copy of this
+module, since each is built on its own (see their Dockerfiles); change both.
+"""
+import io
+import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+import PyPDF2
+import config as app_config
+
+PDF_BACKENDS = ("pypdf2", "pypdfium2", "pdfminer")
+
+# Parsed documents each worker process keeps open between ranges
+WORKER_DOCUMENTS = 2
+
+_pool = None
+_pool_lock = threading.Lock()
+_worker_documents = OrderedDict()
+
+
+def page_count(pdf_path):
+    """Number of pages in a PDF"""
+    with open(pdf_path, 'rb') as f:
+        return len(PyPDF2.PdfReader(f).pages)
+
+
+def extract_pages(pdf_path, backend=None, workers=None):
+    """
+    Yield (page_number, text) for every page of a PDF, in page order.
+    Large documents are extracted in parallel by the shared process pool.
+    """
+    for _, first, texts in _extract_ranges([(pdf_path, page_count(pdf_path))], backend, workers):
+        if isinstance(texts, Exception):
+            raise texts
+        for offset, text in enumerate(texts):
+            yield first + offset + 1, text
+
+
+def extract_text(pdf_path, backend=None, workers=None):
+    """All page texts of a PDF as a list, in page order"""
+    return [text for _, text in extract_pages(pdf_path, backend, workers)]
+
+
+def extract_documents(pdf_paths, backend=None, workers=None):
+    """
+    Yield (pdf_path, page_texts, error) for each PDF, in order.
+    Pages of all the files share the process pool, so a batch of small PDFs is
+    extracted in parallel too. A file that cannot be read gets an error message
+    instead of stopping the batch.
+    """
+    documents = []
+    for pdf_path in pdf_paths:
+        try:
+            documents.append((pdf_path, page_count(pdf_path)))
+        except Exception as e:
+            documents.append((pdf_path, e))
+
+    ranges = _extract_ranges([d for d in documents if not isinstance(d[1], Exception)],
+                             backend, workers)
+    for pdf_path, total_pages in documents:
+        if isinstance(total_pages, Exception):
+            yield pdf_path, None, str(total_pages)
+            continue
+        texts, error = [], None
+        while len(texts) < total_pages:
+            _, _, range_texts = next(ranges)
+            if isinstance(range_texts, Exception):
+                error = error or str(range_texts)
+                range_texts = [""] * min(_pages_per_task(), total_pages - len(texts))
+            texts.extend(range_texts)
+        yield (pdf_path, None, error) if error else (pdf_path, texts, None)
+
+
+def shutdown():
+    """Stop the worker processes (they are restarted on demand)"""
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(wait=False, cancel_futures=True)
+            _pool = None
+
+
+def _pages_per_task():
+    """Pages per extraction task (PDF_PAGES_PER_TASK, at least 1)"""
+    return max(1, app_config.PDF_PAGES_PER_TASK)
+
+
+def _extract_ranges(documents, backend, workers):
+    """
+    Yield (pdf_path, first_page_index, texts) for each page range of each
+    (pdf_path, total_pages) document, in order. `texts` is the exception
+    instead if that range failed.
+    """
+    backend = _check_backend(backend or app_config.PDF_BACKEND)
+    step = _pages_per_task()
+    tasks = [(pdf_path, first, min(first + step, total_pages))
+             for pdf_path, total_pages in documents
+             for first in range(0, total_pages, step)]
+    total_pages = sum(last - first for _, first, last in tasks)
+    workers = _worker_count(workers)
+
+    if workers <= 1 or len(tasks) < 2 or total_pages < app_config.PDF_PARALLEL_MIN_PAGES:
+        # In-process: open each document once, for all of its ranges
+        opened = None
+        try:
+            for pdf_path, first, last in tasks:
+                try:
+                    if opened is None or opened[0] != pdf_path:
+                        if opened is not None:
+                            _close_document(opened[1], backend)
+                            opened = None
+                        opened = (pdf_path, _open_document(pdf_path, backend))
+                    yield pdf_path, first, _range_texts(opened[1], backend, first, last)
+                except Exception as e:
+                    yield pdf_path, first, e
+        finally:
+            if opened is not None:
+                _close_document(opened[1], backend)
+        return
+
+    pool = _get_pool(workers)
+    futures = [(pdf_path, first, pool.submit(_extract_range, pdf_path, backend, first, last))
+               for pdf_path, first, last in tasks]
+    try:
+        for pdf_path, first, future in futures:
+            try:
+                yield pdf_path, first, future.result()
+            except Exception as e:
+                yield pdf_path, first, e
+    finally:
+        # Drop queued ranges if the caller stops reading early
+        for _, _, future in futures:
+            future.cancel()
+
+
+def _extract_range(pdf_path, backend, first, last):
+    """
+    Texts of pages first..last-1 (0-based); runs inside a worker process, which
+    keeps its last WORKER_DOCUMENTS documents open for the ranges that follow
+    """
+    stat = os.stat(pdf_path)
+    key = (pdf_path, backend, stat.st_size, stat.st_mtime_ns)
+    document = _worker_documents.pop(key, None)
+    if document is None:
+        document = _open_document(pdf_path, backend)
+    _worker_documents[key] = document
+    while len(_worker_documents) > WORKER_DOCUMENTS:
+        (_, old_backend, _, _), old = _worker_documents.popitem(last=False)
+        _close_document(old, old_backend)
+    return _range_texts(document, backend, first, last)
+
+
+def _open_document(pdf_path, backend):
+    """
+    A parsed document for _range_texts. It is read from an in-memory copy, so
+    no file handle stays open (Windows could not delete the upload otherwise).
+    """
+    with open(pdf_path, 'rb') as f:
+        data = f.read()
+    if backend == "pypdfium2":
+        import pypdfium2 as pdfium
+        return pdfium.PdfDocument(data)
+
+    if backend == "pdfminer":
+        from pdfminer.converter import PDFPageAggregator
+        from pdfminer.layout import LAParams
+        from pdfminer.pdfdocument import PDFDocument
+        from pdfminer.pdfinterp import PDFPageInterpreter, PDFResourceManager
+        from pdfminer.pdfpage import PDFPage
+        from pdfminer.pdfparser import PDFParser
+        pages = list(PDFPage.create_pages(PDFDocument(PDFParser(io.BytesIO(data)))))
+        resources = PDFResourceManager()
+        device = PDFPageAggregator(resources, laparams=LAParams())
+        return pages, PDFPageInterpreter(resources, device), device
+
+    return PyPDF2.PdfReader(io.BytesIO(data))
+
+
+def _range_texts(document, backend, first, last):
+    """Texts of pages first..last-1 (0-based) of a document from _open_document"""
+    if backend == "pypdfium2":
+        texts = []
+        for i in range(first, last):
+            page = document[i]
+            textpage = page.get_textpage()
+            texts.append(textpage.get_text_range())
+            textpage.close()
+            page.close()
+        return texts
+
+    if backend == "pdfminer":
+        from pdfminer.layout import LTTextContainer
+        pages, interpreter, device = document
+        texts = []
+        for page in pages[first:last]:
+            interpreter.process_page(page)
+            texts.append("".join(element.get_text() for element in device.get_result()
+                                 if isinstance(element, LTTextContainer)))
+        return texts
+
+    return [document.pages[i].extract_text() or "" for i in range(first, last)]
+
+
+def _close_document(document, backend):
+    if backend == "pypdfium2":
+        document.close()
+
+
+def _check_backend(backend):
+    if backend not in PDF_BACKENDS:
+        raise ValueError(f"Unknown PDF_BACKEND: {backend}. Use one of {', '.join(PDF_BACKENDS)}")
+    return backend
+
+
+def _worker_count(workers):
+    workers = workers if workers is not None else app_config.PDF_WORKERS
+    return workers or os.cpu_count() or 1
+
+
+def _get_pool(workers):
+    global _pool
+    with _pool_lock:
+        if _pool is None or _pool._max_workers != workers:
+            if _pool is not None:
+                _pool.shutdown(wait=False)
+            _pool = ProcessPoolExecutor(max_workers=workers)
+        return _pool
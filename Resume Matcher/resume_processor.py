@@ -2,19 +2,24 @@
 Resume Processor Module
 Handles PDF extraction and resume parsing
 """
-import PyPDF2
 import os
-import requests
+import providers
 import numpy as np
 from config import get_api_config
+from providers import get_openai_client, track
+from local_embeddings import get_local_embedder
+from pdf_extractor import extract_documents, extract_text
+
+# Characters of a resume that are embedded (most embedding models have limits)
+EMBEDDING_MAX_CHARS = 8000
 
 
 def get_embedding(text, config):
     """Get embedding for text using the configured API"""
     if config["api_type"] == "openai":
-        from openai import OpenAI
-        client = OpenAI(api_key=config["api_key"])
-        response = client.embeddings.create(input=text, model=config["embedding_model"])
+        client = get_openai_client(config["api_key"])
+        with track("openai", "embed"):
+            response = client.embeddings.create(input=text, model=config["embedding_model"])
         return response.data[0].embedding
     
     elif config["api_type"] == "openrouter":
@@ -23,7 +28,8 @@ def get_embedding(text, config):
             "Content-Type": "application/json"
         }
 
-        response = requests.post(
+        response = providers.post(
+            "openrouter", "embed",
             f"{config['base_url']}/embeddings",
             headers=headers,
             json={
@@ -39,7 +45,8 @@ def get_embedding(text, config):
             raise Exception(f"OpenRouter API error: {response.status_code} - {response.text}")
     
     elif config["api_type"] == "ollama":
-        response = requests.post(
+        response = providers.post(
+            "ollama", "embed",
             f"{config['base_url']}/api/embeddings",
             json={"model": config["embedding_model"], "prompt": text}
         )
@@ -61,7 +68,7 @@ def get_embedding(text, config):
             "inputs": text[:2000] if len(text) > 2000 else text
         }
         
-        response = requests.post(url, headers=headers, json=data)
+        response = providers.post("huggingface", "embed", url, headers=headers, json=data)
         
         if response.status_code == 200:
             result = response.json()
@@ -74,6 +81,9 @@ def get_embedding(text, config):
         else:
             raise Exception(f"Hugging Face API error: {response.status_code} - {response.text}")
     
+    elif config["api_type"] == "local":
+        return get_local_embedder().embed([text])[0]
+    
     else:
         raise ValueError(f"Unknown API type: {config['api_type']}")
 
@@ -83,28 +93,7 @@ def extract_text_from_pdf(pdf_path):
     Extract text content from a PDF file
     """
     try:
-        with open(pdf_path, 'rb') as f:
-            pdf_reader = PyPDF2.PdfReader(f)
-            total_pages = len(pdf_reader.pages)
-            
-            # Extract text from each page
-            full_text = ""
-            page_texts = []
-            
-            for page_num, page in enumerate(pdf_reader.pages):
-                page_text = page.extract_text()
-                full_text += page_text + "\n"
-                page_texts.append({
-                    'text': page_text,
-                    'page_number': page_num + 1
-                })
-            
-            return {
-                "success": True,
-                "text": full_text.strip(),
-                "total_pages": total_pages,
-                "page_texts": page_texts
-            }
+        return _extraction_result(extract_text(pdf_path))
             
     except Exception as e:
         return {
@@ -113,12 +102,25 @@ def extract_text_from_pdf(pdf_path):
         }
 
 
-def process_resume(pdf_path, config):
+def _extraction_result(texts):
+    """Extraction result for a list of page texts"""
+    return {
+        "success": True,
+        "text": "\n".join(texts).strip(),
+        "total_pages": len(texts),
+        "page_texts": [{'text': text, 'page_number': page_num + 1}
+                       for page_num, text in enumerate(texts)]
+    }
+
+
+def process_resume(pdf_path, config, extraction=None, embedding=None):
     """
     Process a resume PDF - extract text and generate embedding
+    (unless `embedding` was already computed as part of a batch)
     """
-    # Extract text
-    extraction = extract_text_from_pdf(pdf_path)
+    # Extract text (unless already extracted as part of a batch)
+    if extraction is None:
+        extraction = extract_text_from_pdf(pdf_path)
     
     if not extraction["success"]:
         return extraction
@@ -127,11 +129,8 @@ def process_resume(pdf_path, config):
     
     # Generate embedding for the full resume text
     try:
-        # Truncate text if too long (most embedding models have limits)
-        max_chars = 8000
-        embedding_text = text[:max_chars] if len(text) > max_chars else text
-        
-        embedding = get_embedding(embedding_text, config)
+        if embedding is None:
+            embedding = get_embedding(text[:EMBEDDING_MAX_CHARS], config)
         
         return {
             "success": True,
@@ -158,11 +157,28 @@ def process_multiple_resumes(pdf_paths, config, progress_callback=None):
     results = []
     total = len(pdf_paths)
     
-    for idx, pdf_path in enumerate(pdf_paths):
+    # Extract all resumes together so their pages share the worker pool
+    documents = extract_documents(pdf_paths)
+    
+    # The local model embeds all resumes in batches; remote APIs get one request
+    # per resume, made while the next resumes are still being extracted
+    embeddings = {}
+    if config["api_type"] == "local":
+        documents = list(documents)
+        batch = {idx: _extraction_result(pages)["text"][:EMBEDDING_MAX_CHARS]
+                 for idx, (_, pages, error) in enumerate(documents) if not error}
+        try:
+            embeddings = dict(zip(batch, get_local_embedder().embed(list(batch.values()))))
+        except Exception:
+            # Fall back to one at a time, so each resume reports its own error
+            pass
+    
+    for idx, (pdf_path, texts, error) in enumerate(documents):
         if progress_callback:
             progress_callback(idx + 1, total, os.path.basename(pdf_path))
         
-        result = process_resume(pdf_path, config)
+        extraction = {"success": False, "error": error} if error else _extraction_result(texts)
+        result = process_resume(pdf_path, config, extraction, embeddings.get(idx))
         result["index"] = idx
         results.append(result)
     
@@ -2,23 +2,24 @@
 Skill Extractor Module
 Uses LLM to extract and categorize skills from text
 """
-import requests
+import providers
 from config import get_api_config
+from providers import get_openai_client, track
 
 
 def get_chat_response(messages, config):
     """Get chat response using the configured API"""
-    if config["api_type"] == "openai":
-        from openai import OpenAI
-        client = OpenAI(api_key=config["api_key"])
-        response = client.chat.completions.create(
-            model=config["chat_model"],
-            messages=messages,
-            temperature=0.3
-        )
+    if config["chat_api_type"] == "openai":
+        client = get_openai_client(config["api_key"], chat=True)
+        with track("openai", "chat"):
+            response = client.chat.completions.create(
+                model=config["chat_model"],
+                messages=messages,
+                temperature=0.3
+            )
         return response.choices[0].message.content
     
-    elif config["api_type"] == "ollama":
+    elif config["chat_api_type"] == "ollama":
         prompt = ""
         for msg in messages:
             role = msg["role"]
@@ -28,7 +29,8 @@ def get_chat_response(messages, config):
             elif role == "user":
                 prompt += f"User: {content}\n\n"
         
-        response = requests.post(
+        response = providers.post(
+            "ollama", "chat",
             f"{config['base_url']}/api/generate",
             json={
                 "model": config["chat_model"],
@@ -41,13 +43,14 @@ def get_chat_response(messages, config):
         else:
             raise Exception(f"Ollama API error: {response.status_code} - {response.text}")
     
-    elif config["api_type"] == "openrouter":
+    elif config["chat_api_type"] == "openrouter":
         headers = {
             "Authorization": f"Bearer {config['api_key']}",
             "Content-Type": "application/json"
         }
         
-        response = requests.post(
+        response = providers.post(
+            "openrouter", "chat",
             f"{config['base_url']}/chat/completions",
             headers=headers,
             json={
@@ -64,7 +67,7 @@ def get_chat_response(messages, config):
         else:
             raise Exception(f"OpenRouter API error: {response.status_code} - {response.text}")
     
-    elif config["api_type"] == "huggingface":
+    elif config["chat_api_type"] == "huggingface":
         # Build prompt for Hugging Face models
         prompt = ""
         for msg in messages:
@@ -78,7 +81,8 @@ def get_chat_response(messages, config):
         headers = {"Authorization": f"Bearer {config['api_key']}"}
         api_url = f"https://router.huggingface.co/hf-inference/models/{config['chat_model']}"
         
-        response = requests.post(
+        response = providers.post(
+            "huggingface", "chat",
             api_url,
             headers=headers,
             json={
@@ -101,7 +105,7 @@ def get_chat_response(messages, config):
             raise Exception(f"Hugging Face API error: {response.status_code} - {response.text}")
     
     else:
-        raise ValueError(f"Unknown API type: {config['api_type']}")
+        raise ValueError(f"Unknown API type: {config['chat_api_type']}")
 
 
 def extract_skills(text, config):